@@ -2,8 +2,8 @@ import os
 import sys
 import inspect
 import logging
+import threading
 import traceback
-from distutils.version import LooseVersion
 
 import sgtk
 from sgtk.platform import Engine
@@ -13,41 +13,6 @@ import substance_painter
 
 
 SHOW_COMP_DLG = "SGTK_COMPATIBILITY_DIALOG_SHOWN"
-MINIMUM_SUPPORTED_VERSION = "6.2"
-
-
-def to_new_version_system(version):
-    """
-    Converts a version string into a new style version.
-
-    New version system was introduced in version 2020.1, that became
-    version 6.1.0, so we need to do some magic to normalize versions.
-    https://docs.substance3d.com/spdoc/version-2020-1-6-1-0-194216357.html
-
-    The way we support this new version system is to use LooseVersion for
-    version comparisons. We modify the major version if the version is higher
-    than 2017.1.0 for the version to become in the style of 6.1, by literally
-    subtracting 2014 to the major version component.
-    This leaves us always with a predictable version system:
-        2.6.2  -> 2.6.2 (really old version)
-        2017.1 -> 3.1
-        2018.0 -> 4.0
-        2020.1 -> 6.1 (newer version system starts)
-        6.2    -> 6.2 ...
-
-    2017.1.0 represents the first time the 2k style version was introduced
-    according to:
-    https://docs.substance3d.com/spdoc/all-changes-188973073.html
-
-    Note that this change means that the LooseVersion is good for comparisons
-    but NEVER for printing, it would simply print the same version as
-    LooseVersion does not support rebuilding of the version string from it's
-    components
-    """
-    version = LooseVersion(str(version))
-    if version >= LooseVersion("2017.1"):
-        version.version[0] -= 2014
-    return version
 
 
 class SubstancePainterEngine(Engine):
@@ -57,6 +22,12 @@ class SubstancePainterEngine(Engine):
         """
         self._menu_generator = None
         self._toolbar_generator = None
+        self._texture_set_tracker = None
+        self._template_cache = None
+        self._template_index = None
+        self._context_cache = None
+        self._publish_type_cache = None
+        self._thumbnail_uploader = None
         self.toolbar_commands = []
         self._shutting_down = False
         self.__qt_panels = {}
@@ -119,6 +90,20 @@ class SubstancePainterEngine(Engine):
         self.logger.debug(f"{self}: Initializing...")
         self.tk_substancepainter = self.import_module("tk_substancepainter")
         self.utils = self.tk_substancepainter.utils
+        versions = self.tk_substancepainter.versions
+        self._texture_set_tracker = (
+            self.tk_substancepainter.texture_export.TextureSetTracker()
+        )
+        self._template_cache = self.tk_substancepainter.template_cache.TemplateCache()
+        self._context_cache = self.tk_substancepainter.context_cache.PathContextCache()
+        self._publish_type_cache = (
+            self.tk_substancepainter.publish_types.PublishTypeCache(self.sgtk)
+        )
+        self._thumbnail_uploader = (
+            self.tk_substancepainter.thumbnail_upload.ThumbnailUploader(
+                self.sgtk, self._on_thumbnail_upload_error
+            )
+        )
 
         # check that we are running an ok version of Substance Painter
         current_os = sys.platform
@@ -138,14 +123,15 @@ class SubstancePainterEngine(Engine):
         # New version system was introduced in version 2020.1, that became
         # version 6.1.0, so we need to do some magic to normalize versions.
         # https://docs.substance3d.com/spdoc/version-2020-1-6-1-0-194216357.html
-        painter_version_str = self.host_info["version"]
-        painter_version = to_new_version_system(painter_version_str)
-        painter_min_supported_version = to_new_version_system(MINIMUM_SUPPORTED_VERSION)
+        painter_version = versions.to_new_version_system(self.host_info["version"])
+        painter_min_supported_version = versions.to_new_version_system(
+            versions.MINIMUM_SUPPORTED_VERSION
+        )
 
         if painter_version < painter_min_supported_version:
             msg = (
                 "Shotgun integration is not compatible with Substance Painter versions"
-                f" older than {MINIMUM_SUPPORTED_VERSION}"
+                f" older than {versions.MINIMUM_SUPPORTED_VERSION}"
             )
             raise sgtk.TankError(msg)
 
@@ -160,19 +146,82 @@ class SubstancePainterEngine(Engine):
 
     def post_app_init(self):
         sgtk.platform.engine.set_current_engine(self)
+
+        # the engine might have been started from a background thread, see
+        # startup/start_shotgun.py, so any Qt work is run in the main thread.
+        self.execute_in_main_thread(self._init_ui)
+
+        # emit an engine started event
+        self.sgtk.execute_core_hook(TANK_ENGINE_INIT_HOOK_NAME, engine=self)
+
+    def _init_ui(self):
+        """
+        Creates the engine's user interface elements. Must be run in the main
+        thread.
+        """
         self.create_shotgun_menu()
         self.create_shotgun_toolbar()
+        self._texture_set_tracker.connect()
+        substance_painter.event.DISPATCHER.connect(
+            substance_painter.event.ProjectSaved, self._template_cache.clear
+        )
+        if self.get_setting("change_context_on_new_project", False):
+            substance_painter.event.DISPATCHER.connect(
+                substance_painter.event.ProjectCreated, self._on_project_created
+            )
 
         from sgtk.platform.qt import QtCore
 
         app = QtCore.QCoreApplication.instance()
         app.aboutToQuit.connect(self.destroy)
 
-        # emit an engine started event
-        self.sgtk.execute_core_hook(TANK_ENGINE_INIT_HOOK_NAME, engine=self)
-
     def post_context_change(self, old_context, new_context):
-        self.create_shotgun_toolbar()
+        self._template_cache.clear()
+        self._template_index = None
+        self.execute_in_main_thread(self.create_shotgun_toolbar)
+
+    def _on_project_created(self, event):
+        """
+        Changes the context to the one of the mesh the new project was
+        created from, if it can be resolved.
+        """
+        mesh_path = substance_painter.project.last_imported_mesh_path()
+        if not mesh_path:
+            return
+
+        context = self.context_from_path(mesh_path)
+        if context is None:
+            self.logger.debug(f"No context found for mesh: {mesh_path}")
+            return
+
+        if context != self.context:
+            self.logger.debug(f"Changing context to {context} for mesh: {mesh_path}")
+            sgtk.platform.change_context(context)
+
+    def context_from_path(self, path):
+        """
+        Resolves the context of a path within the engine's pipeline
+        configuration. Contexts are cached by folder for a while, see
+        :class:`PathContextCache`.
+
+        :param str path: Path to resolve the context of.
+        :returns: A context with at least an entity, or None.
+        """
+        context = self._context_cache.get(path)
+        if context is not None:
+            return context
+
+        try:
+            context = self.sgtk.context_from_path(path, previous_context=self.context)
+        except sgtk.TankError as e:
+            self.logger.debug(f"Could not resolve context for {path}: {e}")
+            return None
+
+        if not context.entity:
+            return None
+
+        self._context_cache.add(path, context)
+        return context
 
     def destroy_engine(self):
         """
@@ -192,10 +241,98 @@ class SubstancePainterEngine(Engine):
             self._toolbar_generator.cleanup()
             self._toolbar_generator = None
         self.logger.debug("Toolbar Cleanedup")
+        if self._texture_set_tracker:
+            self._texture_set_tracker.disconnect()
+            self._texture_set_tracker = None
+        if self._template_cache:
+            substance_painter.event.DISPATCHER.disconnect(
+                substance_painter.event.ProjectSaved, self._template_cache.clear
+            )
+            self._template_cache = None
+        if self._context_cache:
+            if self.get_setting("change_context_on_new_project", False):
+                substance_painter.event.DISPATCHER.disconnect(
+                    substance_painter.event.ProjectCreated, self._on_project_created
+                )
+            self._context_cache = None
+        self._publish_type_cache = None
+        if self._thumbnail_uploader:
+            self._thumbnail_uploader.shutdown()
+            self._thumbnail_uploader = None
         super().destroy_engine()
         self.tk_substancepainter = None
         self.logger.debug("Finished Destroying Substance Painter Engine")
 
+    @property
+    def template_cache(self):
+        """
+        Session wide cache of template field resolution, cleared when the
+        context changes or the project is saved, see :class:`TemplateCache`.
+        """
+        return self._template_cache
+
+    @property
+    def publish_type_cache(self):
+        """
+        Session wide cache of the publish types, shared by the publish plugins
+        to resolve publish type names, see :class:`PublishTypeCache`.
+        """
+        return self._publish_type_cache
+
+    @property
+    def thumbnail_uploader(self):
+        """
+        Uploads the thumbnails of the publishes in the background, once per
+        distinct image, see :class:`ThumbnailUploader`.
+        """
+        return self._thumbnail_uploader
+
+    def _on_thumbnail_upload_error(self, message, exception):
+        self.logger.warning("%s: %s" % (message, exception))
+
+    @property
+    def template_index(self):
+        """
+        Index of the configuration path templates by path prefix, see
+        :class:`TemplateIndex`. Built the first time it is needed.
+        """
+        if self._template_index is None:
+            template_index = self.tk_substancepainter.template_index
+            self._template_index = template_index.TemplateIndex(self.sgtk.templates)
+        return self._template_index
+
+    def create_texture_export_job(self, export_path, incremental=True):
+        """
+        Creates a job to export the maps of all the texture sets in the
+        current project, see :class:`TextureExportJob`.
+
+        When incremental, only the texture sets that changed since they were
+        last exported to the same path are exported again, the maps from the
+        previous export are reused for the rest.
+
+        :param str export_path: Folder to export the maps to.
+        :param bool incremental: Whether to skip unchanged texture sets.
+        :returns: A :class:`TextureExportJob` instance.
+        """
+        texture_export = self.tk_substancepainter.texture_export
+        return texture_export.TextureExportJob(
+            export_path,
+            texture_export.all_texture_set_names(),
+            self.get_setting("texture_export_preset"),
+            tracker=self._texture_set_tracker if incremental else None,
+        )
+
+    def export_document_maps(self, export_path, incremental=True):
+        """
+        Exports the maps of all the texture sets in the current project, see
+        :meth:`create_texture_export_job`.
+
+        :param str export_path: Folder to export the maps to.
+        :param bool incremental: Whether to skip unchanged texture sets.
+        :returns: A dictionary of the form {texture set name: {map name: path}}
+        """
+        return self.create_texture_export_job(export_path, incremental).run()
+
     def _create_dialog(self, title, bundle, widget, parent):
         dialog = super(SubstancePainterEngine, self)._create_dialog(
             title, bundle, widget, parent
@@ -273,6 +410,13 @@ class SubstancePainterEngine(Engine):
         return widget
 
     def show_panel(self, panel_id, title, bundle, widget_class, *args, **kwargs):
+        # docks can be requested by apps while the engine is still starting
+        # up in a background thread.
+        return self.execute_in_main_thread(
+            self._show_panel, panel_id, title, bundle, widget_class, *args, **kwargs
+        )
+
+    def _show_panel(self, panel_id, title, bundle, widget_class, *args, **kwargs):
         if panel_id in self.__qt_panels:
             dock_widget = self.__qt_panels[panel_id]
         else:
@@ -310,8 +454,12 @@ class SubstancePainterEngine(Engine):
         else:
             fct = substance_painter.logging.error
 
-        # self.async_execute_in_main_thread(fct, msg)
-        fct(msg)
+        # the Substance Painter API is not thread safe, messages logged from
+        # other threads are sent to the main thread
+        if threading.current_thread() is threading.main_thread():
+            fct(msg)
+        else:
+            self.async_execute_in_main_thread(fct, msg)
 
     def close_windows(self):
         """
@@ -11,6 +11,7 @@
 import os
 
 import sgtk
+from sgtk.platform.qt import QtCore, QtGui
 
 
 __author__ = "Diego Garcia Huerta"
@@ -81,6 +82,46 @@ class SubstancePainterSessionCollector(HookBaseClass):
                 "If false, each texture will be exported and"
                 " published as each own version stream.",
             },
+            "Publish Textures per Texture Set": {
+                "type": "bool",
+                "default": False,
+                "description": "Publish the textures of each texture set as "
+                "a folder, each with its own version stream. Texture sets "
+                "that did not change since they were last published are left "
+                "unchecked. Takes precedence over 'Publish Textures as "
+                "Folder'.",
+            },
+            "Group UDIM Tiles": {
+                "type": "bool",
+                "default": True,
+                "description": "Only applies when not publishing textures as "
+                "a folder. Publish all the UDIM tiles of a channel together "
+                "as a single image sequence instead of one publish per tile.",
+            },
+            "Stage Export Locally": {
+                "type": "bool",
+                "default": False,
+                "description": "Export the textures to a local scratch folder "
+                "first and then copy them to the work export folder in "
+                "parallel, so other tools never see a partially written "
+                "export.",
+            },
+            "Export Staging Folder": {
+                "type": "str",
+                "default": None,
+                "description": "Local folder to stage texture exports in when "
+                "'Stage Export Locally' is enabled. Defaults to the "
+                "temporary folder.",
+            },
+            "Stream Textures To Publish": {
+                "type": "bool",
+                "default": False,
+                "description": "Only applies when publishing textures as a "
+                "folder. Instead of exporting the textures when collecting, "
+                "export them when publishing and copy each texture to the "
+                "publish folder as soon as it is written, overlapping the "
+                "export with the copy.",
+            },
         }
 
         # update the base settings with these settings
@@ -102,8 +143,11 @@ class SubstancePainterSessionCollector(HookBaseClass):
         item = self.collect_current_substancepainter_session(settings, parent_item)
 
         if item:
+            per_texture_set_setting = settings.get("Publish Textures per Texture Set")
             publish_as_folder_setting = settings.get("Publish Textures as Folder")
-            if publish_as_folder_setting and publish_as_folder_setting.value:
+            if per_texture_set_setting and per_texture_set_setting.value:
+                resource_items = self.collect_texture_sets(settings, item)
+            elif publish_as_folder_setting and publish_as_folder_setting.value:
                 resource_items = self.collect_textures_as_folder(settings, item)
             else:
                 resource_items = self.collect_textures(settings, item)
@@ -137,13 +181,124 @@ class SubstancePainterSessionCollector(HookBaseClass):
 
         if work_export_template and work_template:
             path = publisher.engine.app.get_current_project_path()
-            fields = work_template.get_fields(path)
-            export_path = work_export_template.apply_fields(fields)
+            template_cache = publisher.engine.template_cache
+            fields = template_cache.get_fields(work_template, path)
+
+            if fields is None:
+                # the project was saved somewhere else, try with the template
+                # the path belongs to, if any
+                template = publisher.engine.template_index.template_from_path(
+                    path, template_cache
+                )
+                if not template:
+                    self.logger.debug(
+                        "Project path does not match any template: %s" % path
+                    )
+                    return None
+
+                self.logger.debug("Project path matches template %s" % template.name)
+                fields = template_cache.get_fields(template, path)
+
+            if work_export_template.missing_keys(fields):
+                self.logger.debug("Not enough fields to build the work export path.")
+                return None
+
+            export_path = template_cache.apply_fields(work_export_template, fields)
 
             self.logger.debug("Work Export Path is: %s " % export_path)
 
             return export_path
 
+    def export_textures(self, settings, export_path, map_exported_callback=None):
+        """
+        Exports the textures of the current project, showing the progress
+        and allowing the user to cancel the export.
+
+        Only the texture sets that changed since the last export are exported
+        again, the rest reuse the maps already on disk.
+
+        If configured, the textures are exported to a local staging folder and
+        then copied to the export folder.
+
+        :param dict settings: Configured settings for this collector
+        :param str export_path: Folder to export the textures to.
+        :param map_exported_callback: Called as maps become available, with
+            the texture set name, the map name and the path to the map.
+        :returns: The manifest of the export folder, listing the exported
+            textures, see tk_substancepainter.export_manifest, or None if the
+            export was cancelled.
+        """
+        engine = self.parent.engine
+        export_staging = engine.tk_substancepainter.export_staging
+
+        stage_export_setting = settings.get("Stage Export Locally")
+        stage_export = stage_export_setting and stage_export_setting.value
+        if stage_export:
+            staging_folder_setting = settings.get("Export Staging Folder")
+            staging_path = export_staging.staging_path(
+                export_path,
+                staging_folder_setting and staging_folder_setting.value,
+            )
+            self.logger.debug("Staging texture export in %s" % staging_path)
+
+            export_job = engine.create_texture_export_job(staging_path)
+
+            if map_exported_callback:
+                # report the paths the maps will have once in the export folder
+                staged_map_exported_callback = map_exported_callback
+
+                def map_exported_callback(texture_set_name, map_name, texture_file):
+                    staged_map_exported_callback(
+                        texture_set_name,
+                        map_name,
+                        os.path.join(export_path, os.path.basename(texture_file)),
+                    )
+
+        else:
+            export_job = engine.create_texture_export_job(export_path)
+
+        progress_dialog = QtGui.QProgressDialog(
+            "Exporting textures so they can be published...",
+            "Cancel",
+            0,
+            0,
+            QtGui.QApplication.activeWindow(),
+        )
+        progress_dialog.setWindowTitle("Exporting textures")
+        progress_dialog.setWindowModality(QtCore.Qt.WindowModal)
+        progress_dialog.canceled.connect(export_job.cancel)
+        progress_dialog.show()
+
+        def progress_callback(done, total, time_left):
+            message = "Exported %s of %s texture sets, about %ds left..." % (
+                done,
+                total,
+                time_left,
+            )
+            self.logger.info(message)
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+            progress_dialog.setLabelText(message)
+
+        try:
+            export_job.run(map_exported_callback, progress_callback)
+        finally:
+            progress_dialog.close()
+
+        # a cancelled export leaves an incomplete set of maps, which must not
+        # be published nor replace the maps of the export folder
+        if export_job.cancelled:
+            self.logger.warning(
+                "Texture export was cancelled, no textures have been collected."
+            )
+            return None
+
+        if stage_export:
+            self.logger.info("Copying staged textures to %s..." % export_path)
+            return export_staging.commit_staged_export(export_job.manifest, export_path)
+
+        return export_job.manifest
+
     def collect_textures_as_folder(self, settings, parent_item):
         publisher = self.parent
         engine = publisher.engine
@@ -154,33 +309,77 @@ class SubstancePainterSessionCollector(HookBaseClass):
         if not export_path:
             export_path = engine.app.get_project_export_path()
 
-        engine.show_busy(
-            "Exporting textures",
-            "Texture are being exported so they can " "be published.\n\nPlease wait...",
-        )
-
-        map_export_info = engine.app.export_document_maps(export_path)
-        engine.clear_busy()
+        # the textures publish plugin exports the textures while copying them
+        # to the publish folder
+        stream_setting = settings.get("Stream Textures To Publish")
+        export_deferred = bool(stream_setting and stream_setting.value)
+        if export_deferred:
+            self.logger.debug("Deferring texture export to the publish.")
+            export_manifest = None
+        else:
+            export_manifest = self.export_textures(settings, export_path)
 
         self.logger.debug("Collecting exported textures...")
 
-        if export_path:
-            textures = os.listdir(export_path)
-            if textures:
-                textures_item = parent_item.create_item(
-                    "substancepainter.textures",
-                    "Textures",
-                    "Substance Painter Textures",
-                )
+        if export_deferred or (export_manifest and export_manifest.entries):
+            textures_item = parent_item.create_item(
+                "substancepainter.textures",
+                "Textures",
+                "Substance Painter Textures",
+            )
 
-                icon_path = os.path.join(
-                    self.disk_location, os.pardir, "icons", "texture.png"
-                )
+            icon_path = os.path.join(
+                self.disk_location, os.pardir, "icons", "texture.png"
+            )
+
+            textures_item.set_icon_from_path(icon_path)
+
+            textures_item.properties["path"] = export_path
+            textures_item.properties["publish_type"] = "Texture Folder"
+            textures_item.properties["export_deferred"] = export_deferred
+
+    def collect_texture_sets(self, settings, parent_item):
+        publisher = self.parent
+        engine = publisher.engine
+        export_manifest_module = engine.tk_substancepainter.export_manifest
+
+        self.logger.debug("Exporting textures per texture set...")
+
+        export_path = self.get_export_path(settings)
+        if not export_path:
+            export_path = engine.app.get_project_export_path()
+
+        export_manifest = self.export_textures(settings, export_path)
+        if not export_manifest:
+            return
+
+        self.logger.debug("Collecting exported texture sets...")
 
-                textures_item.set_icon_from_path(icon_path)
+        icon_path = os.path.join(self.disk_location, os.pardir, "icons", "texture.png")
+
+        published = export_manifest_module.load_published_texture_sets(export_path)
+
+        for texture_set_name, entries in export_manifest.texture_sets().items():
+            content_hash = export_manifest_module.texture_set_hash(entries)
+            unchanged = published.get(texture_set_name, {}).get("hash") == content_hash
 
-                textures_item.properties["path"] = export_path
-                textures_item.properties["publish_type"] = "Texture Folder"
+            textures_item = parent_item.create_item(
+                "substancepainter.textureset", "Texture Set", texture_set_name
+            )
+            textures_item.set_icon_from_path(icon_path)
+
+            textures_item.properties["path"] = export_path
+            textures_item.properties["publish_type"] = "Texture Folder"
+            textures_item.properties["texture_set"] = texture_set_name
+            textures_item.properties["manifest_entries"] = entries
+            textures_item.properties["content_hash"] = content_hash
+            textures_item.properties["unchanged"] = unchanged
+
+            if unchanged:
+                self.logger.debug(
+                    "Texture set %s did not change since it was last published."
+                    % texture_set_name
+                )
 
     def collect_textures(self, settings, parent_item):
         publisher = self.parent
@@ -192,32 +391,94 @@ class SubstancePainterSessionCollector(HookBaseClass):
         if not export_path:
             export_path = engine.app.get_project_export_path()
 
-        engine.show_busy(
-            "Exporting textures",
-            "Texture are being exported so they can " "be published.\n\nPlease wait...",
-        )
-
-        map_export_info = engine.app.export_document_maps(export_path)
-        engine.clear_busy()
-
         self.logger.debug("Collecting exported textures...")
 
         icon_path = os.path.join(self.disk_location, os.pardir, "icons", "texture.png")
 
-        for texture_set_name, texture_set in map_export_info.iteritems():
-            for texture_id, texture_file in texture_set.iteritems():
-                if os.path.exists(texture_file):
-                    _, filenamefile = os.path.split(texture_file)
-                    texture_name, _ = os.path.splitext(filenamefile)
+        export_manifest_module = engine.tk_substancepainter.export_manifest
+        texture_export = engine.tk_substancepainter.texture_export
+        group_udims_setting = settings.get("Group UDIM Tiles")
+        group_udims = group_udims_setting and group_udims_setting.value
 
-                    self.logger.debug("texture: %s" % texture_file)
-                    textures_item = parent_item.create_item(
-                        "substancepainter.texture", "Texture", texture_name
-                    )
-                    textures_item.set_icon_from_path(icon_path)
+        textures_items = []
+        sequence_items = {}
+        sequence_files = {}
+        uv_tiles_per_texture_set = {}
 
-                    textures_item.properties["path"] = texture_file
-                    textures_item.properties["publish_type"] = "Texture"
+        def create_texture_item(texture_name, texture_file):
+            self.logger.debug("texture: %s" % texture_file)
+            textures_item = parent_item.create_item(
+                "substancepainter.texture", "Texture", texture_name
+            )
+            textures_item.set_icon_from_path(icon_path)
+
+            textures_item.properties["path"] = texture_file
+            textures_item.properties["publish_type"] = "Texture"
+            return textures_item
+
+        def map_exported_callback(texture_set_name, map_name, texture_file):
+            # items are created as soon as their map has been exported
+            export_folder, filenamefile = os.path.split(texture_file)
+
+            if texture_set_name not in uv_tiles_per_texture_set:
+                uv_tiles_per_texture_set[
+                    texture_set_name
+                ] = texture_export.texture_set_has_uv_tiles(texture_set_name)
+            # when unknown the tiles are grouped for now, the manifest tells
+            # once all the maps are exported whether they are UDIM tiles
+            uv_tiles = uv_tiles_per_texture_set[texture_set_name] is not False
+
+            _, udim = export_manifest_module.parse_map_name(
+                texture_set_name, map_name, uv_tiles
+            )
+            if group_udims and udim is not None:
+                # all the tiles of a channel are published as one sequence
+                sequence_name = export_manifest_module.udim_sequence_name(
+                    filenamefile, udim
+                )
+                sequence_files.setdefault(sequence_name, []).append(texture_file)
+                if sequence_name in sequence_items:
+                    return
+                texture_name, _ = os.path.splitext(sequence_name)
+                sequence_items[sequence_name] = create_texture_item(
+                    texture_name.replace("%04d", "<UDIM>"),
+                    os.path.join(export_folder, sequence_name),
+                )
+            else:
+                texture_name, _ = os.path.splitext(filenamefile)
+                textures_items.append(create_texture_item(texture_name, texture_file))
+
+        export_manifest = self.export_textures(
+            settings, export_path, map_exported_callback
+        )
+        if not export_manifest:
+            for textures_item in textures_items + list(sequence_items.values()):
+                parent_item.remove_item(textures_item)
+            return
+
+        udim_sequences = export_manifest.udim_sequences()
+        for sequence_name, textures_item in sequence_items.items():
+            manifest_entries = udim_sequences.get(sequence_name)
+            if manifest_entries:
+                textures_item.properties["manifest_entries"] = manifest_entries
+                continue
+
+            # not UDIM tiles after all, the maps are published one by one
+            parent_item.remove_item(textures_item)
+            for texture_file in sequence_files[sequence_name]:
+                texture_name, _ = os.path.splitext(os.path.basename(texture_file))
+                textures_items.append(create_texture_item(texture_name, texture_file))
+
+        # the publish plugins rely on the manifest entry instead of checking
+        # the file on disk again.
+        for textures_item in textures_items:
+            manifest_entry = export_manifest.entry_for_path(
+                textures_item.properties["path"]
+            )
+            if manifest_entry:
+                textures_item.properties["manifest_entry"] = manifest_entry
+            else:
+                parent_item.remove_item(textures_item)
 
     def collect_current_substancepainter_session(self, settings, parent_item):
         """
@@ -226,7 +226,7 @@ class SubstancePainterSessionPublishPlugin(HookBaseClass):
         # a different path
         work_template = item.properties.get("work_template")
         if work_template:
-            if not work_template.validate(path):
+            if not publisher.engine.template_cache.validate(work_template, path):
                 self.logger.warning(
                     "The current session does not match the configured work "
                     "file template.",
@@ -289,6 +289,9 @@ class SubstancePainterSessionPublishPlugin(HookBaseClass):
         # step. NOTE: this path could change prior to the publish phase.
         item.properties["path"] = path
 
+        # read the publish types once, for all the publish plugins
+        publisher.engine.publish_type_cache.warm()
+
         # run the base class validation
         return super(SubstancePainterSessionPublishPlugin, self).validate(
             settings, item
@@ -361,9 +364,6 @@ def _session_path():
     # get the path to the current file
     path = engine.app.get_current_project_path()
 
-    if isinstance(path, unicode):
-        path = path.encode("utf-8")
-
     return path
 
 
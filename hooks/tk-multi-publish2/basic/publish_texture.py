@@ -126,7 +126,22 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
                 "description": "Template path for published texture files. Should"
                 "correspond to a template defined in "
                 "templates.yml.",
-            }
+            },
+            "Transfer Mode": {
+                "type": "str",
+                "default": "copy",
+                "description": "How files are transferred to the publish "
+                "area, 'copy' or 'link'. When linking, files on the same "
+                "filesystem as the publish area are cloned instead of copied, "
+                "where the filesystem supports copy on write clones. The "
+                "exported files are left untouched.",
+            },
+            "Copy Workers": {
+                "type": "int",
+                "default": 8,
+                "description": "Number of files copied to the publish area at "
+                "the same time.",
+            },
         }
 
         # update the base settings
@@ -196,6 +211,17 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
 
         publisher = self.parent
 
+        # an unknown transfer mode would only fail once publishing
+        transfer_mode = settings.get("Transfer Mode").value
+        file_transfer = publisher.engine.tk_substancepainter.file_transfer
+        if transfer_mode not in file_transfer.TRANSFER_MODES:
+            error_msg = (
+                "Validation failed. Unknown transfer mode '%s', it should be "
+                "one of: %s" % (transfer_mode, ", ".join(file_transfer.TRANSFER_MODES))
+            )
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
         # populate the publish template on the item if found
         publish_template_setting = settings.get("Publish Template")
         publish_template = publisher.engine.get_template_by_name(
@@ -208,8 +234,13 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
+        # the collector only attaches a manifest entry to textures that were
+        # exported, so there is no need to check the file on disk.
         path = item.properties["path"]
-        if not os.path.isfile(path):
+        if not (
+            item.properties.get("manifest_entry")
+            or item.properties.get("manifest_entries")
+        ):
             error_msg = (
                 "Validation failed. Texture path does not exist on disk. %s" % path
             )
@@ -233,33 +264,93 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
         publish_template = item.properties["publish_template"]
         publish_type = item.properties["publish_type"]
         src = item.properties["path"]
-        _, filename = os.path.split(src)
-        filenamefile, extension = os.path.splitext(filename)
+        src_dir, filename = os.path.split(src)
+        _, extension = os.path.splitext(filename)
+        filenamefile = self._channel_name(item)
+        udim_tiles = item.properties.get("manifest_entries")
 
         # Get fields from the current context
         fields = {}
-        ctx_fields = self.parent.context.as_template_fields(publish_template)
+        template_cache = publisher.engine.template_cache
+        ctx_fields = template_cache.context_fields(
+            publish_template, self.parent.context
+        )
         fields.update(ctx_fields)
 
-        context_entity_type = self.parent.context.entity["type"]
-        publish_name = context_entity_type + "_" + filenamefile
+        publish_name = self._publish_name(item)
+
+        # the latest versions of all the textures are looked up at once
+        publish_session = publisher.engine.tk_substancepainter.publish_session
+        version_allocator = publish_session.get_version_allocator(item)
+        version_allocator.prefetch(
+            self.parent.context,
+            publish_type,
+            [
+                self._publish_name(texture_item)
+                for texture_item in item.parent.children
+                if texture_item.type == item.type
+            ],
+        )
 
-        existing_publishes = self._find_publishes(
-            self.parent.context, publish_name, publish_type
+        # resume a previous attempt at publishing the texture, if it was
+        # interrupted and its version is still free
+        engine = publisher.engine
+        if udim_tiles:
+            content_hash = engine.tk_substancepainter.export_manifest.texture_set_hash(
+                udim_tiles
+            )
+        else:
+            content_hash = item.properties["manifest_entry"]["hash"]
+        journal = engine.tk_substancepainter.publish_journal.PublishJournal.open(
+            engine.cache_location,
+            item.context,
+            publish_name,
+            publish_type,
+            content_hash,
+        )
+        journal.verify(
+            version_allocator.latest_publish(
+                self.parent.context, publish_name, publish_type
+            )
         )
-        version = max([p["version_number"] for p in existing_publishes] or [0]) + 1
+        item.properties["publish_journal"] = journal
+
+        if journal.version is not None:
+            version = journal.version
+            self.logger.info("Resuming publish of version %s..." % version)
+        else:
+            version = version_allocator.next_version(
+                self.parent.context, publish_name, publish_type
+            )
         fields["version"] = version
         fields["channel"] = filenamefile
         fields["extension"] = extension[1:]  # no dot
-        publish_path = publish_template.apply_fields(fields)
+        publish_path = template_cache.apply_fields(publish_template, fields)
         publish_path = sgtk.util.ShotgunPath.normalize(publish_path)
 
+        if udim_tiles:
+            publish_root, publish_extension = os.path.splitext(publish_path)
+            publish_path = "%s.%%04d%s" % (publish_root, publish_extension)
+
         publish_dir, filenamefile = os.path.split(publish_path)
 
         # make sure destination folder exists
         ensure_folder_exists(publish_dir)
 
-        sgtk.util.filesystem.copy_file(src, publish_path)
+        if journal.version is None:
+            journal.start(version, publish_path)
+
+        if udim_tiles:
+            files = [
+                (os.path.join(src_dir, tile["file"]), publish_path % tile["udim"])
+                for tile in udim_tiles
+            ]
+            expected_hashes = {
+                publish_path % tile["udim"]: tile["hash"] for tile in udim_tiles
+            }
+        else:
+            files = [(src, publish_path)]
+            expected_hashes = {publish_path: item.properties["manifest_entry"]["hash"]}
 
         self.logger.info("A Publish will be created in Shotgun and linked to:")
         self.logger.info("  %s" % (publish_path,))
@@ -274,7 +365,7 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
             )
             dependency_paths.append(item.parent.properties.sg_publish_path)
 
-        self.logger.info("Registering publish...")
+        self.logger.info("Queueing publish...")
 
         publish_data = {
             "tk": publisher.sgtk,
@@ -300,19 +391,61 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
             },
         )
 
-        # create the publish and stash it in the item properties for other
-        # plugins to use.
-        item.properties["sg_publish_data"] = sgtk.util.register_publish(**publish_data)
+        file_transfer = publisher.engine.tk_substancepainter.file_transfer
+        transfer = file_transfer.FileTransfer(
+            mode=settings.get("Transfer Mode").value,
+            max_workers=settings.get("Copy Workers").value,
+            progress_callback=lambda progress: self.logger.info(
+                "%s: %s" % (publish_name, progress.describe())
+            ),
+        )
+
+        def transfer_texture(publish_data):
+            transfer.transfer(
+                (
+                    (src, dst)
+                    for src, dst in files
+                    if not journal.transferred(dst, expected_hashes.get(dst))
+                ),
+                expected_hashes=expected_hashes,
+                file_callback=lambda dst, digest: journal.record_file(
+                    dst, digest or expected_hashes.get(dst)
+                ),
+            )
+            return publish_data
+
+        # the texture is copied and registered in the background, registering
+        # the textures already copied while the next ones are copied
+        publish_pipeline = publish_session.get_publish_pipeline(item, "texture")
+        item.properties["publish_registration"] = publish_pipeline.submit(
+            transfer_texture, publish_data, journal
+        )
 
         # inject the publish path such that children can refer to it when
         # updating dependency information
         item.properties["sg_publish_path"] = publish_path
 
-        self.logger.info("Publish registered!")
-
         # now that we've published. keep a handle on the path that was published
         item.properties["path"] = publish_path
 
+    def _channel_name(self, item):
+        """
+        Returns the name of the texture of an item with no extension. UDIM
+        tiles are published together as an image sequence, so for those it is
+        the sequence name without the tile token.
+        """
+        filenamefile, _ = os.path.splitext(os.path.basename(item.properties["path"]))
+        if item.properties.get("manifest_entries"):
+            filenamefile = filenamefile.replace("%04d", "").strip("._")
+        return filenamefile
+
+    def _publish_name(self, item):
+        """
+        Returns the name of the publish of an item.
+        """
+        context_entity_type = self.parent.context.entity["type"]
+        return context_entity_type + "_" + self._channel_name(item)
+
     def finalize(self, settings, item):
         """
         Execute the finalization pass. This pass executes once all the publish
@@ -324,54 +457,18 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
         :param item: Item to process
         """
 
+        # wait for the publish pipeline and stash the publish in the item
+        # properties for other plugins to use.
+        _, sg_publish_data = item.properties["publish_registration"].result()
+        item.properties["sg_publish_data"] = sg_publish_data
+        self.logger.info("Publish registered!")
+
+        # the texture is published, there is nothing left to resume
+        item.properties["publish_journal"].remove()
+
         # do the base class finalization
         super(SubstancePainterTexturesPublishPlugin, self).finalize(settings, item)
 
-    def _find_publishes(self, ctx, publish_name, publish_type):
-        """
-        Given a context, publish name and type, find all publishes from Shotgun
-        that match.
-        
-        :param ctx:             Context to use when looking for publishes
-        :param publish_name:    The name of the publishes to look for
-        :param publish_type:    The type of publishes to look for
-        
-        :returns:               A list of Shotgun publish records that match the search
-                                criteria        
-        """
-        publish_entity_type = sgtk.util.get_published_file_entity_type(self.parent.sgtk)
-        if publish_entity_type == "PublishedFile":
-            publish_type_field = "published_file_type.PublishedFileType.code"
-        else:
-            publish_type_field = "tank_type.TankType.code"
-
-        # construct filters from the context:
-        filters = [["project", "is", ctx.project]]
-        if ctx.entity:
-            filters.append(["entity", "is", ctx.entity])
-        if ctx.task:
-            filters.append(["task", "is", ctx.task])
-
-        # add in name & type:
-        if publish_name:
-            filters.append(["name", "is", publish_name])
-        if publish_type:
-            filters.append([publish_type_field, "is", publish_type])
-
-        # retrieve a list of all matching publishes from Shotgun:
-        sg_publishes = []
-        try:
-            query_fields = ["version_number"]
-            sg_publishes = self.parent.shotgun.find(
-                publish_entity_type, filters, query_fields
-            )
-        except Exception, e:
-            self.logger.error(
-                "Failed to find publishes of type '%s', called '%s', for context %s: %s"
-                % (publish_name, publish_type, ctx, e)
-            )
-        return sg_publishes
-
 
 def _export_path():
     """
@@ -383,7 +480,4 @@ def _export_path():
     # get the path to the current file
     path = engine.app.get_project_export_path()
 
-    if isinstance(path, unicode):
-        path = path.encode("utf-8")
-
     return path
@@ -0,0 +1,487 @@
+# Copyright (c) 2017 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import pprint
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+HookBaseClass = sgtk.get_hook_baseclass()
+
+
+class SubstancePainterTextureSetPublishPlugin(HookBaseClass):
+    """
+    Plugin for publishing the textures of a Substance Painter texture set as a
+    folder.
+
+    The texture sets are copied and registered in parallel: the publish pass
+    queues every item on a publish pipeline, which registers texture sets
+    while others are still being copied, and the finalize pass waits for it.
+    This hook relies on functionality found in the base file
+    publisher hook in the publish2 app and should inherit from it in the
+    configuration. The hook setting for this plugin should look something
+    like this::
+
+        hook: "{self}/publish_file.py:{engine}/tk-multi-publish2/basic/publish_texture_set.py"
+
+    """
+
+    # NOTE: The plugin icon and name are defined by the base file plugin.
+
+    @property
+    def description(self):
+        """
+        Verbose, multi-line description of what the plugin does. This can
+        contain simple html for formatting.
+        """
+
+        return """
+        Publishes the textures of a texture set to Shotgun as a folder. Each
+        texture set has its own version stream, so only the texture sets that
+        changed need to be published again.
+        """
+
+    @property
+    def settings(self):
+        """
+        Dictionary defining the settings that this plugin expects to receive
+        through the settings parameter in the accept, validate, publish and
+        finalize methods.
+
+        A dictionary on the following form::
+
+            {
+                "Settings Name": {
+                    "type": "settings_type",
+                    "default": "default_value",
+                    "description": "One line description of the setting"
+            }
+
+        The type string should be one of the data types that toolkit accepts as
+        part of its environment configuration.
+        """
+
+        # inherit the settings from the base publish plugin
+        base_settings = (
+            super(SubstancePainterTextureSetPublishPlugin, self).settings or {}
+        )
+
+        # settings specific to this class
+        substancepainter_publish_settings = {
+            "Publish Template": {
+                "type": "template",
+                "default": None,
+                "description": "Template path for published texture set "
+                "folders. Should correspond to a template defined in "
+                "templates.yml. If it has no texture_set key, the texture set "
+                "is published to a subfolder of the template path.",
+            },
+            "Publish Workers": {
+                "type": "int",
+                "default": 4,
+                "description": "Number of texture sets copied at the same "
+                "time.",
+            },
+            "Transfer Mode": {
+                "type": "str",
+                "default": "copy",
+                "description": "How files are transferred to the publish "
+                "area, 'copy' or 'link'. When linking, files on the same "
+                "filesystem as the publish area are cloned instead of copied, "
+                "where the filesystem supports copy on write clones. The "
+                "exported files are left untouched.",
+            },
+            "Copy Workers": {
+                "type": "int",
+                "default": 4,
+                "description": "Number of files of each texture set copied to "
+                "the publish area at the same time.",
+            },
+        }
+
+        # update the base settings
+        base_settings.update(substancepainter_publish_settings)
+
+        return base_settings
+
+    @property
+    def item_filters(self):
+        """
+        List of item types that this plugin is interested in.
+
+        Only items matching entries in this list will be presented to the
+        accept() method. Strings can contain glob patters such as *, for
+        example ["substancepainter.*", "file.substancepainter"]
+        """
+        return ["substancepainter.textureset"]
+
+    def accept(self, settings, item):
+        """
+        Method called by the publisher to determine if an item is of any
+        interest to this plugin. Only items matching the filters defined via
+        the item_filters property will be presented to this method.
+
+        Texture sets that did not change since they were last published are
+        accepted but left unchecked.
+
+        :param settings: Dictionary of Settings. The keys are strings, matching
+                         the keys returned in the settings property. The values
+                         are `Setting` instances.
+        :param item: Item to process
+
+        :returns: dictionary with boolean keys accepted, required and enabled
+        """
+
+        # if a publish template is configured, disable context change. This
+        # is a temporary measure until the publisher handles context switching
+        # natively.
+        if settings.get("Publish Template").value:
+            item.context_change_allowed = False
+
+        self.logger.info(
+            "Substance Painter '%s' plugin accepted the texture set %s."
+            % (self.name, item.properties["texture_set"])
+        )
+        return {"accepted": True, "checked": not item.properties.get("unchanged")}
+
+    def validate(self, settings, item):
+        """
+        Validates the given item to check that it is ok to publish. Returns a
+        boolean to indicate validity.
+
+        :param settings: Dictionary of Settings. The keys are strings, matching
+                         the keys returned in the settings property. The values
+                         are `Setting` instances.
+        :param item: Item to process
+        :returns: True if item is valid, False otherwise.
+        """
+
+        publisher = self.parent
+
+        # an unknown transfer mode would only fail once publishing
+        transfer_mode = settings.get("Transfer Mode").value
+        file_transfer = publisher.engine.tk_substancepainter.file_transfer
+        if transfer_mode not in file_transfer.TRANSFER_MODES:
+            error_msg = (
+                "Validation failed. Unknown transfer mode '%s', it should be "
+                "one of: %s" % (transfer_mode, ", ".join(file_transfer.TRANSFER_MODES))
+            )
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+        # populate the publish template on the item if found
+        publish_template_setting = settings.get("Publish Template")
+        publish_template = publisher.engine.get_template_by_name(
+            publish_template_setting.value
+        )
+        if publish_template:
+            item.properties["publish_template"] = publish_template
+        else:
+            error_msg = "Validation failed. Publish template not found"
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+        if not item.properties.get("manifest_entries"):
+            error_msg = (
+                "Validation failed. Texture set %s has no exported textures."
+                % item.properties["texture_set"]
+            )
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+        return True
+
+    def publish(self, settings, item):
+        """
+        Executes the publish logic for the given item and settings.
+
+        The texture set is copied and registered by the publish pipeline, see
+        :meth:`finalize`.
+
+        :param settings: Dictionary of Settings. The keys are strings, matching
+                         the keys returned in the settings property.
+                         The values are `Setting` instances.
+        :param item: Item to process
+        """
+
+        publisher = self.parent
+        texture_set_name = item.properties["texture_set"]
+
+        publish_template = item.properties["publish_template"]
+
+        # Get fields from the current context
+        fields = {}
+        template_cache = publisher.engine.template_cache
+        ctx_fields = template_cache.context_fields(
+            publish_template, self.parent.context
+        )
+        fields.update(ctx_fields)
+        fields["texture_set"] = texture_set_name
+
+        publish_name = self._publish_name(item)
+
+        # the latest versions of all the texture sets are looked up at once
+        publish_session = publisher.engine.tk_substancepainter.publish_session
+        version_allocator = publish_session.get_version_allocator(item)
+        version_allocator.prefetch(
+            self.parent.context,
+            item.properties["publish_type"],
+            [
+                self._publish_name(texture_set_item)
+                for texture_set_item in item.parent.children
+                if texture_set_item.type == item.type
+            ],
+        )
+
+        # add dependencies
+        dependency_paths = []
+        if "sg_publish_path" in item.parent.properties:
+            self.logger.debug(
+                "Added dependency: %s" % item.parent.properties.sg_publish_path
+            )
+            dependency_paths.append(item.parent.properties.sg_publish_path)
+
+        # everything touching the item or Qt is gathered here, in the main
+        # thread, the worker only copies files and talks to Shotgun.
+        publish_data = {
+            "tk": publisher.sgtk,
+            "context": item.context,
+            "comment": item.description,
+            "name": publish_name,
+            "thumbnail_path": item.get_thumbnail_as_path(),
+            "published_file_type": item.properties["publish_type"],
+            "dependency_paths": dependency_paths,
+        }
+        export_manifest = publisher.engine.tk_substancepainter.export_manifest
+        texture_set_manifest = export_manifest.ExportManifest(
+            item.properties["path"],
+            {entry["file"]: entry for entry in item.properties["manifest_entries"]},
+        )
+
+        # resume a previous attempt at publishing the texture set, if it was
+        # interrupted
+        publish_journal = publisher.engine.tk_substancepainter.publish_journal
+        journal = publish_journal.PublishJournal.open(
+            publisher.engine.cache_location,
+            item.context,
+            publish_name,
+            item.properties["publish_type"],
+            item.properties["content_hash"],
+        )
+        item.properties["publish_journal"] = journal
+
+        # the version may have been published by another session since
+        journal.verify(
+            version_allocator.latest_publish(
+                self.parent.context, publish_name, item.properties["publish_type"]
+            )
+        )
+        if journal.version is not None:
+            self.logger.info(
+                "Resuming publish of version %s of texture set %s, %s textures "
+                "were already copied."
+                % (journal.version, texture_set_name, len(journal.files))
+            )
+
+        self.logger.info("Queueing publish of texture set %s..." % texture_set_name)
+
+        file_transfer = publisher.engine.tk_substancepainter.file_transfer
+        transfer = file_transfer.FileTransfer(
+            mode=settings.get("Transfer Mode").value,
+            max_workers=settings.get("Copy Workers").value,
+            progress_callback=lambda progress: self.logger.info(
+                "%s: %s" % (texture_set_name, progress.describe())
+            ),
+        )
+
+        def transfer_texture_set(publish_data):
+            return self._transfer_texture_set(
+                publish_template,
+                fields,
+                texture_set_manifest,
+                publish_data,
+                transfer,
+                version_allocator,
+                journal,
+            )
+
+        publish_pipeline = publish_session.get_publish_pipeline(
+            item, "texture_set", settings.get("Publish Workers").value
+        )
+        item.properties["publish_registration"] = publish_pipeline.submit(
+            transfer_texture_set, publish_data, journal
+        )
+
+    def _transfer_texture_set(
+        self,
+        publish_template,
+        fields,
+        texture_set_manifest,
+        publish_data,
+        transfer,
+        version_allocator,
+        journal,
+    ):
+        """
+        Copies the textures of a texture set to a new version of its publish
+        folder. Run by the publish pipeline, which registers it afterwards.
+
+        The textures that did not change since the previous version are
+        linked to it instead of copied. The progress is recorded in the
+        journal, and an interrupted publish resumes with the version and the
+        textures it had.
+
+        :returns: The publish data, updated with the version and path.
+        """
+        publisher = self.parent
+        export_manifest = publisher.engine.tk_substancepainter.export_manifest
+
+        context = publish_data["context"]
+        version = journal.version
+        if version is None:
+            version = version_allocator.next_version(
+                context, publish_data["name"], publish_data["published_file_type"]
+            )
+        fields["version"] = version
+
+        previous_manifest = None
+        previous_publish_path = version_allocator.latest_publish_path(
+            context, publish_data["name"], publish_data["published_file_type"]
+        )
+        if previous_publish_path:
+            previous_manifest = export_manifest.ExportManifest.load(
+                previous_publish_path
+            )
+
+        publish_path = publisher.engine.template_cache.apply_fields(
+            publish_template, fields
+        )
+        if "texture_set" not in publish_template.keys:
+            publish_path = os.path.join(publish_path, fields["texture_set"])
+        publish_path = sgtk.util.ShotgunPath.normalize(publish_path)
+
+        # make sure destination folder exists
+        ensure_folder_exists(publish_path)
+
+        if journal.version is None:
+            journal.start(version, publish_path)
+
+        identical_files = {}
+        if previous_manifest:
+            identical_files = {
+                os.path.join(publish_path, file_name): path
+                for file_name, path in texture_set_manifest.identical_files(
+                    previous_manifest
+                ).items()
+            }
+
+        expected_hashes = {
+            os.path.join(publish_path, file_name): entry["hash"]
+            for file_name, entry in texture_set_manifest.entries.items()
+        }
+        files = [
+            (src, os.path.join(publish_path, os.path.basename(src)))
+            for src in texture_set_manifest.paths()
+        ]
+        transfer.transfer(
+            (
+                (src, dst)
+                for src, dst in files
+                if not journal.transferred(dst, expected_hashes.get(dst))
+            ),
+            identical_files,
+            expected_hashes,
+            lambda dst, digest: journal.record_file(
+                dst, digest or expected_hashes.get(dst)
+            ),
+        )
+
+        # the manifest of the published folder lets the next version find the
+        # textures that did not change, and other tools verify the textures
+        # without hashing them again.
+        texture_set_manifest.copy_to(publish_path).save()
+
+        return dict(publish_data, path=publish_path, version_number=version)
+
+    def _publish_name(self, item):
+        """
+        Returns the name of the publish of a texture set item.
+        """
+        context_entity_type = self.parent.context.entity["type"]
+        return "%s_%s_textures" % (context_entity_type, item.properties["texture_set"])
+
+    def finalize(self, settings, item):
+        """
+        Execute the finalization pass. This pass executes once all the publish
+        tasks have completed, and can for example be used to version up files.
+
+        Waits for the publish pipeline to publish the texture set.
+
+        :param settings: Dictionary of Settings. The keys are strings, matching
+                         the keys returned in the settings property.
+                         The values are `Setting` instances.
+        :param item: Item to process
+        """
+        publisher = self.parent
+        export_manifest = publisher.engine.tk_substancepainter.export_manifest
+
+        future = item.properties.get("publish_registration")
+        if future is None:
+            error_msg = (
+                "Texture set %s was not published." % item.properties["texture_set"]
+            )
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+        publish_data, sg_publish_data = future.result()
+
+        # log the publish data for debugging
+        self.logger.debug(
+            "Populated Publish data...",
+            extra={
+                "action_show_more_info": {
+                    "label": "Publish Data",
+                    "tooltip": "Show the complete Publish data dictionary",
+                    "text": "<pre>%s</pre>" % (pprint.pformat(publish_data),),
+                }
+            },
+        )
+
+        self.logger.info("A Publish was created in Shotgun and linked to:")
+        self.logger.info("  %s" % (publish_data["path"],))
+
+        # stash the publish in the item properties for other plugins to use.
+        item.properties["sg_publish_data"] = sg_publish_data
+        item.properties["sg_publish_path"] = publish_data["path"]
+
+        # remember what was published, so the texture set is only published
+        # again once it changes.
+        export_manifest.record_published_texture_set(
+            item.properties["path"],
+            item.properties["texture_set"],
+            item.properties["content_hash"],
+            publish_data["version_number"],
+            publish_data["path"],
+        )
+
+        # the texture set is published, there is nothing left to resume
+        item.properties["publish_journal"].remove()
+
+        # now that we've published. keep a handle on the path that was published
+        item.properties["path"] = publish_data["path"]
+
+        # do the base class finalization
+        super(SubstancePainterTextureSetPublishPlugin, self).finalize(settings, item)
@@ -126,7 +126,22 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
                 "description": "Template path for published texture folder. "
                 "Should correspond to a template defined in "
                 "templates.yml.",
-            }
+            },
+            "Transfer Mode": {
+                "type": "str",
+                "default": "copy",
+                "description": "How files are transferred to the publish "
+                "area, 'copy' or 'link'. When linking, files on the same "
+                "filesystem as the publish area are cloned instead of copied, "
+                "where the filesystem supports copy on write clones. The "
+                "exported files are left untouched.",
+            },
+            "Copy Workers": {
+                "type": "int",
+                "default": 8,
+                "description": "Number of files copied to the publish area at "
+                "the same time.",
+            },
         }
 
         # update the base settings
@@ -197,6 +212,17 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
 
         publisher = self.parent
 
+        # an unknown transfer mode would only fail once publishing
+        transfer_mode = settings.get("Transfer Mode").value
+        file_transfer = publisher.engine.tk_substancepainter.file_transfer
+        if transfer_mode not in file_transfer.TRANSFER_MODES:
+            error_msg = (
+                "Validation failed. Unknown transfer mode '%s', it should be "
+                "one of: %s" % (transfer_mode, ", ".join(file_transfer.TRANSFER_MODES))
+            )
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
         # populate the publish template on the item if found
         publish_template_setting = settings.get("Publish Template")
         publish_template = publisher.engine.get_template_by_name(
@@ -209,17 +235,27 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
-        export_path = _export_path()
-        if not os.path.isdir(export_path):
-            error_msg = "Validation failed. Export path does not exist on disk."
+        export_path = item.properties.get("path") or _export_path()
+        item.properties["export_path"] = export_path
+
+        # the textures are exported when publishing, nothing to check yet.
+        if item.properties.get("export_deferred"):
+            return True
+
+        export_manifest_module = publisher.engine.tk_substancepainter.export_manifest
+
+        # the manifest written when exporting lists the textures, so there
+        # is no need to scan the export folder.
+        export_manifest = export_manifest_module.ExportManifest.load(export_path)
+        if not export_manifest:
+            error_msg = (
+                "Validation failed. Export path does not exist on disk or has "
+                "no export manifest."
+            )
             self.logger.error(error_msg)
             raise Exception(error_msg)
 
-        item.properties["export_path"] = export_path
-
-        textures = os.listdir(export_path)
-        textures = [os.path.join(export_path, texture) for texture in textures]
-        textures = [texture for texture in textures if os.path.isfile(texture)]
+        textures = export_manifest.paths()
         self.logger.debug("Files in export path: %s" % textures)
 
         if not textures:
@@ -228,6 +264,7 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
             raise Exception(error_msg)
 
         item.properties["textures"] = textures
+        item.properties["export_manifest"] = export_manifest
 
         return True
 
@@ -248,30 +285,132 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
 
         # Get fields from the current context
         fields = {}
-        ctx_fields = self.parent.context.as_template_fields(publish_template)
+        template_cache = publisher.engine.template_cache
+        ctx_fields = template_cache.context_fields(
+            publish_template, self.parent.context
+        )
         fields.update(ctx_fields)
 
         context_entity_type = self.parent.context.entity["type"]
         publish_name = context_entity_type + "_textures"
 
-        existing_publishes = self._find_publishes(
-            self.parent.context, publish_name, publish_type
+        export_manifest_module = publisher.engine.tk_substancepainter.export_manifest
+
+        # resume a previous attempt at publishing the same textures, if it
+        # was interrupted. Textures exported while publishing are only known
+        # once exported, so those publishes are not resumed.
+        journal = None
+        if not item.properties.get("export_deferred"):
+            publish_journal = publisher.engine.tk_substancepainter.publish_journal
+            journal = publish_journal.PublishJournal.open(
+                publisher.engine.cache_location,
+                item.context,
+                publish_name,
+                publish_type,
+                export_manifest_module.texture_set_hash(
+                    item.properties["export_manifest"].entries.values()
+                ),
+            )
+            item.properties["publish_journal"] = journal
+
+        publish_session = publisher.engine.tk_substancepainter.publish_session
+        publish_registration = (
+            publisher.engine.tk_substancepainter.publish_registration
         )
-        version = max([p["version_number"] for p in existing_publishes] or [0]) + 1
+        version_allocator = publish_session.get_version_allocator(item)
+        if journal:
+            # the version may have been published by another session since
+            journal.verify(
+                version_allocator.latest_publish(
+                    self.parent.context, publish_name, publish_type
+                )
+            )
+        if journal and journal.version is not None:
+            version = journal.version
+            self.logger.info(
+                "Resuming publish of version %s, %s textures were already "
+                "copied." % (version, len(journal.files))
+            )
+        else:
+            version = version_allocator.next_version(
+                self.parent.context, publish_name, publish_type
+            )
         fields["version"] = version
+        previous_publish_path = version_allocator.latest_publish_path(
+            self.parent.context, publish_name, publish_type
+        )
 
-        publish_path = publish_template.apply_fields(fields)
+        publish_path = template_cache.apply_fields(publish_template, fields)
         publish_path = sgtk.util.ShotgunPath.normalize(publish_path)
 
         # make sure destination folder exists
         ensure_folder_exists(publish_path)
 
-        textures = item.properties["textures"]
+        if journal and journal.version is None:
+            journal.start(version, publish_path)
+
+        if item.properties.get("export_deferred"):
+            export_manifest = self._export_and_copy_textures(
+                item.properties["export_path"], publish_path
+            )
+        else:
+            textures = item.properties["textures"]
+            export_manifest = item.properties["export_manifest"]
+
+            # textures that did not change since the previous version are
+            # linked to it instead of copied
+            identical_files = {}
+            previous_manifest = (
+                previous_publish_path
+                and export_manifest_module.ExportManifest.load(previous_publish_path)
+            )
+            if previous_manifest:
+                identical_files = {
+                    os.path.join(publish_path, file_name): path
+                    for file_name, path in export_manifest.identical_files(
+                        previous_manifest
+                    ).items()
+                }
+                self.logger.info(
+                    "%s of %s textures did not change since %s."
+                    % (len(identical_files), len(textures), previous_publish_path)
+                )
+
+            file_transfer = publisher.engine.tk_substancepainter.file_transfer
+            transfer = file_transfer.FileTransfer(
+                mode=settings.get("Transfer Mode").value,
+                max_workers=settings.get("Copy Workers").value,
+                progress_callback=lambda progress: self.logger.info(
+                    progress.describe()
+                ),
+            )
+            # copies are checked against the hashes of the export manifest as
+            # they are made
+            expected_hashes = {
+                os.path.join(publish_path, file_name): entry["hash"]
+                for file_name, entry in export_manifest.entries.items()
+            }
+            files = [
+                (src, os.path.join(publish_path, os.path.basename(src)))
+                for src in textures
+            ]
+            transfer.transfer(
+                (
+                    (src, dst)
+                    for src, dst in files
+                    if not journal.transferred(dst, expected_hashes.get(dst))
+                ),
+                identical_files,
+                expected_hashes,
+                lambda dst, digest: journal.record_file(
+                    dst, digest or expected_hashes.get(dst)
+                ),
+            )
 
-        for src in textures:
-            _, filenamefile = os.path.split(src)
-            dst = os.path.join(publish_path, filenamefile)
-            sgtk.util.filesystem.copy_file(src, dst)
+        # the manifest of the published folder lets the next version find the
+        # textures that did not change, and other tools verify the textures
+        # without hashing them again.
+        export_manifest.copy_to(publish_path).save()
 
         self.logger.info("A Publish will be created in Shotgun and linked to:")
         self.logger.info("  %s" % (publish_path,))
@@ -314,7 +453,23 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
 
         # create the publish and stash it in the item properties for other
         # plugins to use.
-        item.properties["sg_publish_data"] = sgtk.util.register_publish(**publish_data)
+        if journal and journal.sg_publish:
+            # registered by a previous attempt
+            item.properties["sg_publish_data"] = journal.sg_publish
+        else:
+            publish_registrar = publish_session.get_publish_registrar(item)
+            try:
+                item.properties["sg_publish_data"] = publish_registrar.register(
+                    publish_data
+                )
+            except publish_registration.IncompletePublishError as e:
+                # the publish holds its version even without its dependencies
+                # or thumbnail, so it is not created again when resumed
+                if journal:
+                    journal.record_publish(e.sg_publish)
+                raise
+            if journal:
+                journal.record_publish(item.properties["sg_publish_data"])
 
         # inject the publish path such that children can refer to it when
         # updating dependency information
@@ -336,53 +491,56 @@ class SubstancePainterTexturesPublishPlugin(HookBaseClass):
         :param item: Item to process
         """
 
+        # the textures are published, there is nothing left to resume
+        if item.properties.get("publish_journal"):
+            item.properties["publish_journal"].remove()
+
         # do the base class finalization
         super(SubstancePainterTexturesPublishPlugin, self).finalize(settings, item)
 
-    def _find_publishes(self, ctx, publish_name, publish_type):
+    def _export_and_copy_textures(self, export_path, publish_path):
         """
-        Given a context, publish name and type, find all publishes from Shotgun
-        that match.
-        
-        :param ctx:             Context to use when looking for publishes
-        :param publish_name:    The name of the publishes to look for
-        :param publish_type:    The type of publishes to look for
-        
-        :returns:               A list of Shotgun publish records that match the search
-                                criteria        
+        Exports the textures of the current project to the export folder,
+        copying each texture to the publish folder as soon as it is written.
+
+        :param str export_path: Folder to export the textures to.
+        :param str publish_path: Folder to copy the textures to.
+        :returns: The manifest of the export folder.
         """
-        publish_entity_type = sgtk.util.get_published_file_entity_type(self.parent.sgtk)
-        if publish_entity_type == "PublishedFile":
-            publish_type_field = "published_file_type.PublishedFileType.code"
-        else:
-            publish_type_field = "tank_type.TankType.code"
-
-        # construct filters from the context:
-        filters = [["project", "is", ctx.project]]
-        if ctx.entity:
-            filters.append(["entity", "is", ctx.entity])
-        if ctx.task:
-            filters.append(["task", "is", ctx.task])
-
-        # add in name & type:
-        if publish_name:
-            filters.append(["name", "is", publish_name])
-        if publish_type:
-            filters.append([publish_type_field, "is", publish_type])
-
-        # retrieve a list of all matching publishes from Shotgun:
-        sg_publishes = []
-        try:
-            query_fields = ["version_number"]
-            sg_publishes = self.parent.shotgun.find(
-                publish_entity_type, filters, query_fields
-            )
-        except Exception, e:
-            self.logger.error(
-                "Failed to find publishes of type '%s', called '%s', for context %s: %s"
-                % (publish_name, publish_type, ctx, e)
+        engine = self.parent.engine
+        texture_streaming = engine.tk_substancepainter.texture_streaming
+
+        ensure_folder_exists(export_path)
+        export_job = engine.create_texture_export_job(export_path)
+
+        def progress_callback(done, total, time_left):
+            self.logger.info(
+                "Exported %s of %s texture sets, about %ds left..."
+                % (done, total, time_left)
             )
-        return sg_publishes
+
+        self.logger.info("Exporting textures to %s..." % export_path)
+
+        copier = texture_streaming.StreamingCopier(
+            export_path, publish_path, logger=self.logger
+        )
+        copier.start()
+        try:
+            export_job.run(progress_callback=progress_callback)
+        except Exception:
+            copier.abort()
+            raise
+
+        self.logger.info("Waiting for the textures to be copied...")
+        textures = copier.finish(export_job.manifest)
+
+        if not textures:
+            error_msg = "Publish failed. No textures were exported."
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+
+        self.logger.debug("Copied textures: %s" % textures)
+        return export_job.manifest
 
 
 def _export_path():
@@ -395,7 +553,4 @@ def _export_path():
     # get the path to the current file
     path = engine.app.get_project_export_path()
 
-    if isinstance(path, unicode):
-        path = path.encode("utf-8")
-
     return path
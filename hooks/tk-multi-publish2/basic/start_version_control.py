@@ -256,17 +256,29 @@ class SubstancePainterStartVersionControlPlugin(HookBaseClass):
         publisher = self.parent
         version_number = None
 
+        engine = publisher.engine
         work_template = item.properties.get("work_template")
         if work_template:
-            if work_template.validate(path):
+            work_fields = engine.template_cache.get_fields(work_template, path)
+            if work_fields is not None:
                 self.logger.debug("Using work template to determine version number.")
-                work_fields = work_template.get_fields(path)
-                if "version" in work_fields:
-                    version_number = work_fields.get("version")
+                version_number = work_fields.get("version")
             else:
                 self.logger.debug("Work template did not match path")
         else:
-            self.logger.debug("Work template unavailable for version extraction.")
+            # look for the template the path belongs to among the templates
+            # sharing a path prefix with it
+            template = engine.template_index.template_from_path(
+                path, engine.template_cache
+            )
+            if template and "version" in template.keys:
+                self.logger.debug(
+                    "Using template %s to determine version number." % template.name
+                )
+                fields = engine.template_cache.get_fields(template, path)
+                version_number = fields.get("version")
+            else:
+                self.logger.debug("Work template unavailable for version extraction.")
 
         if version_number is None:
             self.logger.debug("Using path info hook to determine version number.")
@@ -0,0 +1,102 @@
+# Copyright (c) 2017 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Plugin based bootstrap of the tk-substancepainter engine.
+"""
+
+import os
+import time
+
+import sgtk
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+logger = sgtk.LogManager.get_logger(__name__)
+
+
+ENGINE_NAME = "tk-substancepainter"
+
+# note that these are the same in the plugin info.yml, they are used when
+# the plugin has not been built with build_plugin.py
+PLUGIN_ID = "basic.substancepainter"
+BASE_CONFIGURATION = "sgtk:descriptor:app_store?name=tk-config-basic"
+
+
+def bootstrap_toolkit(root_path):
+    """
+    Bootstraps the engine using a toolkit manager.
+
+    Bundles are looked up in the plugin's bundle_cache folder before being
+    downloaded, so once the cache is populated by build_plugin.py no
+    configuration needs to be resolved from the network.
+
+    :param str root_path: Path to the root folder of the plugin.
+    """
+    start_time = time.perf_counter()
+
+    toolkit_mgr = sgtk.bootstrap.ToolkitManager()
+
+    try:
+        # the manifest is generated when building the plugin
+        from sgtk_plugin_basic_substancepainter import manifest
+
+        manifest.initialize_manager(toolkit_mgr, root_path)
+    except ImportError:
+        toolkit_mgr.plugin_id = PLUGIN_ID
+        toolkit_mgr.base_configuration = BASE_CONFIGURATION
+
+    bundle_cache_path = os.path.join(root_path, "bundle_cache")
+    has_bundle_cache = os.path.isdir(bundle_cache_path)
+    if has_bundle_cache:
+        fallback_paths = toolkit_mgr.bundle_cache_fallback_paths
+        if bundle_cache_path not in fallback_paths:
+            toolkit_mgr.bundle_cache_fallback_paths = fallback_paths + [
+                bundle_cache_path
+            ]
+
+    logger.debug(
+        f"Bootstrapping {ENGINE_NAME} with plugin {toolkit_mgr.plugin_id}, "
+        f"local bundle cache: {bundle_cache_path if has_bundle_cache else 'none'}"
+    )
+
+    def progress_callback(progress_value, message):
+        logger.debug(
+            f"[{time.perf_counter() - start_time:.3f}s] "
+            f"{int(progress_value * 100)}% {message}"
+        )
+
+    def completed_callback(engine):
+        logger.debug(
+            f"Plugin bootstrap of {engine} finished in "
+            f"{time.perf_counter() - start_time:.3f}s "
+            f"({'warm' if has_bundle_cache else 'cold'} bundle cache)."
+        )
+
+    def failed_callback(phase, exception):
+        logger.error(
+            f"Plugin bootstrap failed after {time.perf_counter() - start_time:.3f}s: "
+            f"{exception}"
+        )
+
+    toolkit_mgr.progress_callback = progress_callback
+
+    entity = toolkit_mgr.get_entity_from_environment()
+
+    # the configuration is resolved in a background thread, the engine is
+    # started in the main thread once it is ready.
+    toolkit_mgr.bootstrap_engine_async(
+        ENGINE_NAME,
+        entity,
+        completed_callback=completed_callback,
+        failed_callback=failed_callback,
+    )
@@ -1,3 +1,19 @@
 from . import utils
+from . import versions
+from . import context_cache
+from . import export_manifest
+from . import export_staging
+from . import file_transfer
+from . import publish_journal
+from . import publish_pipeline
+from . import publish_registration
+from . import publish_session
+from . import publish_types
+from . import publish_versions
+from . import texture_export
+from . import texture_streaming
+from . import template_cache
+from . import template_index
+from . import thumbnail_upload
 from .menu_generation import MenuGenerator
 from .toolbar_generation import ToolbarGenerator
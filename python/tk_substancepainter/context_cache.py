@@ -0,0 +1,95 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Cache of the contexts resolved from paths.
+
+Resolving a context from a path queries Shotgun, so the engine remembers the
+context found for the folder of every path it resolved, for a limited time.
+Paths in the same folder, like meshes of the same asset, then resolve
+instantly.
+"""
+
+import os
+import time
+import threading
+import collections
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+CONTEXT_CACHE_MAX_ENTRIES = 64
+CONTEXT_CACHE_TTL = 300
+
+
+def _folder_key(path):
+    return os.path.normcase(os.path.normpath(os.path.dirname(path)))
+
+
+class PathContextCache(object):
+    """
+    Least recently used cache of contexts by folder, whose entries expire
+    after a while, so changes made in Shotgun are eventually picked up.
+    """
+
+    def __init__(
+        self,
+        max_entries=CONTEXT_CACHE_MAX_ENTRIES,
+        ttl=CONTEXT_CACHE_TTL,
+        clock=time.monotonic,
+    ):
+        """
+        :param int max_entries: Number of folders to remember.
+        :param float ttl: Seconds a context is remembered for.
+        :param clock: Function returning the current time in seconds.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, path):
+        """
+        Returns the context cached for the folder of the given path, or None.
+        """
+        key = _folder_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            context, expiry = entry
+            if expiry <= self._clock():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return context
+
+    def add(self, path, context):
+        """
+        Caches the context resolved for the given path.
+        """
+        key = _folder_key(path)
+        with self._lock:
+            self._entries[key] = (context, self._clock() + self._ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Forgets all the cached contexts.
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,451 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Manifest of the textures exported to a folder.
+
+The manifest is written next to the exported textures and records, per file,
+the texture set and channel it belongs to, its UDIM tile, resolution, bit
+depth, size, modification time and a hash of its contents. The collector and
+the publish plugins read it instead of listing and checking the export folder
+again and again.
+"""
+
+import os
+import re
+import time
+import json
+import hashlib
+
+try:
+    import xxhash
+except ImportError:
+    # xxhash is faster, but not shipped with Substance Painter
+    xxhash = None
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+MANIFEST_FILE_NAME = "tk_export_manifest.json"
+MANIFEST_VERSION = 1
+
+# record of the texture sets published from an export folder
+PUBLISHED_TEXTURE_SETS_FILE_NAME = "tk_published_texture_sets.json"
+
+# files written to export folders that are not textures
+METADATA_FILE_NAMES = (MANIFEST_FILE_NAME, PUBLISHED_TEXTURE_SETS_FILE_NAME)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# files modified this close to the moment they were hashed may be modified
+# again within the same modification time tick, on filesystems with a coarse
+# time resolution, so their hash is not trusted, see current_entry.
+RACY_WINDOW_NS = 2 * 10**9
+HASH_ALGORITHM = "xxh3_128" if xxhash else "blake2b_128"
+
+# fields of an entry describing the contents of a file rather than the file
+# on disk, kept when the file is copied, see ExportManifest.copy_to
+CONTENT_FIELDS = (
+    "file",
+    "texture_set",
+    "channel",
+    "udim",
+    "resolution",
+    "bit_depth",
+    "size",
+    "hash",
+)
+
+# UDIM tile number at the end of a map name, ie. Body_BaseColor.1001
+UDIM_REGEX = re.compile(r"^(?P<name>.+?)[._](?P<udim>1\d{3})$")
+
+
+def new_hash():
+    """
+    Returns a new hash object of the algorithm used for file contents, see
+    HASH_ALGORITHM.
+    """
+    if xxhash:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_file(path):
+    """
+    Returns a hash of the contents of the given file.
+    """
+    file_hash = new_hash()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def parse_map_name(texture_set_name, map_name, uv_tiles=False):
+    """
+    Splits the name of an exported map into its channel and UDIM tile.
+
+    A numeric suffix is only read as a UDIM tile for texture sets using UV
+    tiles, a map named ie. Body_Layer.1999 is otherwise a regular map.
+
+    :param str texture_set_name: Name of the texture set the map belongs to.
+    :param str map_name: Name of the exported file with no extension, ie.
+        MyMesh_Body_BaseColor.1001
+    :param bool uv_tiles: Whether the texture set uses UV tiles.
+    :returns: A tuple (channel, udim), udim being None for non UDIM maps.
+    """
+    udim = None
+    match = UDIM_REGEX.match(map_name) if uv_tiles else None
+    if match:
+        map_name = match.group("name")
+        udim = int(match.group("udim"))
+
+    # export presets name maps $mesh_$textureSet_<channel> by default, the
+    # last occurrence is the texture set as the mesh can be named the same
+    match = re.match(
+        r"^(?:.*[_.])?%s[_.](?P<channel>.+)$" % re.escape(texture_set_name), map_name
+    )
+    channel = match.group("channel") if match else map_name
+
+    return channel, udim
+
+
+def has_udim_tiles(map_names):
+    """
+    Guesses whether the given maps of a texture set are UDIM tiles, for when
+    Substance Painter can't tell. At least two maps must share the same name
+    with a different tile number, a single map with a numeric suffix is not
+    enough.
+
+    :param map_names: Names of the exported files with no extension.
+    :returns: True if the maps look like UDIM tiles.
+    """
+    tiles = {}
+    for map_name in map_names:
+        match = UDIM_REGEX.match(map_name)
+        if not match:
+            continue
+        tiles.setdefault(match.group("name"), set()).add(match.group("udim"))
+    return any(len(udims) > 1 for udims in tiles.values())
+
+
+def texture_set_hash(entries):
+    """
+    Returns a hash of the contents of all the files of a texture set.
+
+    :param list entries: Manifest entries of the texture set files.
+    """
+    texture_set_hash = hashlib.blake2b(digest_size=16)
+    for entry in sorted(entries, key=lambda entry: entry["file"]):
+        texture_set_hash.update(("%s:%s;" % (entry["file"], entry["hash"])).encode())
+    return texture_set_hash.hexdigest()
+
+
+def load_published_texture_sets(export_path):
+    """
+    Returns the record of the texture sets published from an export folder,
+    as a dictionary of the form {texture set name: {"hash", "version", "path"}}
+    """
+    try:
+        with open(os.path.join(export_path, PUBLISHED_TEXTURE_SETS_FILE_NAME)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def record_published_texture_set(
+    export_path, texture_set_name, content_hash, version, path
+):
+    """
+    Records that a texture set was published from an export folder, see
+    :func:`load_published_texture_sets`.
+
+    :param str export_path: Folder the texture set was exported to.
+    :param str texture_set_name: Name of the texture set.
+    :param str content_hash: Hash of the texture set files, see
+        :func:`texture_set_hash`.
+    :param int version: Version number of the publish.
+    :param str path: Path of the publish.
+    """
+    published = load_published_texture_sets(export_path)
+    published[texture_set_name] = {
+        "hash": content_hash,
+        "version": version,
+        "path": path,
+    }
+
+    record_path = os.path.join(export_path, PUBLISHED_TEXTURE_SETS_FILE_NAME)
+    tmp_path = "%s.%s.tmp" % (record_path, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(published, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, record_path)
+
+
+def udim_sequence_name(file_name, udim):
+    """
+    Returns the name of the UDIM sequence a tile belongs to, that is the file
+    name with the tile number replaced by a %04d token, ie.
+    MyMesh_Body_BaseColor.%04d.png for MyMesh_Body_BaseColor.1001.png
+    """
+    name, extension = os.path.splitext(file_name)
+    udim = str(udim)
+    index = name.rfind(udim)
+    if index < 0:
+        return file_name
+    return "%s%%04d%s%s" % (name[:index], name[index + len(udim) :], extension)
+
+
+class ExportManifest(object):
+    """
+    Manifest of the textures exported to a folder.
+    """
+
+    def __init__(self, export_path, entries=None):
+        """
+        :param str export_path: Folder the textures were exported to.
+        :param dict entries: Entries per file name, see :meth:`add_map`.
+        """
+        self.export_path = export_path
+        self.entries = entries or {}
+
+    @classmethod
+    def manifest_path(cls, export_path):
+        """
+        Returns the path to the manifest of the given export folder.
+        """
+        return os.path.join(export_path, MANIFEST_FILE_NAME)
+
+    @classmethod
+    def load(cls, export_path):
+        """
+        Loads the manifest of the given export folder.
+
+        :returns: A :class:`ExportManifest` or None if there is no valid
+            manifest in the folder.
+        """
+        try:
+            with open(cls.manifest_path(export_path)) as manifest_file:
+                data = json.load(manifest_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+
+        # hashes made with another algorithm can't be compared
+        if data.get("hash_algorithm", "blake2b_128") != HASH_ALGORITHM:
+            return None
+
+        return cls(export_path, data["files"])
+
+    def save(self):
+        """
+        Writes the manifest to the export folder. The file is replaced in one
+        go so readers never see a partially written manifest.
+        """
+        manifest_path = self.manifest_path(self.export_path)
+        tmp_path = "%s.%s.tmp" % (manifest_path, os.getpid())
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "hash_algorithm": HASH_ALGORITHM,
+                    "files": self.entries,
+                },
+                manifest_file,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, manifest_path)
+
+    def current_entry(self, path):
+        """
+        Returns the entry for the given file if the file did not change since
+        it was added, None otherwise.
+
+        The file is considered unchanged when its size, modification and
+        change times and inode are the ones recorded, and it was not modified
+        within RACY_WINDOW_NS of being hashed.
+        """
+        entry = self.entries.get(os.path.basename(path))
+        if not entry or "hashed_at_ns" not in entry:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (
+            entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+            or entry["ctime_ns"] != stat.st_ctime_ns
+            or entry["ino"] != stat.st_ino
+        ):
+            return None
+        if entry["mtime_ns"] >= entry["hashed_at_ns"] - RACY_WINDOW_NS:
+            return None
+        return entry
+
+    def add_map(
+        self,
+        texture_set_name,
+        map_name,
+        path,
+        resolution=None,
+        bit_depth=None,
+        uv_tiles=False,
+    ):
+        """
+        Adds or updates the entry for an exported map.
+
+        The contents of the file are only hashed again if it changed since it
+        was last added, see :meth:`current_entry`.
+
+        :param str texture_set_name: Texture set the map belongs to.
+        :param str map_name: Name of the exported file with no extension.
+        :param str path: Path to the exported file.
+        :param tuple resolution: Optional (width, height) of the map.
+        :param int bit_depth: Optional bits per channel of the map.
+        :param bool uv_tiles: Whether the texture set uses UV tiles, see
+            :func:`parse_map_name`.
+        :returns: The entry dictionary.
+        """
+        file_name = os.path.basename(path)
+
+        previous_entry = self.current_entry(path)
+        if previous_entry:
+            stat = os.stat(path)
+            file_hash = previous_entry["hash"]
+            hashed_at_ns = previous_entry["hashed_at_ns"]
+        else:
+            # stat before hashing, so a write during the hash makes the entry
+            # outdated rather than wrongly current
+            stat = os.stat(path)
+            hashed_at_ns = time.time_ns()
+            file_hash = hash_file(path)
+
+        channel, udim = parse_map_name(texture_set_name, map_name, uv_tiles)
+        entry = {
+            "file": file_name,
+            "texture_set": texture_set_name,
+            "channel": channel,
+            "udim": udim,
+            "resolution": list(resolution) if resolution else None,
+            "bit_depth": bit_depth,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "mtime_ns": stat.st_mtime_ns,
+            "ctime_ns": stat.st_ctime_ns,
+            "ino": stat.st_ino,
+            "hashed_at_ns": hashed_at_ns,
+            "hash": file_hash,
+        }
+        self.entries[file_name] = entry
+        return entry
+
+    def copy_to(self, export_path):
+        """
+        Returns a manifest for copies of the files in another folder, ie. a
+        publish of them. Only the CONTENT_FIELDS of the entries are kept, the
+        inode and times recorded describe the original files.
+
+        :param str export_path: Folder the files were copied to.
+        """
+        return ExportManifest(
+            export_path,
+            {
+                file_name: {field: entry[field] for field in CONTENT_FIELDS}
+                for file_name, entry in self.entries.items()
+            },
+        )
+
+    def retain(self, file_names):
+        """
+        Removes the entries of all the files not in the given list.
+        """
+        file_names = set(file_names)
+        self.entries = {
+            file_name: entry
+            for file_name, entry in self.entries.items()
+            if file_name in file_names
+        }
+
+    def path(self, entry):
+        """
+        Returns the full path to the file of the given entry.
+        """
+        return os.path.join(self.export_path, entry["file"])
+
+    def paths(self):
+        """
+        Returns the full paths to all the files in the manifest, sorted.
+        """
+        return [os.path.join(self.export_path, name) for name in sorted(self.entries)]
+
+    def identical_files(self, previous_manifest):
+        """
+        Finds the files whose contents did not change since a previous
+        manifest, ie. the one of the previous version of a publish.
+
+        :param previous_manifest: :class:`ExportManifest` to compare with.
+        :returns: A dictionary of the form {file name: path} with the path to
+            the identical file in the folder of the previous manifest.
+        """
+        identical_files = {}
+        for file_name, entry in self.entries.items():
+            previous_entry = previous_manifest.entries.get(file_name)
+            if not previous_entry or previous_entry["hash"] != entry["hash"]:
+                continue
+            previous_path = previous_manifest.path(previous_entry)
+            try:
+                if os.stat(previous_path).st_size != entry["size"]:
+                    continue
+            except OSError:
+                continue
+            identical_files[file_name] = previous_path
+        return identical_files
+
+    def texture_sets(self):
+        """
+        Groups the entries in the manifest by texture set.
+
+        :returns: A dictionary of the form {texture set name: [entries]} with
+            the entries sorted by file name.
+        """
+        texture_sets = {}
+        for file_name in sorted(self.entries):
+            entry = self.entries[file_name]
+            texture_sets.setdefault(entry["texture_set"], []).append(entry)
+        return texture_sets
+
+    def udim_sequences(self):
+        """
+        Groups the UDIM tiles in the manifest by sequence.
+
+        :returns: A dictionary of the form {sequence name: [entries]} with the
+            entries sorted by tile, see :func:`udim_sequence_name`.
+        """
+        sequences = {}
+        for entry in self.entries.values():
+            if entry["udim"] is None:
+                continue
+            sequence_name = udim_sequence_name(entry["file"], entry["udim"])
+            sequences.setdefault(sequence_name, []).append(entry)
+
+        for entries in sequences.values():
+            entries.sort(key=lambda entry: entry["udim"])
+        return sequences
+
+    def entry_for_path(self, path):
+        """
+        Returns the entry for the given file or None if not in the manifest.
+        """
+        return self.entries.get(os.path.basename(path))
@@ -0,0 +1,109 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Texture export staging.
+
+Textures are exported to a local scratch folder first and then copied into
+the export folder, usually on network storage, in parallel. Each file is
+written under a temporary name and renamed once complete, and the manifest is
+replaced last, so other tools never see a partially written export.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+import concurrent.futures
+
+from .export_manifest import ExportManifest
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+STAGING_WORKERS = 8
+
+
+def staging_path(export_path, staging_root=None):
+    """
+    Returns the local folder textures for the given export folder are staged
+    in. The folder is kept between exports so unchanged texture sets don't
+    need exporting again.
+
+    :param str export_path: The export folder the textures are meant for.
+    :param str staging_root: Optional folder to stage exports in, defaults to
+        the temporary folder.
+    """
+    staging_root = staging_root or os.path.join(
+        tempfile.gettempdir(), "tk-substancepainter", "export"
+    )
+    export_hash = hashlib.sha1(os.path.normpath(export_path).encode("utf-8"))
+    return os.path.join(staging_root, export_hash.hexdigest()[:16])
+
+
+def _atomic_copy(src, dst):
+    tmp_dst = "%s.%s.tmp" % (dst, os.getpid())
+    try:
+        shutil.copy2(src, tmp_dst)
+        os.replace(tmp_dst, dst)
+    except Exception:
+        if os.path.exists(tmp_dst):
+            os.remove(tmp_dst)
+        raise
+
+
+def _is_unchanged(previous_entry, entry, path):
+    if not previous_entry or previous_entry["hash"] != entry["hash"]:
+        return False
+    try:
+        return os.stat(path).st_size == previous_entry["size"]
+    except OSError:
+        return False
+
+
+def commit_staged_export(staged_manifest, export_path, max_workers=STAGING_WORKERS):
+    """
+    Copies the staged textures into the export folder.
+
+    Only the files whose contents differ from what the export folder manifest
+    records, or that are missing from the export folder, are copied. Each one
+    is copied under a temporary name and renamed in place once complete. The
+    export folder manifest is written last.
+
+    :param staged_manifest: :class:`ExportManifest` of the staging folder.
+    :param str export_path: Folder to copy the textures to.
+    :param int max_workers: Number of files copied at the same time.
+    :returns: The :class:`ExportManifest` of the export folder.
+    """
+    if not os.path.isdir(export_path):
+        os.makedirs(export_path)
+
+    export_manifest = ExportManifest.load(export_path) or ExportManifest(export_path)
+
+    entries = {}
+    copies = []
+    for file_name, entry in staged_manifest.entries.items():
+        previous_entry = export_manifest.entries.get(file_name)
+        dst = os.path.join(export_path, file_name)
+        if _is_unchanged(previous_entry, entry, dst):
+            entries[file_name] = previous_entry
+        else:
+            entries[file_name] = dict(entry)
+            copies.append((staged_manifest.path(entry), dst))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # consume the results so any copy error is raised here
+        list(executor.map(lambda copy: _atomic_copy(*copy), copies))
+
+    export_manifest.entries = entries
+    export_manifest.save()
+    return export_manifest
@@ -0,0 +1,463 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Parallel file copies for publishing.
+
+Copies to network storage are bound by latency rather than bandwidth, so
+:class:`FileTransfer` copies several files at the same time, in large chunks,
+retrying the files that fail, and reports its throughput while it runs.
+
+When source and destination share a filesystem, files can be linked instead
+of copied: a copy on write clone is tried first, a hard link next for files
+that are already published, and a full copy is the fallback.
+
+Published files are made read only, as a hard link shares its contents with
+the previous versions of a publish: modifying one would modify them all.
+
+Files are hashed in the same pass that copies them, so copies can be verified
+against the hashes of the export manifest without reading them again.
+"""
+
+import os
+import sys
+import stat
+import time
+import errno
+import shutil
+import ctypes
+import threading
+import concurrent.futures
+
+from .export_manifest import new_hash
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+TRANSFER_MODE_COPY = "copy"
+TRANSFER_MODE_LINK = "link"
+TRANSFER_MODES = (TRANSFER_MODE_COPY, TRANSFER_MODE_LINK)
+
+# ioctl to clone a file on Linux filesystems supporting it, ie. btrfs, xfs
+FICLONE = 0x40049409
+
+TRANSFER_WORKERS = 8
+TRANSFER_BUFFER_SIZE = 8 * 1024 * 1024
+TRANSFER_RETRIES = 3
+TRANSFER_RETRY_DELAY = 1.0
+PROGRESS_INTERVAL = 2.0
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024.0:
+            return "%.1f %s" % (size, unit)
+        size /= 1024.0
+    return "%.1f TB" % size
+
+
+def _make_read_only(path):
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _replace(src, dst):
+    """
+    Renames a file over another one, even when the destination is read only,
+    which Windows refuses to replace.
+    """
+    try:
+        os.replace(src, dst)
+    except PermissionError:
+        if not os.path.isfile(dst):
+            raise
+        os.chmod(dst, stat.S_IREAD | stat.S_IWRITE)
+        os.replace(src, dst)
+
+
+def remove_file(path):
+    """
+    Removes a file, even when read only, which Windows refuses to remove.
+    """
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+
+class ChecksumError(IOError):
+    """
+    Raised when the contents of a copy don't match the expected hash.
+    """
+
+
+def copy_file(
+    src,
+    dst,
+    buffer_size=TRANSFER_BUFFER_SIZE,
+    bytes_callback=None,
+    expected_hash=None,
+    read_only=False,
+):
+    """
+    Copies a file in chunks, hashing its contents on the way. The copy is
+    written under a temporary name and renamed once complete, so the
+    destination is never partially written. Like
+    sgtk.util.filesystem.copy_file, the copy is made writable by all, unless
+    read only.
+
+    :param str src: File to copy.
+    :param str dst: Path to copy the file to.
+    :param int buffer_size: Size of the chunks read and written.
+    :param bytes_callback: Optional function called with the size of every
+        chunk copied.
+    :param str expected_hash: Optional hash the contents must have, see
+        export_manifest.hash_file.
+    :param bool read_only: Whether to make the copy readable by all and
+        writable by none, ie. for published files.
+    :returns: The hash of the contents of the file.
+    :raises: ChecksumError if the contents don't match the expected hash.
+    """
+    tmp_dst = "%s.%s.%s.tmp" % (dst, os.getpid(), threading.get_ident())
+    file_hash = new_hash()
+    try:
+        with open(src, "rb") as src_file, open(tmp_dst, "wb") as dst_file:
+            for chunk in iter(lambda: src_file.read(buffer_size), b""):
+                file_hash.update(chunk)
+                dst_file.write(chunk)
+                if bytes_callback:
+                    bytes_callback(len(chunk))
+
+        digest = file_hash.hexdigest()
+        if expected_hash and digest != expected_hash:
+            raise ChecksumError(
+                "Contents of %s copied to %s don't have the expected hash"
+                % (src, dst)
+            )
+
+        shutil.copystat(src, tmp_dst)
+        os.chmod(tmp_dst, 0o444 if read_only else 0o666)
+        _replace(tmp_dst, dst)
+    except Exception:
+        if os.path.exists(tmp_dst):
+            remove_file(tmp_dst)
+        raise
+
+    return digest
+
+
+def _reflink(src, dst):
+    """
+    Clones a file, sharing its data until either copy is modified. Raises
+    OSError if the platform or filesystem does not support it.
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.remove(dst)
+                raise
+    elif sys.platform == "darwin":
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), dst)
+    else:
+        raise OSError(errno.ENOTSUP, "Cloning files is not supported", dst)
+
+
+def link_file(src, dst, protect=True):
+    """
+    Links a file instead of copying it, trying a copy on write clone first
+    and a hard link next.
+
+    A hard link shares its inode, and so its contents and permissions, with
+    the source. When protecting, the source is a work file that can still be
+    modified, ie. by the next export, so only clones are used: a clone is a
+    separate file sharing blocks with the source until either is written to,
+    and the source is left untouched. Hard links are only used for files
+    that are already published, which are made read only, so no version
+    sharing them can be modified in place.
+
+    :param str src: File to link.
+    :param str dst: Path to link the file to.
+    :param bool protect: Whether the source can still be modified.
+    :returns: The method used, "reflink" or "hardlink".
+    :raises: OSError if the file could not be linked.
+    """
+    tmp_dst = "%s.%s.%s.tmp" % (dst, os.getpid(), threading.get_ident())
+    try:
+        try:
+            _reflink(src, tmp_dst)
+            shutil.copystat(src, tmp_dst)
+            method = "reflink"
+        except OSError:
+            if protect:
+                raise
+            _make_read_only(src)
+            os.link(src, tmp_dst)
+            method = "hardlink"
+        _replace(tmp_dst, dst)
+    except Exception:
+        if os.path.lexists(tmp_dst):
+            remove_file(tmp_dst)
+        raise
+    return method
+
+
+def same_device(src, dst_folder):
+    """
+    Returns whether a file and a folder are on the same filesystem.
+    """
+    try:
+        return os.stat(src).st_dev == os.stat(dst_folder).st_dev
+    except OSError:
+        return False
+
+
+class TransferProgress(object):
+    """
+    Progress of a :class:`FileTransfer`.
+    """
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.done_files = 0
+        self.done_bytes = 0
+        self.linked_files = 0
+        self.start_time = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _add_bytes(self, size):
+        with self._lock:
+            self.done_bytes += size
+
+    def _add_file(self, linked=False):
+        with self._lock:
+            self.done_files += 1
+            if linked:
+                self.linked_files += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def throughput(self):
+        """
+        Bytes copied per second so far.
+        """
+        elapsed = self.elapsed
+        return self.done_bytes / elapsed if elapsed else 0.0
+
+    @property
+    def time_left(self):
+        """
+        Estimated seconds left, or None if not known yet.
+        """
+        throughput = self.throughput
+        if not throughput:
+            return None
+        return (self.total_bytes - self.done_bytes) / throughput
+
+    def describe(self):
+        """
+        Returns a one line description of the progress.
+        """
+        message = "Copied %s of %s files, %s of %s at %s/s" % (
+            self.done_files,
+            self.total_files,
+            _format_size(self.done_bytes),
+            _format_size(self.total_bytes),
+            _format_size(self.throughput),
+        )
+        if self.linked_files:
+            message += ", %s linked" % self.linked_files
+        time_left = self.time_left
+        if time_left is not None and self.done_files < self.total_files:
+            message += ", about %ds left" % time_left
+        return message
+
+
+class FileTransfer(object):
+    """
+    Copies files with a pool of workers.
+
+    Progress is reported from the thread calling :meth:`transfer`, so the
+    callback can safely log to the publisher.
+    """
+
+    def __init__(
+        self,
+        mode=TRANSFER_MODE_COPY,
+        max_workers=TRANSFER_WORKERS,
+        retries=TRANSFER_RETRIES,
+        buffer_size=TRANSFER_BUFFER_SIZE,
+        progress_callback=None,
+        progress_interval=PROGRESS_INTERVAL,
+        read_only=True,
+    ):
+        """
+        :param str mode: One of TRANSFER_MODES. In link mode, the files on the
+            same filesystem as their destination are linked, see
+            :func:`link_file`, and the rest copied.
+        :param int max_workers: Number of files copied at the same time.
+        :param int retries: Number of times a failed copy is retried.
+        :param int buffer_size: Size of the chunks read and written.
+        :param progress_callback: Optional function called every
+            progress_interval seconds and once done with a
+            :class:`TransferProgress`.
+        :param float progress_interval: Seconds between progress reports.
+        :param bool read_only: Whether to make the transferred files read
+            only, as published files must not be modified.
+        """
+        if mode not in TRANSFER_MODES:
+            raise ValueError("Unknown transfer mode: %s" % mode)
+        self._mode = mode
+        self._max_workers = max(1, max_workers)
+        self._retries = retries
+        self._buffer_size = buffer_size
+        self._progress_callback = progress_callback
+        self._progress_interval = progress_interval
+        self._read_only = read_only
+
+    def transfer(
+        self, files, identical_files=None, expected_hashes=None, file_callback=None
+    ):
+        """
+        Copies files, creating the destination folders as needed.
+
+        :param list files: List of (source, destination) path tuples.
+        :param dict identical_files: Optional dictionary of the form
+            {destination: path} of already published files identical to the
+            source of a destination, ie. in the previous version of a
+            publish. Those are linked whatever the transfer mode, and only
+            copied if linking fails.
+        :param dict expected_hashes: Optional dictionary of the form
+            {destination: hash} of the hashes the copies must have. Copies
+            that don't match are retried.
+        :param file_callback: Optional function called from the workers with
+            the destination and hash of every file as soon as it is
+            transferred. The hash is None for linked files.
+        :returns: A dictionary of the form {destination: hash} with the hash
+            of the contents of every copy, or None for linked files.
+        :raises: The error of the first file that could not be copied.
+        """
+        files = list(files)
+        total_bytes = 0
+        for src, _ in files:
+            total_bytes += os.path.getsize(src)
+        progress = TransferProgress(len(files), total_bytes)
+
+        with concurrent.futures.ThreadPoolExecutor(self._max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self._transfer_file,
+                    src,
+                    dst,
+                    progress,
+                    identical_files.get(dst) if identical_files else None,
+                    expected_hashes.get(dst) if expected_hashes else None,
+                    file_callback,
+                )
+                for src, dst in files
+            ]
+
+            pending = futures
+            while pending:
+                _, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=self._progress_interval,
+                    return_when=concurrent.futures.FIRST_EXCEPTION,
+                )
+                if any(future.done() and future.exception() for future in futures):
+                    for future in pending:
+                        future.cancel()
+                    break
+                if pending and self._progress_callback:
+                    self._progress_callback(progress)
+
+            results = dict(future.result() for future in futures)
+
+        if self._progress_callback:
+            self._progress_callback(progress)
+        return results
+
+    def _transfer_file(
+        self,
+        src,
+        dst,
+        progress,
+        identical_file=None,
+        expected_hash=None,
+        file_callback=None,
+    ):
+        dst_folder = os.path.dirname(dst)
+        if dst_folder and not os.path.isdir(dst_folder):
+            os.makedirs(dst_folder, exist_ok=True)
+
+        # the choice is made per file, as sources can be on different volumes
+        links = []
+        if identical_file:
+            links.append((identical_file, False))
+        if self._mode == TRANSFER_MODE_LINK and same_device(src, dst_folder or "."):
+            links.append((src, True))
+
+        for link_src, protect in links:
+            try:
+                link_file(link_src, dst, protect=protect)
+                if self._read_only:
+                    _make_read_only(dst)
+            except OSError:
+                continue
+            progress._add_bytes(os.path.getsize(src))
+            progress._add_file(linked=True)
+            if file_callback:
+                file_callback(dst, None)
+            return dst, None
+
+        attempt = 0
+        while True:
+            copied = []
+
+            def bytes_callback(size):
+                copied.append(size)
+                progress._add_bytes(size)
+
+            try:
+                digest = copy_file(
+                    src,
+                    dst,
+                    self._buffer_size,
+                    bytes_callback,
+                    expected_hash,
+                    self._read_only,
+                )
+                break
+            except (IOError, OSError):
+                # forget the bytes of the failed attempt
+                progress._add_bytes(-sum(copied))
+                attempt += 1
+                if attempt > self._retries:
+                    raise
+                time.sleep(TRANSFER_RETRY_DELAY * 2 ** (attempt - 1))
+
+        progress._add_file()
+        if file_callback:
+            file_callback(dst, digest)
+        return dst, digest
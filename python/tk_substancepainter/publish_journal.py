@@ -0,0 +1,211 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Resumable publishes.
+
+A :class:`PublishJournal` records, on local disk, the progress of a publish:
+the version allocated to it, the files transferred and the publish registered.
+When a publish is interrupted, running it again picks up the journal and only
+does the work that was left.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+JOURNAL_FOLDER_NAME = "publish_journals"
+
+
+def _entity_id(entity):
+    return "%s:%s" % (entity["type"], entity["id"]) if entity else ""
+
+
+class PublishJournal(object):
+    """
+    Journal of the progress of a publish.
+
+    The journal is a file of JSON records, appended and flushed as the
+    publish progresses, so an interrupted publish loses at most the record
+    being written. It is removed once the publish is complete.
+    """
+
+    def __init__(self, path, content_hash):
+        """
+        :param str path: Path to the journal file.
+        :param str content_hash: Hash of the contents being published.
+        """
+        self.path = path
+        self.content_hash = content_hash
+        self.version = None
+        self.publish_path = None
+        self.files = {}
+        self.sg_publish = None
+        self._lock = threading.Lock()
+        self._incomplete_record = False
+
+    @classmethod
+    def open(cls, cache_location, context, name, publish_type, content_hash):
+        """
+        Opens the journal of a publish, resuming the previous attempt at
+        publishing it, if any.
+
+        An attempt that registered a publish of other contents is forgotten,
+        as the contents need to be published as a new version.
+
+        :param str cache_location: Folder to keep the journals in, usually
+            the cache location of the engine.
+        :param context: Context of the publish.
+        :param str name: Name of the publish.
+        :param str publish_type: Publish type of the publish.
+        :param str content_hash: Hash of the contents being published.
+        """
+        key = "|".join(
+            [
+                _entity_id(context.project),
+                _entity_id(context.entity),
+                _entity_id(context.task),
+                name,
+                publish_type or "",
+            ]
+        )
+        path = os.path.join(
+            cache_location,
+            JOURNAL_FOLDER_NAME,
+            hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jsonl",
+        )
+
+        journal = cls(path, content_hash)
+        journal._read()
+        if journal.sg_publish and journal.content_hash != content_hash:
+            journal.remove()
+            journal = cls(path, content_hash)
+        elif journal.version is not None and journal.content_hash != content_hash:
+            # files already transferred are still checked against the hashes
+            # of the new contents, so the attempt can be resumed
+            journal.content_hash = content_hash
+            journal.start(journal.version, journal.publish_path)
+        return journal
+
+    def verify(self, latest_publish):
+        """
+        Forgets the previous attempt if the version it allocated is no longer
+        free, that is if it registered nothing and a publish of that version,
+        or a later one, has been registered since.
+
+        :param latest_publish: The latest publish of the same name and type,
+            as a dictionary with a version_number, or None.
+        """
+        if (
+            self.version is not None
+            and not self.sg_publish
+            and latest_publish
+            and (latest_publish.get("version_number") or 0) >= self.version
+        ):
+            self.remove()
+            self.version = None
+            self.publish_path = None
+            self.files = {}
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return
+
+        # the next record must not be appended to an incomplete one
+        self._incomplete_record = bool(lines) and not lines[-1].endswith("\n")
+
+        content_hash = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last record of an interrupted publish may be incomplete
+                continue
+            if "version" in record:
+                self.version = record["version"]
+                self.publish_path = record["path"]
+                content_hash = record["content_hash"]
+            elif "file" in record:
+                self.files[record["file"]] = record["hash"]
+            elif "publish" in record:
+                self.sg_publish = record["publish"]
+        if self.version is not None:
+            self.content_hash = content_hash
+
+    def _write(self, record):
+        with self._lock:
+            try:
+                folder = os.path.dirname(self.path)
+                if not os.path.isdir(folder):
+                    os.makedirs(folder, exist_ok=True)
+                with open(self.path, "a") as f:
+                    if self._incomplete_record:
+                        f.write("\n")
+                        self._incomplete_record = False
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except (IOError, OSError):
+                # the journal only saves work when resuming, the publish
+                # itself must not fail because of it
+                pass
+
+    def start(self, version, publish_path):
+        """
+        Records the version allocated to the publish and its path.
+        """
+        self.version = version
+        self.publish_path = publish_path
+        self._write(
+            {
+                "version": version,
+                "path": publish_path,
+                "content_hash": self.content_hash,
+            }
+        )
+
+    def record_file(self, path, file_hash):
+        """
+        Records a file transferred to the publish area, with the hash of its
+        contents.
+        """
+        self.files[path] = file_hash
+        self._write({"file": path, "hash": file_hash})
+
+    def transferred(self, path, file_hash):
+        """
+        Returns True if the file was transferred with the given contents.
+        """
+        return self.files.get(path) == file_hash and os.path.isfile(path)
+
+    def record_publish(self, sg_publish):
+        """
+        Records the publish registered.
+        """
+        self.sg_publish = {"type": sg_publish["type"], "id": sg_publish["id"]}
+        self._write({"publish": self.sg_publish})
+
+    def remove(self):
+        """
+        Removes the journal, once the publish is complete.
+        """
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,172 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Pipelined publishing of files.
+
+Publishing an item transfers its files to the publish area, which is disk
+bound, and then registers it in Shotgun, which is network bound.
+:class:`PublishPipeline` runs both as separate stages connected by bounded
+queues, so the registration of an item overlaps the transfer of the next one.
+"""
+
+import concurrent.futures
+import queue
+import threading
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+QUEUE_SIZE = 8
+IDLE_TIMEOUT = 5.0
+
+
+class _Stage(object):
+    """
+    Threads processing the jobs of a bounded queue. The threads are started
+    as jobs are queued and stop once there is nothing left to do.
+    """
+
+    def __init__(self, process, max_workers, queue_size, idle_timeout):
+        self._process = process
+        self._max_workers = max_workers
+        self._idle_timeout = idle_timeout
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._workers = 0
+
+    def put(self, job):
+        """
+        Queues a job, blocking while the queue is full.
+        """
+        self._queue.put(job)
+        with self._lock:
+            if self._workers < self._max_workers:
+                self._workers += 1
+                worker = threading.Thread(target=self._run)
+                worker.daemon = True
+                worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._workers -= 1
+                        return
+                continue
+            self._process(job)
+
+    def get_nowait(self, max_jobs):
+        """
+        Returns up to the given number of the queued jobs, without waiting.
+        """
+        jobs = []
+        while len(jobs) < max_jobs:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+
+class PublishPipeline(object):
+    """
+    Transfers the files of publishes and registers them in two pipelined
+    stages.
+
+    Publishes are transferred in the order they are submitted, by one or
+    more transfer workers. A single registration worker registers them as
+    they come out of the transfer stage, all the publishes waiting at once.
+    """
+
+    def __init__(
+        self,
+        publish_registrar,
+        transfer_workers=1,
+        queue_size=QUEUE_SIZE,
+        idle_timeout=IDLE_TIMEOUT,
+    ):
+        """
+        :param publish_registrar: :class:`PublishRegistrar` registering the
+            publishes.
+        :param int transfer_workers: Number of publishes transferred at the
+            same time.
+        :param int queue_size: Number of publishes waiting for each stage
+            before submitting more blocks.
+        :param float idle_timeout: Seconds the workers wait for more work
+            before stopping.
+        """
+        self._publish_registrar = publish_registrar
+        self._queue_size = queue_size
+        self._transfer_stage = _Stage(
+            self._transfer, max(1, transfer_workers), queue_size, idle_timeout
+        )
+        self._register_stage = _Stage(self._register, 1, queue_size, idle_timeout)
+
+    def submit(self, transfer, publish_data, journal=None):
+        """
+        Queues a publish, blocking while the transfer stage is full.
+
+        :param transfer: Function transferring the files of the publish.
+            Called with the publish data and returns it, updated with
+            anything the transfer decided, like the path or the version.
+        :param dict publish_data: Keyword arguments for
+            sgtk.util.register_publish.
+        :param journal: Optional :class:`PublishJournal` of the publish. The
+            publish is not registered again if the journal has it, and is
+            recorded in it once registered.
+        :returns: A future resolving to the final publish data and the
+            registered publish.
+        """
+        future = concurrent.futures.Future()
+        self._transfer_stage.put((future, transfer, publish_data, journal))
+        return future
+
+    def _transfer(self, job):
+        future, transfer, publish_data, journal = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            publish_data = transfer(publish_data)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if journal and journal.sg_publish:
+            # registered by a previous attempt
+            future.set_result((publish_data, journal.sg_publish))
+            return
+        self._register_stage.put((future, publish_data, journal))
+
+    def _register(self, job):
+        # register the publishes waiting together, in batches
+        jobs = [job] + self._register_stage.get_nowait(self._queue_size - 1)
+        keys = [
+            (future, publish_data, journal, self._publish_registrar.add(publish_data))
+            for future, publish_data, journal in jobs
+        ]
+        for future, publish_data, journal, key in keys:
+            try:
+                sg_publish = self._publish_registrar.result(key)
+                if journal:
+                    journal.record_publish(sg_publish)
+            except Exception as e:
+                # a publish created without its dependencies or thumbnail
+                # still holds its version, it must not be created again
+                sg_publish = getattr(e, "sg_publish", None)
+                if journal and sg_publish:
+                    journal.record_publish(sg_publish)
+                future.set_exception(e)
+            else:
+                future.set_result((publish_data, sg_publish))
@@ -0,0 +1,278 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Batched registration of publishes.
+
+sgtk.util.register_publish makes several requests per publish: publish type
+lookup, creation, dependencies and thumbnail. :class:`PublishRegistrar`
+gathers the publishes of a publish session and creates them, and their
+dependencies, with batch requests.
+"""
+
+import threading
+
+import sgtk
+
+from . import publish_types
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+BATCH_SIZE = 50
+
+
+class IncompletePublishError(Exception):
+    """
+    Raised when a publish was created, but some of its data, like its
+    dependencies or thumbnail, could not be registered.
+
+    :ivar sg_publish: The publish entity dictionary of the created publish.
+    """
+
+    def __init__(self, message, sg_publish):
+        super().__init__(message)
+        self.sg_publish = sg_publish
+
+
+def _chunks(items, size):
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+class PublishRegistrar(object):
+    """
+    Registers publishes in batches.
+
+    Publishes are queued with :meth:`add`, and all the queued publishes are
+    registered the first time the result of any of them is requested.
+    """
+
+    def __init__(
+        self,
+        tk,
+        publish_type_cache=None,
+        thumbnail_uploader=None,
+        batch_size=BATCH_SIZE,
+    ):
+        """
+        :param tk: Toolkit API instance.
+        :param publish_type_cache: :class:`PublishTypeCache` to resolve the
+            publish types with, a new one is used if not given.
+        :param thumbnail_uploader: Optional :class:`ThumbnailUploader` to
+            upload the thumbnails in the background with. When not given the
+            thumbnails are uploaded as the publishes are registered.
+        :param int batch_size: Number of requests sent in each batch.
+        """
+        self._tk = tk
+        self._thumbnail_uploader = thumbnail_uploader
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        self._results = {}
+        self._errors = {}
+        self._publish_type_cache = (
+            publish_type_cache or publish_types.PublishTypeCache(tk)
+        )
+        self._publish_entity_type = sgtk.util.get_published_file_entity_type(tk)
+
+    def add(self, publish_data):
+        """
+        Queues a publish for registration.
+
+        :param dict publish_data: Keyword arguments for
+            sgtk.util.register_publish.
+        :returns: A key to get the result of the registration with, see
+            :meth:`result`.
+        """
+        with self._lock:
+            key = len(self._pending) + len(self._results) + len(self._errors)
+            self._pending.append((key, dict(publish_data)))
+        return key
+
+    def register(self, publish_data):
+        """
+        Registers a publish right away, along with any queued publishes.
+
+        :param dict publish_data: Keyword arguments for
+            sgtk.util.register_publish.
+        :returns: The publish entity dictionary.
+        """
+        return self.result(self.add(publish_data))
+
+    def result(self, key):
+        """
+        Returns the publish registered for a key, registering all the queued
+        publishes if needed.
+
+        :returns: The publish entity dictionary.
+        :raises: The error that prevented registering the publish, or
+            :class:`IncompletePublishError` if it was created without its
+            dependencies or thumbnail.
+        """
+        with self._lock:
+            if key not in self._results and key not in self._errors:
+                self._register_pending()
+            if key in self._errors:
+                raise self._errors[key]
+            return self._results[key]
+
+    def _register_pending(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        # the batched requests only support the PublishedFile entity, older
+        # sites register one by one
+        if self._publish_entity_type != "PublishedFile":
+            for key, publish_data in pending:
+                thumbnail_path = None
+                if self._thumbnail_uploader:
+                    thumbnail_path = publish_data.pop("thumbnail_path", None)
+                try:
+                    sg_publish = sgtk.util.register_publish(**publish_data)
+                except Exception as e:
+                    self._errors[key] = e
+                    continue
+                self._results[key] = sg_publish
+                if thumbnail_path:
+                    self._upload_thumbnails([(key, sg_publish, thumbnail_path)])
+            return
+
+        try:
+            created = self._create_publishes(pending)
+        except Exception as e:
+            for key, _ in pending:
+                if key not in self._results:
+                    self._errors[key] = e
+            created = [
+                (key, self._results[key], publish_data)
+                for key, publish_data in pending
+                if key in self._results
+            ]
+
+        # the publishes exist, but are not complete without their dependencies
+        # and thumbnails, so failures are reported against each of them
+        self._create_dependencies(created)
+        self._upload_thumbnails(
+            (key, sg_publish, publish_data.get("thumbnail_path"))
+            for key, sg_publish, publish_data in created
+            if publish_data.get("thumbnail_path")
+        )
+
+    def _create_publishes(self, pending):
+        requests = []
+        for key, publish_data in pending:
+            # let toolkit build the exact data register_publish would create,
+            # without the requests that are batched here instead
+            dry_run_data = dict(publish_data)
+            publish_type = dry_run_data.pop("published_file_type", None)
+            for arg in ("thumbnail_path", "dependency_paths", "dependency_ids"):
+                dry_run_data.pop(arg, None)
+            data = sgtk.util.register_publish(dry_run=True, **dry_run_data)
+            data.pop("type", None)
+            if publish_type:
+                data[
+                    "published_file_type"
+                ] = self._publish_type_cache.get_or_create(publish_type)
+
+            requests.append(
+                {
+                    "request_type": "create",
+                    "entity_type": self._publish_entity_type,
+                    "data": data,
+                }
+            )
+
+        created = []
+        for chunk in _chunks(list(zip(pending, requests)), self._batch_size):
+            results = self._tk.shotgun.batch([request for _, request in chunk])
+            for ((key, publish_data), _), sg_publish in zip(chunk, results):
+                self._results[key] = sg_publish
+                created.append((key, sg_publish, publish_data))
+        return created
+
+    def _create_dependencies(self, created):
+        dependency_paths = set()
+        for _, _, publish_data in created:
+            dependency_paths.update(publish_data.get("dependency_paths") or [])
+
+        # all the dependencies are resolved with a single query
+        dependencies = {}
+        if dependency_paths:
+            try:
+                dependencies = sgtk.util.find_publish(
+                    self._tk, sorted(dependency_paths), fields=["id"]
+                )
+            except Exception as e:
+                for key, sg_publish, publish_data in created:
+                    if publish_data.get("dependency_paths"):
+                        self._incomplete(key, sg_publish, "dependencies", e)
+
+        requests = []
+        for key, sg_publish, publish_data in created:
+            if key in self._errors:
+                continue
+            dependency_ids = set(publish_data.get("dependency_ids") or [])
+            for path in publish_data.get("dependency_paths") or []:
+                if path in dependencies:
+                    dependency_ids.add(dependencies[path]["id"])
+
+            for dependency_id in sorted(dependency_ids):
+                requests.append(
+                    (
+                        key,
+                        {
+                            "request_type": "create",
+                            "entity_type": "PublishedFileDependency",
+                            "data": {
+                                "published_file": sg_publish,
+                                "dependent_published_file": {
+                                    "type": "PublishedFile",
+                                    "id": dependency_id,
+                                },
+                            },
+                        },
+                    )
+                )
+
+        for chunk in _chunks(requests, self._batch_size):
+            try:
+                self._tk.shotgun.batch([request for _, request in chunk])
+            except Exception as e:
+                for key, request in chunk:
+                    self._incomplete(
+                        key, request["data"]["published_file"], "dependencies", e
+                    )
+
+    def _upload_thumbnails(self, thumbnails):
+        for key, sg_publish, thumbnail_path in thumbnails:
+            try:
+                if self._thumbnail_uploader:
+                    self._thumbnail_uploader.attach(sg_publish, thumbnail_path)
+                else:
+                    self._tk.shotgun.upload_thumbnail(
+                        sg_publish["type"], sg_publish["id"], thumbnail_path
+                    )
+            except Exception as e:
+                self._incomplete(key, sg_publish, "thumbnail", e)
+
+    def _incomplete(self, key, sg_publish, what, exception):
+        """
+        Records the error of a publish that was created without some of its
+        data, so getting its result raises it.
+        """
+        self._errors[key] = IncompletePublishError(
+            "Publish %s was created, but its %s could not be registered: %s"
+            % (sg_publish["id"], what, exception),
+            sg_publish,
+        )
@@ -0,0 +1,86 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Objects shared by all the items of a publish session.
+
+The publish plugins process items one at a time, these helpers keep the
+objects that work across items on the root item of the publish tree, so they
+live as long as the publish session.
+"""
+
+import sgtk
+
+from .publish_pipeline import PublishPipeline
+from .publish_registration import PublishRegistrar
+from .publish_versions import VersionAllocator
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _root_item(item):
+    root_item = item
+    while root_item.parent:
+        root_item = root_item.parent
+    return root_item
+
+
+def get_version_allocator(item):
+    """
+    Returns the version allocator shared by all the items of the publish
+    session, see :class:`VersionAllocator`.
+    """
+    root_item = _root_item(item)
+    version_allocator = root_item.properties.get("version_allocator")
+    if version_allocator is None:
+        engine = sgtk.platform.current_engine()
+        version_allocator = VersionAllocator(engine.sgtk, engine.publish_type_cache)
+        root_item.properties["version_allocator"] = version_allocator
+    return version_allocator
+
+
+def get_publish_registrar(item):
+    """
+    Returns the publish registrar shared by all the items of the publish
+    session, see :class:`PublishRegistrar`.
+    """
+    root_item = _root_item(item)
+    publish_registrar = root_item.properties.get("publish_registrar")
+    if publish_registrar is None:
+        engine = sgtk.platform.current_engine()
+        publish_registrar = PublishRegistrar(
+            engine.sgtk, engine.publish_type_cache, engine.thumbnail_uploader
+        )
+        root_item.properties["publish_registrar"] = publish_registrar
+    return publish_registrar
+
+
+def get_publish_pipeline(item, name, transfer_workers=1):
+    """
+    Returns a publish pipeline of the publish session, see
+    :class:`PublishPipeline`. All the pipelines register through the shared
+    publish registrar.
+
+    :param item: Item of the publish session.
+    :param str name: Name of the pipeline, usually one per publish plugin.
+    :param int transfer_workers: Number of publishes the pipeline transfers
+        at the same time, when it is created.
+    """
+    root_item = _root_item(item)
+    key = "%s_publish_pipeline" % name
+    publish_pipeline = root_item.properties.get(key)
+    if publish_pipeline is None:
+        publish_pipeline = PublishPipeline(
+            get_publish_registrar(item), transfer_workers
+        )
+        root_item.properties[key] = publish_pipeline
+    return publish_pipeline
@@ -0,0 +1,132 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Session wide cache of publish types.
+
+Publish types rarely change, so instead of looking a publish type up by name
+every time a publish is found or registered, :class:`PublishTypeCache` reads
+all of them once and resolves their names locally.
+"""
+
+import threading
+
+import sgtk
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _entity(publish_type):
+    if not publish_type:
+        return None
+    return {"type": publish_type["type"], "id": publish_type["id"]}
+
+
+class PublishTypeCache(object):
+    """
+    Resolves publish type names to publish type entities.
+
+    All the publish types are read the first time one is needed. Publish
+    types created since then are looked up, or created, one by one and added
+    to the cache. Names of publish types that do not exist are remembered
+    too, until they are created through the cache or it is cleared.
+    """
+
+    def __init__(self, tk):
+        """
+        :param tk: Toolkit API instance.
+        """
+        self._tk = tk
+        # guards the cache, never held while talking to Shotgun
+        self._lock = threading.Lock()
+        # serializes get_or_create, so a publish type is only created once
+        self._create_lock = threading.Lock()
+        # {name: publish type entity, or None if there is no such type}
+        self._publish_types = None
+
+        if sgtk.util.get_published_file_entity_type(tk) == "PublishedFile":
+            self.entity_type = "PublishedFileType"
+            self.field = "published_file_type"
+        else:
+            self.entity_type = "TankType"
+            self.field = "tank_type"
+
+    def warm(self):
+        """
+        Reads all the publish types, if they have not been read yet.
+        """
+        with self._lock:
+            if self._publish_types is not None:
+                return
+
+        publish_types = dict(
+            (publish_type["code"], publish_type)
+            for publish_type in self._tk.shotgun.find(self.entity_type, [], ["code"])
+        )
+
+        with self._lock:
+            if self._publish_types is None:
+                self._publish_types = publish_types
+
+    def clear(self, *args):
+        """
+        Forgets all the publish types, they are read again when needed.
+        """
+        with self._lock:
+            self._publish_types = None
+
+    def _find(self, name):
+        return self._tk.shotgun.find_one(
+            self.entity_type, [["code", "is", name]], ["code"]
+        )
+
+    def _store(self, name, publish_type):
+        with self._lock:
+            if self._publish_types is not None:
+                self._publish_types[name] = publish_type
+
+    def get(self, name):
+        """
+        Returns the publish type entity of the given name, or None if there
+        is no such publish type.
+        """
+        self.warm()
+        with self._lock:
+            publish_types = self._publish_types or {}
+            if name in publish_types:
+                return _entity(publish_types[name])
+
+        # it may have been created since the publish types were read
+        publish_type = self._find(name)
+        self._store(name, publish_type)
+        return _entity(publish_type)
+
+    def get_or_create(self, name):
+        """
+        Returns the publish type entity of the given name, creating the
+        publish type if it does not exist, like sgtk.util.register_publish
+        does.
+        """
+        with self._create_lock:
+            publish_type = self.get(name)
+            if publish_type:
+                return publish_type
+
+            # the name may be cached as missing, check again before creating
+            publish_type = self._find(name)
+            if not publish_type:
+                publish_type = self._tk.shotgun.create(
+                    self.entity_type, {"code": name}
+                )
+                publish_type["code"] = name
+            self._store(name, publish_type)
+            return _entity(publish_type)
@@ -0,0 +1,200 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Allocation of publish version numbers.
+
+The next version of a publish only depends on the latest one, so instead of
+finding every previous publish, :class:`VersionAllocator` asks Shotgun for the
+highest version of each publish name, for all the items of a publish session
+at once.
+"""
+
+import threading
+
+import sgtk
+
+from . import publish_types
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _entity_key(entity):
+    return (entity["type"], entity["id"]) if entity else None
+
+
+class VersionAllocator(object):
+    """
+    Allocates the version numbers of the publishes of a publish session.
+
+    The latest publish of every name is looked up once and versions handed
+    out are remembered, so items publishing under the same name in the same
+    session get consecutive versions.
+    """
+
+    def __init__(self, tk, publish_type_cache=None):
+        """
+        :param tk: Toolkit API instance.
+        :param publish_type_cache: :class:`PublishTypeCache` to resolve the
+            publish types with, a new one is used if not given.
+        """
+        self._tk = tk
+        self._lock = threading.Lock()
+        self._latest_publishes = {}
+        self._allocated_versions = {}
+
+        self._publish_entity_type = sgtk.util.get_published_file_entity_type(tk)
+        self._publish_type_cache = (
+            publish_type_cache or publish_types.PublishTypeCache(tk)
+        )
+
+    def _key(self, context, name, publish_type):
+        return (
+            _entity_key(context.project),
+            _entity_key(context.entity),
+            _entity_key(context.task),
+            name,
+            publish_type,
+        )
+
+    def _filters(self, context, publish_type):
+        """
+        Returns the filters the publish plugins always used to find
+        publishes, or None if the publish type does not exist, in which case
+        there are no publishes to find.
+        """
+        filters = [["project", "is", context.project]]
+        if context.entity:
+            filters.append(["entity", "is", context.entity])
+        if context.task:
+            filters.append(["task", "is", context.task])
+        if publish_type:
+            publish_type_entity = self._publish_type_cache.get(publish_type)
+            if not publish_type_entity:
+                return None
+            filters.append(
+                [self._publish_type_cache.field, "is", publish_type_entity]
+            )
+        return filters
+
+    def prefetch(self, context, publish_type, names):
+        """
+        Looks up the latest publish of each of the given names with two
+        queries: one for the highest version of every name, and one for the
+        publishes at those versions.
+
+        :param context: Context of the publishes.
+        :param str publish_type: Publish type of the publishes.
+        :param list names: Names of the publishes.
+        """
+        names = sorted(
+            set(
+                name
+                for name in names
+                if self._key(context, name, publish_type) not in self._latest_publishes
+            )
+        )
+        if not names:
+            return
+
+        filters = self._filters(context, publish_type)
+        latest_versions = {}
+        if filters is not None:
+            filters.append(["name", "in", names])
+            summary = self._tk.shotgun.summarize(
+                self._publish_entity_type,
+                filters,
+                [{"field": "version_number", "type": "maximum"}],
+                grouping=[{"field": "name", "type": "exact", "direction": "asc"}],
+            )
+            for group in summary["groups"]:
+                version = group["summaries"]["version_number"]
+                if version is not None:
+                    latest_versions[group["group_value"]] = version
+
+        latest_publishes = {}
+        if latest_versions:
+            filters = self._filters(context, publish_type)
+            filters.append(
+                {
+                    "filter_operator": "any",
+                    "filters": [
+                        {
+                            "filter_operator": "all",
+                            "filters": [
+                                ["name", "is", name],
+                                ["version_number", "is", version],
+                            ],
+                        }
+                        for name, version in latest_versions.items()
+                    ],
+                }
+            )
+            for sg_publish in self._tk.shotgun.find(
+                self._publish_entity_type, filters, ["name", "version_number", "path"]
+            ):
+                latest_publishes[sg_publish["name"]] = sg_publish
+
+        with self._lock:
+            for name in names:
+                key = self._key(context, name, publish_type)
+                self._latest_publishes[key] = latest_publishes.get(name)
+
+    def latest_publish(self, context, name, publish_type):
+        """
+        Returns the latest publish of the given name, as a dictionary with
+        the version_number and path fields, or None if there is none.
+        """
+        key = self._key(context, name, publish_type)
+        with self._lock:
+            if key in self._latest_publishes:
+                return self._latest_publishes[key]
+
+        sg_publish = None
+        filters = self._filters(context, publish_type)
+        if filters is not None:
+            filters.append(["name", "is", name])
+            sg_publish = self._tk.shotgun.find_one(
+                self._publish_entity_type,
+                filters,
+                ["name", "version_number", "path"],
+                order=[{"field_name": "version_number", "direction": "desc"}],
+            )
+
+        with self._lock:
+            self._latest_publishes[key] = sg_publish
+        return sg_publish
+
+    def next_version(self, context, name, publish_type):
+        """
+        Allocates the next version of the publish of the given name.
+
+        :returns: The version number.
+        """
+        latest_publish = self.latest_publish(context, name, publish_type)
+        key = self._key(context, name, publish_type)
+        with self._lock:
+            latest_version = max(
+                (latest_publish or {}).get("version_number") or 0,
+                self._allocated_versions.get(key, 0),
+            )
+            version = latest_version + 1
+            self._allocated_versions[key] = version
+        return version
+
+    def latest_publish_path(self, context, name, publish_type):
+        """
+        Returns the local path of the latest publish of the given name, or
+        None.
+        """
+        latest_publish = self.latest_publish(context, name, publish_type)
+        return ((latest_publish or {}).get("path") or {}).get("local_path")
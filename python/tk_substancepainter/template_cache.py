@@ -0,0 +1,140 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Memoization of template field resolution.
+
+Collecting and publishing resolve the same templates against the same paths
+and context once per item. The engine keeps a :class:`TemplateCache` for the
+session and clears it whenever the context changes or the project is saved.
+"""
+
+import os
+import threading
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _context_key(context):
+    """
+    Returns a hashable key identifying a context.
+    """
+
+    def entity_key(entity):
+        return (entity["type"], entity["id"]) if entity else None
+
+    return (
+        entity_key(context.project),
+        entity_key(context.entity),
+        entity_key(context.step),
+        entity_key(context.task),
+        entity_key(context.user),
+        tuple(entity_key(entity) for entity in context.additional_entities),
+    )
+
+
+def _fields_key(fields):
+    """
+    Returns a hashable key for a dictionary of template fields, or None if
+    any of its values is not hashable.
+    """
+    try:
+        key = frozenset(fields.items())
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class TemplateCache(object):
+    """
+    Caches the results of resolving templates against paths, contexts and
+    fields. All the methods return copies, so callers are free to modify
+    them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path_fields = {}
+        self._context_fields = {}
+        self._paths = {}
+
+    def clear(self, *args):
+        """
+        Forgets all the cached results.
+        """
+        with self._lock:
+            self._path_fields = {}
+            self._context_fields = {}
+            self._paths = {}
+
+    def get_fields(self, template, path):
+        """
+        Cached version of `template.get_fields(path)`.
+
+        :returns: A dictionary of fields, or None if the path does not match
+            the template.
+        """
+        key = (template.name, os.path.normpath(path))
+        with self._lock:
+            if key in self._path_fields:
+                fields = self._path_fields[key]
+                return dict(fields) if fields is not None else None
+
+        try:
+            fields = template.get_fields(path)
+        except Exception:
+            fields = None
+
+        with self._lock:
+            self._path_fields[key] = fields
+        return dict(fields) if fields is not None else None
+
+    def validate(self, template, path):
+        """
+        Cached version of `template.validate(path)`.
+        """
+        return self.get_fields(template, path) is not None
+
+    def context_fields(self, template, context):
+        """
+        Cached version of `context.as_template_fields(template)`.
+        """
+        key = (template.name, _context_key(context))
+        with self._lock:
+            if key in self._context_fields:
+                return dict(self._context_fields[key])
+
+        fields = context.as_template_fields(template)
+
+        with self._lock:
+            self._context_fields[key] = fields
+        return dict(fields)
+
+    def apply_fields(self, template, fields):
+        """
+        Cached version of `template.apply_fields(fields)`.
+        """
+        fields_key = _fields_key(fields)
+        if fields_key is None:
+            return template.apply_fields(fields)
+
+        key = (template.name, fields_key)
+        with self._lock:
+            if key in self._paths:
+                return self._paths[key]
+
+        path = template.apply_fields(fields)
+
+        with self._lock:
+            self._paths[key] = path
+        return path
@@ -0,0 +1,110 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Reverse index from paths to the templates that could match them.
+
+Finding the template a path belongs to usually means validating the path
+against every template in the configuration. :class:`TemplateIndex` keeps
+the templates in a trie keyed by the static folders their paths start with,
+so only the templates sharing a path prefix need to be validated.
+"""
+
+import os
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _split_path(path):
+    """
+    Splits a path into its normalized components.
+    """
+    path = os.path.normcase(os.path.normpath(path))
+    return [component for component in path.split(os.sep) if component]
+
+
+def _static_prefix(template):
+    """
+    Returns the path components a template always starts with, that is its
+    root followed by the folders of its definition up to the first one
+    holding a key or an optional section.
+    """
+    components = _split_path(template.root_path)
+    for component in template.definition.replace("\\", "/").split("/"):
+        if not component:
+            continue
+        if "{" in component or "[" in component:
+            break
+        components.append(os.path.normcase(component))
+    return components
+
+
+class _TrieNode(object):
+    __slots__ = ("children", "templates")
+
+    def __init__(self):
+        self.children = {}
+        self.templates = []
+
+
+class TemplateIndex(object):
+    """
+    Prefix trie of the path templates of a configuration.
+    """
+
+    def __init__(self, templates):
+        """
+        :param dict templates: Dictionary of templates by name, as found in
+            `tk.templates`. Only path templates are indexed.
+        """
+        self._root = _TrieNode()
+        for name in sorted(templates):
+            template = templates[name]
+            if not hasattr(template, "root_path"):
+                continue
+            node = self._root
+            for component in _static_prefix(template):
+                node = node.children.setdefault(component, _TrieNode())
+            node.templates.append(template)
+
+    def candidates(self, path):
+        """
+        Returns the templates that could match the given path, the ones with
+        the longest static prefix in common with the path first.
+        """
+        found = []
+        node = self._root
+        found.append(node.templates)
+        for component in _split_path(path):
+            node = node.children.get(component)
+            if node is None:
+                break
+            found.append(node.templates)
+
+        return [template for templates in reversed(found) for template in templates]
+
+    def template_from_path(self, path, template_cache=None):
+        """
+        Returns the most specific template matching the given path, or None.
+
+        :param str path: Path to find a template for.
+        :param template_cache: Optional :class:`TemplateCache` to validate
+            the candidates with.
+        """
+        for template in self.candidates(path):
+            if template_cache:
+                matches = template_cache.validate(template, path)
+            else:
+                matches = template.validate(path)
+            if matches:
+                return template
+        return None
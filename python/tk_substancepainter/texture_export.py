@@ -0,0 +1,466 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Texture export for Substance Painter
+
+"""
+
+import os
+import time
+
+import substance_painter
+from sgtk.platform.qt import QtCore, QtGui
+
+from .export_manifest import ExportManifest, has_udim_tiles, parse_map_name
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def all_texture_set_names():
+    """
+    Returns the names of all the texture sets in the current project.
+    """
+    return [
+        texture_set.name()
+        for texture_set in substance_painter.textureset.all_texture_sets()
+    ]
+
+
+# image formats Qt uses for images with 16 bits per channel
+SIXTEEN_BIT_IMAGE_FORMATS = (
+    "Format_RGBA64",
+    "Format_RGBA64_Premultiplied",
+    "Format_RGBX64",
+    "Format_Grayscale16",
+)
+
+
+def texture_set_resolution(texture_set_name):
+    """
+    Returns the (width, height) of the given texture set or None if it can't
+    be determined.
+    """
+    try:
+        texture_set = substance_painter.textureset.TextureSet.from_name(
+            texture_set_name
+        )
+        resolution = texture_set.get_resolution()
+    except Exception:
+        return None
+    return (resolution.width, resolution.height)
+
+
+def texture_set_has_uv_tiles(texture_set_name):
+    """
+    Returns whether the given texture set uses UV tiles (UDIMs) or None if it
+    can't be determined.
+    """
+    try:
+        texture_set = substance_painter.textureset.TextureSet.from_name(
+            texture_set_name
+        )
+        return bool(texture_set.has_uv_tiles())
+    except Exception:
+        return None
+
+
+def image_bit_depth(path):
+    """
+    Returns the bits per channel of the given image, read from its header,
+    or None for formats Qt can't read.
+    """
+    image_format = QtGui.QImageReader(path).imageFormat()
+    if image_format == QtGui.QImage.Format_Invalid:
+        return None
+    for format_name in SIXTEEN_BIT_IMAGE_FORMATS:
+        if image_format == getattr(QtGui.QImage, format_name, None):
+            return 16
+    return 8
+
+
+def add_texture_set_to_manifest(manifest, texture_set_name, texture_set_maps):
+    """
+    Adds the maps of a texture set to an export manifest, hashing the maps
+    that changed since they were last added. Qt events are processed after
+    every map hashed, so Substance Painter stays responsive.
+
+    :param manifest: :class:`ExportManifest` of the export folder.
+    :param str texture_set_name: Name of the texture set.
+    :param dict texture_set_maps: Exported maps of the form {map name: path}
+    :returns: The names of the files of the maps added.
+    """
+    uv_tiles = texture_set_has_uv_tiles(texture_set_name)
+    if uv_tiles is None:
+        uv_tiles = has_udim_tiles(texture_set_maps)
+
+    file_names = []
+    resolution = None
+    for map_name, map_path in texture_set_maps.items():
+        if not os.path.isfile(map_path):
+            continue
+        file_names.append(os.path.basename(map_path))
+
+        entry = manifest.current_entry(map_path)
+        if entry:
+            # the texture set may have gained or lost its UV tiles
+            entry["channel"], entry["udim"] = parse_map_name(
+                texture_set_name, map_name, uv_tiles
+            )
+            continue
+
+        if resolution is None:
+            resolution = texture_set_resolution(texture_set_name)
+        manifest.add_map(
+            texture_set_name,
+            map_name,
+            map_path,
+            resolution=resolution,
+            bit_depth=image_bit_depth(map_path),
+            uv_tiles=uv_tiles,
+        )
+        QtCore.QCoreApplication.processEvents()
+    return file_names
+
+
+def update_export_manifest(export_path, maps):
+    """
+    Writes the manifest of the given export folder, see
+    :class:`ExportManifest`. Files that did not change since the manifest was
+    last written keep their entry.
+
+    :param str export_path: Folder the maps were exported to.
+    :param dict maps: Exported maps of the form {texture set name: {map name: path}}
+    :returns: The :class:`ExportManifest` instance.
+    """
+    manifest = ExportManifest.load(export_path) or ExportManifest(export_path)
+
+    file_names = []
+    for texture_set_name, texture_set_maps in maps.items():
+        file_names.extend(
+            add_texture_set_to_manifest(manifest, texture_set_name, texture_set_maps)
+        )
+
+    manifest.retain(file_names)
+    manifest.save()
+    return manifest
+
+
+def export_texture_sets(export_path, texture_set_names, export_preset):
+    """
+    Exports the maps of the given texture sets.
+
+    :param str export_path: Folder to export the maps to.
+    :param list texture_set_names: Names of the texture sets to export.
+    :param str export_preset: Url of the export preset resource to use.
+    :returns: A dictionary of the form {texture set name: {map name: path}}
+        where the map name is the name of the exported file with no
+        extension.
+    """
+    config = {
+        "exportShaderParams": False,
+        "exportPath": export_path,
+        "defaultExportPreset": export_preset,
+        "exportList": [{"rootPath": name} for name in texture_set_names],
+    }
+
+    result = substance_painter.export.export_project_textures(config)
+    if result.status != substance_painter.export.ExportStatus.Success:
+        raise Exception(f"Texture export failed: {result.message}")
+
+    maps = {}
+    for (texture_set_name, _), texture_files in result.textures.items():
+        texture_set_maps = maps.setdefault(texture_set_name, {})
+        for texture_file in texture_files:
+            map_name, _ = os.path.splitext(os.path.basename(texture_file))
+            texture_set_maps[map_name] = texture_file
+    return maps
+
+
+class TextureExportJob(object):
+    """
+    Exports texture sets one at a time, so the export can report its progress
+    as maps are written and can be cancelled between texture sets.
+
+    Substance Painter can only export from the main thread, so the job keeps
+    the user interface responsive by processing events after each texture set.
+    """
+
+    def __init__(self, export_path, texture_set_names, export_preset, tracker=None):
+        """
+        :param str export_path: Folder to export the maps to.
+        :param list texture_set_names: Names of the texture sets to export.
+        :param str export_preset: Url of the export preset resource to use.
+        :param tracker: Optional :class:`TextureSetTracker`. When given, only
+            the texture sets that changed since the last export are exported
+            and the previous maps are reported for the rest.
+        """
+        self._export_path = export_path
+        self._texture_set_names = texture_set_names
+        self._export_preset = export_preset
+        self._tracker = tracker
+        self.cancelled = False
+        self.manifest = None
+
+    def cancel(self):
+        """
+        Stops the export once the texture set being exported is done.
+        """
+        self.cancelled = True
+
+    def run(self, map_exported_callback=None, progress_callback=None):
+        """
+        Runs the export.
+
+        :param map_exported_callback: Called as maps become available, with
+            the texture set name, the map name and the path to the map.
+        :param progress_callback: Called after each texture set with the
+            number of texture sets done, the total and the estimated seconds
+            left.
+        :returns: A dictionary of the form {texture set name: {map name: path}}
+            holding the maps exported before the job finished or was cancelled.
+            The manifest of the export folder is updated to match, see
+            :attr:`manifest`.
+        """
+        maps = {}
+
+        texture_set_names = self._texture_set_names
+        if self._tracker:
+            dirty_texture_sets = self._tracker.dirty_texture_sets(
+                self._export_path, self._export_preset, texture_set_names
+            )
+            for texture_set_name in texture_set_names:
+                if texture_set_name not in dirty_texture_sets:
+                    maps[texture_set_name] = self._tracker.exported_maps(
+                        self._export_path, self._export_preset, texture_set_name
+                    )
+            texture_set_names = dirty_texture_sets
+
+        # the maps are hashed as their texture set is exported, instead of
+        # all at the end
+        manifest = ExportManifest.load(self._export_path) or ExportManifest(
+            self._export_path
+        )
+        file_names = []
+        for texture_set_name, texture_set_maps in maps.items():
+            file_names.extend(
+                add_texture_set_to_manifest(
+                    manifest, texture_set_name, texture_set_maps
+                )
+            )
+
+        if map_exported_callback:
+            for texture_set_name, texture_set_maps in maps.items():
+                for map_name, map_path in texture_set_maps.items():
+                    map_exported_callback(texture_set_name, map_name, map_path)
+
+        start_time = time.perf_counter()
+        total = len(texture_set_names)
+        for index, texture_set_name in enumerate(texture_set_names):
+            if self.cancelled:
+                break
+
+            texture_set_maps = export_texture_sets(
+                self._export_path, [texture_set_name], self._export_preset
+            ).get(texture_set_name, {})
+            maps[texture_set_name] = texture_set_maps
+            file_names.extend(
+                add_texture_set_to_manifest(
+                    manifest, texture_set_name, texture_set_maps
+                )
+            )
+
+            if self._tracker:
+                self._tracker.record_export(
+                    self._export_path,
+                    self._export_preset,
+                    texture_set_name,
+                    texture_set_maps,
+                )
+
+            if map_exported_callback:
+                for map_name, map_path in texture_set_maps.items():
+                    map_exported_callback(texture_set_name, map_name, map_path)
+
+            if progress_callback:
+                done = index + 1
+                elapsed = time.perf_counter() - start_time
+                progress_callback(done, total, elapsed / done * (total - done))
+
+            QtCore.QCoreApplication.processEvents()
+
+        manifest.retain(file_names)
+        manifest.save()
+        self.manifest = manifest
+
+        return maps
+
+
+def _map_stats(maps):
+    """
+    Returns the size, modification time and inode of every map, or None for
+    the maps that are gone, as a dictionary of the form {path: stat}.
+    """
+    stats = {}
+    for path in maps.values():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stats[path] = None
+            continue
+        stats[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    return stats
+
+
+class TextureSetTracker(object):
+    """
+    Keeps track of which texture sets changed since they were last exported.
+
+    Every texture set has a revision number that is bumped whenever it is
+    edited. Exports record the revision they were made at, per export path
+    and preset, so a texture set only needs exporting again when its revision
+    moved on or any of its previously exported maps is gone or was modified
+    since.
+    """
+
+    def __init__(self):
+        self._revisions = {}
+        # bumped by the project wide changes, that affect all texture sets
+        self._project_revision = 0
+        # {(export path, export preset): {texture set name: (revision,
+        #                                 {map name: path}, {path: stat})}}
+        self._exports = {}
+
+    def connect(self):
+        """
+        Starts listening to Substance Painter events. Must be run in the main
+        thread.
+        """
+        dispatcher = substance_painter.event.DISPATCHER
+        dispatcher.connect(
+            substance_painter.event.LayerStacksModelDataChanged,
+            self._on_layer_stacks_changed,
+        )
+        for event_type in self._project_changed_events():
+            dispatcher.connect(event_type, self._on_project_changed)
+        for event_type in self._reset_events():
+            dispatcher.connect(event_type, self.reset)
+
+    def disconnect(self):
+        """
+        Stops listening to Substance Painter events.
+        """
+        dispatcher = substance_painter.event.DISPATCHER
+        dispatcher.disconnect(
+            substance_painter.event.LayerStacksModelDataChanged,
+            self._on_layer_stacks_changed,
+        )
+        for event_type in self._project_changed_events():
+            dispatcher.disconnect(event_type, self._on_project_changed)
+        for event_type in self._reset_events():
+            dispatcher.disconnect(event_type, self.reset)
+
+    def _reset_events(self):
+        return (
+            substance_painter.event.ProjectOpened,
+            substance_painter.event.ProjectCreated,
+            substance_painter.event.ProjectAboutToClose,
+        )
+
+    def _project_changed_events(self):
+        # the mesh was reloaded or the resources used by the layers updated
+        return (
+            substance_painter.event.ProjectEditionEntered,
+            substance_painter.event.ShelfCrawlingEnded,
+        )
+
+    def _on_layer_stacks_changed(self, event):
+        # the event does not say which stack changed, but edits can only
+        # happen on the active one.
+        if not substance_painter.project.is_open():
+            return
+        try:
+            stack = substance_painter.textureset.get_active_stack()
+            texture_set_name = stack.material().name()
+        except Exception:
+            self.mark_all_dirty()
+            return
+        self.mark_dirty(texture_set_name)
+
+    def _on_project_changed(self, event):
+        self.mark_all_dirty()
+
+    def reset(self, *args):
+        """
+        Forgets about all revisions and exports.
+        """
+        self._revisions = {}
+        self._project_revision = 0
+        self._exports = {}
+
+    def mark_dirty(self, texture_set_name):
+        """
+        Flags a texture set as changed.
+        """
+        self._revisions[texture_set_name] = self._revisions.get(texture_set_name, 0) + 1
+
+    def mark_all_dirty(self):
+        """
+        Flags all the texture sets as changed.
+        """
+        self._project_revision += 1
+
+    def _revision(self, texture_set_name):
+        return (self._project_revision, self._revisions.get(texture_set_name, 0))
+
+    def _export_key(self, export_path, export_preset):
+        # maps exported with another preset can't be reused
+        return (os.path.normpath(export_path), export_preset)
+
+    def dirty_texture_sets(self, export_path, export_preset, texture_set_names):
+        """
+        Returns the texture sets that need exporting to the given path with
+        the given preset.
+        """
+        exports = self._exports.get(self._export_key(export_path, export_preset), {})
+        dirty = []
+        for name in texture_set_names:
+            revision, maps, stats = exports.get(name, (None, {}, {}))
+            if (
+                revision != self._revision(name)
+                or not maps
+                or _map_stats(maps) != stats
+            ):
+                dirty.append(name)
+        return dirty
+
+    def record_export(self, export_path, export_preset, texture_set_name, maps):
+        """
+        Records the maps a texture set was exported to at its current
+        revision.
+        """
+        exports = self._exports.setdefault(
+            self._export_key(export_path, export_preset), {}
+        )
+        exports[texture_set_name] = (
+            self._revision(texture_set_name),
+            dict(maps),
+            _map_stats(maps),
+        )
+
+    def exported_maps(self, export_path, export_preset, texture_set_name):
+        """
+        Returns the maps last exported for a texture set, as a dictionary of
+        the form {map name: path}.
+        """
+        exports = self._exports.get(self._export_key(export_path, export_preset), {})
+        return dict(exports.get(texture_set_name, (None, {}))[1])
@@ -0,0 +1,206 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Streaming of exported textures to their publish location.
+
+While Substance Painter exports textures, the export folder is watched and
+every texture is copied to the publish folder as soon as it is completely
+written, so the copy overlaps with the export of the remaining textures.
+"""
+
+import os
+import threading
+import concurrent.futures
+
+from .export_manifest import METADATA_FILE_NAMES
+from .file_transfer import copy_file, remove_file
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+POLL_INTERVAL = 0.5
+STREAMING_WORKERS = 4
+
+
+class DirectoryWatcher(object):
+    """
+    Polls a folder and reports the files in it once they are completely
+    written, that is once their size and modification time did not change
+    between two polls. Files are reported again if they change afterwards.
+    """
+
+    def __init__(self, path, file_ready_callback, poll_interval=POLL_INTERVAL):
+        """
+        :param str path: Folder to watch.
+        :param file_ready_callback: Called from the watcher thread with the
+            file name and a (size, mtime) tuple for every complete file.
+        :param float poll_interval: Seconds between polls.
+        """
+        self._path = path
+        self._file_ready_callback = file_ready_callback
+        self._poll_interval = poll_interval
+        self._pending = {}
+        self._reported = {}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="tk-substancepainter-directory-watcher"
+        )
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, final_poll=True):
+        """
+        Stops watching.
+
+        :param bool final_poll: Report every file not reported yet, as no
+            more writes are expected.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        if final_poll:
+            self._poll(final=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self._poll_interval):
+            self._poll()
+
+    def _poll(self, final=False):
+        try:
+            dir_entries = list(os.scandir(self._path))
+        except OSError:
+            return
+
+        for dir_entry in dir_entries:
+            name = dir_entry.name
+            if name in METADATA_FILE_NAMES or name.endswith(".tmp"):
+                continue
+            try:
+                if not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+
+            key = (stat.st_size, stat.st_mtime)
+            if self._reported.get(name) == key:
+                continue
+            if final or self._pending.get(name) == key:
+                self._reported[name] = key
+                self._file_ready_callback(name, key)
+            else:
+                self._pending[name] = key
+
+
+class StreamingCopier(object):
+    """
+    Copies the files written to a folder to another folder while they are
+    being written, see :class:`DirectoryWatcher`.
+    """
+
+    def __init__(self, src_path, dst_path, max_workers=STREAMING_WORKERS, logger=None):
+        """
+        :param str src_path: Folder to watch.
+        :param str dst_path: Folder to copy the files to.
+        :param int max_workers: Number of files copied at the same time.
+        :param logger: Optional logger to report the copies that failed to.
+        """
+        self._src_path = src_path
+        self._dst_path = dst_path
+        self._lock = threading.Lock()
+        self._copied = {}
+        self._futures = []
+        self._aborted = False
+        self._logger = logger
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._watcher = DirectoryWatcher(src_path, self._on_file_ready)
+
+    def start(self):
+        """
+        Starts watching the source folder.
+        """
+        self._watcher.start()
+
+    def _on_file_ready(self, name, key):
+        if self._aborted:
+            return
+        self._futures.append(self._executor.submit(self._copy, name))
+
+    def _copy(self, name, expected_hash=None):
+        if self._aborted:
+            return
+        digest = copy_file(
+            os.path.join(self._src_path, name),
+            os.path.join(self._dst_path, name),
+            expected_hash=expected_hash,
+            read_only=True,
+        )
+        with self._lock:
+            self._copied[name] = digest
+
+    def finish(self, manifest):
+        """
+        Stops watching, waits for the copies in flight and copies again any
+        file of the manifest whose copy does not have the contents the
+        manifest records. Copies of files not in the manifest are removed.
+
+        :param manifest: :class:`ExportManifest` of the source folder.
+        :returns: The list of copied files in the destination folder.
+        """
+        try:
+            self._watcher.stop()
+            for future in self._futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    # the file may have been rewritten or removed while being
+                    # copied, the manifest decides what is copied again below
+                    if self._logger:
+                        self._logger.debug("Streamed copy failed: %s" % e)
+
+            # files are hashed while copied, so copies can be checked without
+            # reading them again
+            late_copies = [
+                self._executor.submit(self._copy, file_name, entry["hash"])
+                for file_name, entry in manifest.entries.items()
+                if self._copied.get(file_name) != entry["hash"]
+            ]
+            for future in late_copies:
+                future.result()
+        finally:
+            self._executor.shutdown()
+
+        for file_name in set(self._copied) - set(manifest.entries):
+            remove_file(os.path.join(self._dst_path, file_name))
+
+        return [
+            os.path.join(self._dst_path, file_name)
+            for file_name in sorted(manifest.entries)
+        ]
+
+    def abort(self):
+        """
+        Stops watching and copying, and removes the files already copied, as
+        the export they come from is incomplete.
+        """
+        self._aborted = True
+        self._watcher.stop(final_poll=False)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        for file_name in list(self._copied):
+            try:
+                remove_file(os.path.join(self._dst_path, file_name))
+            except OSError:
+                pass
+        self._copied.clear()
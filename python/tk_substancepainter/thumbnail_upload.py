@@ -0,0 +1,148 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Background upload of publish thumbnails.
+
+The items of a publish usually share the same thumbnail.
+:class:`ThumbnailUploader` uploads every distinct image once, in a background
+thread, and shares it with all the other entities using the same image, so
+registering a publish does not wait for its thumbnail.
+"""
+
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import threading
+
+from .export_manifest import hash_file
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+class _Thumbnail(object):
+    """
+    An image uploaded as the thumbnail of an entity, and the entities waiting
+    for it to be shared with them.
+    """
+
+    def __init__(self, path, entity):
+        self.path = path
+        self.entity = entity
+        self.upload = None
+        self.pending_entities = []
+        self.share_scheduled = False
+
+
+class ThumbnailUploader(object):
+    """
+    Uploads thumbnails in a background thread, once per distinct image.
+    """
+
+    def __init__(self, tk, error_callback=None):
+        """
+        :param tk: Toolkit API instance.
+        :param error_callback: Optional function called with a message and
+            the exception when a thumbnail could not be uploaded.
+        """
+        self._tk = tk
+        self._error_callback = error_callback
+        self._lock = threading.Lock()
+        self._thumbnails = {}
+        self._temp_dir = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def attach(self, entity, thumbnail_path):
+        """
+        Queues the upload of a thumbnail for an entity. The image is uploaded
+        the first time it is seen and shared afterwards.
+
+        :param dict entity: Entity dictionary, with type and id.
+        :param str thumbnail_path: Path to the image.
+        """
+        entity = {"type": entity["type"], "id": entity["id"]}
+        image_hash = hash_file(thumbnail_path)
+
+        with self._lock:
+            thumbnail = self._thumbnails.get(image_hash)
+            if thumbnail is None:
+                # the image may be a temporary file, keep a copy of it until
+                # it is uploaded
+                thumbnail = _Thumbnail(self._keep_copy(thumbnail_path), entity)
+                thumbnail.upload = self._executor.submit(self._upload, thumbnail)
+                self._thumbnails[image_hash] = thumbnail
+                return
+
+            thumbnail.pending_entities.append(entity)
+            if not thumbnail.share_scheduled:
+                thumbnail.share_scheduled = True
+                self._executor.submit(self._share, thumbnail)
+
+    def shutdown(self):
+        """
+        Waits for the queued thumbnails and removes the copies of the images.
+        """
+        self._executor.shutdown(wait=True)
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+    def _keep_copy(self, thumbnail_path):
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix="tk-substancepainter-thumbnails-")
+        path = os.path.join(
+            self._temp_dir,
+            "%d%s" % (len(self._thumbnails), os.path.splitext(thumbnail_path)[1]),
+        )
+        shutil.copyfile(thumbnail_path, path)
+        return path
+
+    def _upload(self, thumbnail):
+        try:
+            self._tk.shotgun.upload_thumbnail(
+                thumbnail.entity["type"], thumbnail.entity["id"], thumbnail.path
+            )
+        except Exception as e:
+            self._report("Could not upload thumbnail %s" % thumbnail.path, e)
+            raise
+
+    def _share(self, thumbnail):
+        with self._lock:
+            entities = thumbnail.pending_entities
+            thumbnail.pending_entities = []
+            thumbnail.share_scheduled = False
+
+        if thumbnail.upload.exception() is not None:
+            # the image never made it, upload it again for the first entity
+            # waiting for it and share it from there, with the others too
+            entities.append(thumbnail.entity)
+            thumbnail.entity = entities.pop(0)
+            thumbnail.upload = concurrent.futures.Future()
+            try:
+                self._upload(thumbnail)
+            except Exception as e:
+                thumbnail.upload.set_exception(e)
+                return
+            thumbnail.upload.set_result(None)
+
+        if entities:
+            try:
+                self._tk.shotgun.share_thumbnail(
+                    entities, source_entity=thumbnail.entity
+                )
+            except Exception as e:
+                self._report("Could not share thumbnail %s" % thumbnail.path, e)
+
+    def _report(self, message, exception):
+        if self._error_callback:
+            self._error_callback(message, exception)
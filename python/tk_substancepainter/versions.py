@@ -0,0 +1,100 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Substance Painter version handling, shared by the launcher and the engine.
+
+Note that this module is also loaded by the launcher outside of Substance
+Painter, so it must only depend on the standard library.
+"""
+
+import re
+import functools
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+MINIMUM_SUPPORTED_VERSION = "6.2"
+
+# used when the version could not be extracted from the executable
+UNKNOWN_VERSION = "UNKNOWN_VERSION"
+
+# 2017.1.0 represents the first time the 2k style version was introduced
+# according to:
+# https://docs.substance3d.com/spdoc/all-changes-188973073.html
+FIRST_YEAR_VERSION = (2017, 1)
+
+# same components as the ones distutils LooseVersion splits a version into
+_COMPONENT_RE = re.compile(r"(\d+|[a-z]+|\.)")
+
+
+@functools.lru_cache(maxsize=None)
+def parse_version(version):
+    """
+    Splits a version string into a tuple of components, numbers being
+    converted to ints, so versions can be compared as tuples.
+
+    Results are memoized, so the same tuple is returned every time a version
+    string is parsed.
+    """
+    components = []
+    for component in _COMPONENT_RE.split(version):
+        if not component or component == ".":
+            continue
+        try:
+            components.append(int(component))
+        except ValueError:
+            components.append(component)
+    return tuple(components)
+
+
+@functools.lru_cache(maxsize=None)
+def _to_new_version_system(version):
+    parsed_version = parse_version(version)
+    if parsed_version >= FIRST_YEAR_VERSION:
+        parsed_version = (parsed_version[0] - 2014,) + parsed_version[1:]
+    return parsed_version
+
+
+def to_new_version_system(version):
+    """
+    Converts a version string into a new style version.
+
+    New version system was introduced in version 2020.1, that became
+    version 6.1.0, so we need to do some magic to normalize versions.
+    https://docs.substance3d.com/spdoc/version-2020-1-6-1-0-194216357.html
+
+    The way we support this new version system is to parse the version into
+    a tuple for comparisons. We modify the major version if the version is
+    higher than 2017.1.0 for the version to become in the style of 6.1, by
+    literally subtracting 2014 to the major version component.
+    This leaves us always with a predictable version system:
+        2.6.2  -> (2, 6, 2) (really old version)
+        2017.1 -> (3, 1)
+        2018.0 -> (4, 0)
+        2020.1 -> (6, 1) (newer version system starts)
+        6.2    -> (6, 2) ...
+
+    Results are memoized, so converting the same version again is a
+    dictionary lookup.
+
+    Note that the returned tuple is good for comparisons but NEVER for
+    printing, use the original version string for that.
+    """
+    return _to_new_version_system(str(version))
+
+
+def is_supported_version(version, minimum_version=MINIMUM_SUPPORTED_VERSION):
+    """
+    Returns True if the given version is not older than the minimum version.
+    """
+    return to_new_version_system(version) >= to_new_version_system(minimum_version)
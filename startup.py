@@ -13,7 +13,7 @@ import sys
 import shutil
 import hashlib
 import socket
-from distutils.version import LooseVersion
+import importlib.util
 
 ##############
 
@@ -27,44 +27,24 @@ __contact__ = "https://www.linkedin.com/in/diegogh/"
 logger = sgtk.LogManager.get_logger(__name__)
 
 
-# note that this is the same in engine.py
-MINIMUM_SUPPORTED_VERSION = "6.2"
-
-
-def to_new_version_system(version):
+def _load_versions_module():
     """
-    Converts a version string into a new style version.
-
-    New version system was introduced in version 2020.1, that became
-    version 6.1.0, so we need to do some magic to normalize versions.
-    https://docs.substance3d.com/spdoc/version-2020-1-6-1-0-194216357.html
-
-    The way we support this new version system is to use LooseVersion for
-    version comparisons. We modify the major version if the version is higher
-    than 2017.1.0 for the version to become in the style of 6.1, by literally
-    subtracting 2014 to the major version component.
-    This leaves us always with a predictable version system:
-        2.6.2  -> 2.6.2 (really old version)
-        2017.1 -> 3.1
-        2018.0 -> 4.0
-        2020.1 -> 6.1 (newer version system starts)
-        6.2    -> 6.2 ...
-
-    2017.1.0 represents the first time the 2k style version was introduced
-    according to:
-    https://docs.substance3d.com/spdoc/all-changes-188973073.html
-
-    Note that this change means that the LooseVersion is good for comparisons
-    but NEVER for printing, it would simply print the same version as
-    LooseVersion does not support rebuilding of the version string from it's
-    components
+    Loads the version handling module shared with the engine. It is loaded
+    from its file as the tk_substancepainter package can only be imported
+    from within Substance Painter.
     """
+    module_path = os.path.join(
+        os.path.dirname(__file__), "python", "tk_substancepainter", "versions.py"
+    )
+    spec = importlib.util.spec_from_file_location(
+        "tk_substancepainter_versions", module_path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-    version = LooseVersion(str(version))
 
-    if version >= LooseVersion("2017.1"):
-        version.version[0] -= 2014
-    return version
+versions = _load_versions_module()
 
 
 class SubstancePainterLauncher(SoftwareLauncher):
@@ -106,7 +86,7 @@ class SubstancePainterLauncher(SoftwareLauncher):
         """
         The minimum software version that is supported by the launcher.
         """
-        return MINIMUM_SUPPORTED_VERSION
+        return versions.MINIMUM_SUPPORTED_VERSION
 
     def prepare_launch(self, exec_path, args, file_to_open=None):
         """
@@ -125,23 +105,60 @@ class SubstancePainterLauncher(SoftwareLauncher):
         # by adding it the plugins path
         required_env["SUBSTANCE_PAINTER_PLUGINS_PATH"] = self.disk_location
 
-        # Prepare the launch environment with variables required by the
-        # classic bootstrap approach.
-        self.logger.debug(
-            "Preparing SubstancePainter Launch via Toolkit Classic methodology ..."
-        )
-
         required_env["TK_DEBUG"] = os.environ.get("TK_DEBUG") and "true" or ""
 
         if file_to_open:
             # Add the file name to open to the launch environment
             required_env["SGTK_FILE_TO_OPEN"] = file_to_open
 
+        # Check if there are any built-in plugins to bootstrap toolkit with,
+        # otherwise use the classic bootstrap.
+        load_plugins = self._get_builtin_plugins()
+        if load_plugins:
+            self.logger.debug(
+                "Preparing SubstancePainter Launch via Toolkit plugins %s ..."
+                % load_plugins
+            )
+            required_env["SGTK_LOAD_SUBSTANCEPAINTER_PLUGINS"] = os.pathsep.join(
+                load_plugins
+            )
+
+            # the plugins bootstrap toolkit using the entity and site from the
+            # standard plugin environment.
+            required_env.update(self.get_standard_plugin_environment())
+            return LaunchInformation(exec_path, args, required_env)
+
+        # Prepare the launch environment with variables required by the
+        # classic bootstrap approach.
+        self.logger.debug(
+            "Preparing SubstancePainter Launch via Toolkit Classic methodology ..."
+        )
+
         required_env["SGTK_ENGINE"] = self.engine_name
         required_env["SGTK_CONTEXT"] = sgtk.context.serialize(self.context)
 
+        if self.get_setting("background_bootstrap"):
+            # start the engine from a worker thread inside Substance Painter
+            required_env["SGTK_BACKGROUND_BOOTSTRAP"] = "1"
+
         return LaunchInformation(exec_path, args, required_env)
 
+    def _get_builtin_plugins(self):
+        """
+        Returns the paths to the engine plugins listed in the
+        launch_builtin_plugins setting that exist on disk.
+        """
+        load_plugins = []
+        for plugin_name in self.get_setting("launch_builtin_plugins") or []:
+            plugin_path = os.path.join(self.disk_location, "plugins", plugin_name)
+            if os.path.isdir(plugin_path):
+                load_plugins.append(plugin_path)
+            else:
+                self.logger.warning(
+                    "Plugin '%s' could not be found in %s" % (plugin_name, plugin_path)
+                )
+        return load_plugins
+
     def _icon_from_engine(self):
         """
         Use the default engine icon as substancepainter does not supply
@@ -186,17 +203,15 @@ class SubstancePainterLauncher(SoftwareLauncher):
 
         # we support cases were we could not extract the version number
         # from the binary/executable
-        if sw_version.version == UNKNOWN_VERSION:
+        if sw_version.version == versions.UNKNOWN_VERSION:
             return (True, "")
 
-        # convert to new version system if required
-        version = to_new_version_system(sw_version.version)
-
-        # second, compare against the minimum version
+        # second, compare against the minimum version, converting to the new
+        # version system if required
         if self.minimum_supported_version:
-            min_version = to_new_version_system(self.minimum_supported_version)
-
-            if version < min_version:
+            if not versions.is_supported_version(
+                sw_version.version, self.minimum_supported_version
+            ):
                 # the version is older than the minimum supported version
                 return (
                     False,
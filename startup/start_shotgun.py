@@ -15,6 +15,13 @@ It sets up the Toolkit context and prepares the tk-substancepainter engine.
 
 import os
 import sys
+import time
+import queue
+import atexit
+import logging
+import importlib
+import logging.handlers
+import threading
 import traceback
 
 import substancepainter_initialize.shelf
@@ -23,6 +30,147 @@ __author__ = "Diego Garcia Huerta"
 __email__ = "diegogh2000@gmail.com"
 
 
+# file logging, same rotation policy as the toolkit base file handler
+LOG_FILE_MAX_BYTES = 1024 * 1024 * 5
+LOG_FILE_BACKUP_COUNT = 1
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 500
+
+# the writer for the tk-substancepainter log, see start_toolkit
+_log_writer = None
+
+
+class _BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that only flushes to disk when told to, so a batch
+    of records costs a single write to the underlying file.
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that drops records when the queue is full, so the threads
+    logging, often Substance Painter's main thread, never wait for the writer.
+    The records dropped are counted, see :meth:`take_dropped`.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def take_dropped(self):
+        """
+        Returns the number of records dropped since last called.
+        """
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        return dropped
+
+
+class _GlobalDebugFilter(logging.Filter):
+    """
+    Lets debug records through only while toolkit debug logging is on, like
+    the toolkit base file handler, whose level follows
+    LogManager.global_debug, including when it is toggled from the engine.
+    """
+
+    def __init__(self, log_manager):
+        super().__init__()
+        self._log_manager = log_manager
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self._log_manager.global_debug
+
+
+class AsyncFileLogWriter(object):
+    """
+    Writes log records to a rotating log file from a dedicated thread.
+
+    Threads emitting log records only pay for putting them in a bounded
+    queue, the writer thread drains the queue in batches and flushes the file
+    once per batch.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue(LOG_QUEUE_SIZE)
+
+        self._file_handler = _BatchedRotatingFileHandler(
+            path,
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUP_COUNT,
+            encoding="utf8",
+        )
+        self._file_handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s [%(process) 5d %(levelname)-7s] %(name)s - %(message)s"
+            )
+        )
+
+        self.handler = _BoundedQueueHandler(self._queue)
+
+        self._thread = threading.Thread(
+            target=self._run, name="tk-substancepainter-log-writer"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch = [self._queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for record in batch:
+                if record is self._STOP:
+                    stopped = True
+                    continue
+                self._file_handler.handle(record)
+
+            dropped = self.handler.take_dropped()
+            if dropped:
+                self._file_handler.stream.write(
+                    f"{dropped} log records were dropped.\n"
+                )
+
+            self._file_handler.flush_batch()
+
+        self._file_handler.close()
+
+    def close(self):
+        """
+        Writes any pending record to disk and stops the writer thread.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
 def display_error(logger, msg):
     logger.error(f"Shotgun Error | SubstancePainter engine | {msg}")
     print(f"Shotgun Error | SubstancePainter engine | {msg}")
@@ -94,25 +242,54 @@ def start_toolkit_classic():
         return
 
 
-def start_toolkit():
+def start_toolkit_with_plugins():
     """
-    Import Toolkit and start up a tk-substancepainter engine based on
-    environment variables.
+    Bootstrap toolkit with the plugins listed in the environment, see
+    launch_builtin_plugins in the engine info.yml.
     """
+    import sgtk
 
-    # Verify sgtk can be loaded.
-    try:
-        import sgtk
-    except Exception as e:
-        msg = f"Shotgun: Could not import sgtk! Disabling for now: {e}"
-        print(msg)
-        return
+    logger = sgtk.LogManager.get_logger(__name__)
 
-    # start up toolkit logging to file
-    sgtk.LogManager().initialize_base_file_handler("tk-substancepainter")
+    logger.debug("Launching toolkit in plugin mode.")
+
+    plugin_paths = os.environ["SGTK_LOAD_SUBSTANCEPAINTER_PLUGINS"]
+    for plugin_path in plugin_paths.split(os.pathsep):
+        plugin_name = os.path.basename(plugin_path)
+        plugin_python_path = os.path.join(plugin_path, "python")
+        if plugin_python_path not in sys.path:
+            sys.path.insert(0, plugin_python_path)
+
+        try:
+            plugin = importlib.import_module(f"tk_substancepainter_{plugin_name}")
+            plugin.bootstrap_toolkit(plugin_path)
+        except Exception as e:
+            msg = f"Shotgun: Could not load plugin {plugin_name}. Details: {e}"
+            etype, value, tb = sys.exc_info()
+            msg += "".join(traceback.format_exception(etype, value, tb))
+            display_error(logger, msg)
 
-    # Rely on the classic boostrapping method
-    start_toolkit_classic()
+
+def _bootstrap_toolkit():
+    """
+    Start the engine, open any file requested by the launcher and clean up
+    the temporary environment variables used to pass the startup data.
+
+    This can run either on Substance Painter's main thread or on a worker
+    thread, see :func:`start_toolkit`.
+    """
+    import sgtk
+
+    logger = sgtk.LogManager.get_logger(__name__)
+
+    start_time = time.perf_counter()
+
+    if os.environ.get("SGTK_LOAD_SUBSTANCEPAINTER_PLUGINS"):
+        # the plugins do their own bootstrap
+        start_toolkit_with_plugins()
+    else:
+        # Rely on the classic boostrapping method
+        start_toolkit_classic()
 
     # Check if a file was specified to open and open it.
     file_to_open = os.environ.get("SGTK_FILE_TO_OPEN")
@@ -126,11 +303,106 @@ def start_toolkit():
         "SGTK_ENGINE",
         "SGTK_CONTEXT",
         "SGTK_FILE_TO_OPEN",
+        "SGTK_BACKGROUND_BOOTSTRAP",
+        "SGTK_LOAD_SUBSTANCEPAINTER_PLUGINS",
     ]
     for var in del_vars:
         if var in os.environ:
             del os.environ[var]
 
+    logger.debug(
+        f"Toolkit bootstrap finished in {time.perf_counter() - start_time:.3f}s "
+        f"on thread '{threading.current_thread().name}'."
+    )
+
+
+def start_file_logging():
+    """
+    Sends the toolkit log to the tk-substancepainter log file through a
+    background writer thread, so logging never waits on disk, which can be
+    slow with roaming profiles or network home directories.
+    """
+    global _log_writer
+
+    import sgtk
+
+    if _log_writer:
+        return
+
+    log_manager = sgtk.LogManager()
+    log_path = os.path.join(log_manager.log_folder, "tk-substancepainter.log")
+    try:
+        _log_writer = AsyncFileLogWriter(log_path)
+    except Exception as e:
+        print(f"Shotgun: Could not start background logging, {e}")
+        log_manager.initialize_base_file_handler("tk-substancepainter")
+        return
+
+    # the level is checked on every record, as global debug can be toggled
+    # at any time and the log manager only updates its own handlers
+    _log_writer.handler.addFilter(_GlobalDebugFilter(log_manager))
+    log_manager.root_logger.addHandler(_log_writer.handler)
+    atexit.register(stop_file_logging)
+
+
+def stop_file_logging():
+    """
+    Flushes and closes the tk-substancepainter log file.
+    """
+    global _log_writer
+
+    import sgtk
+
+    if not _log_writer:
+        return
+
+    sgtk.LogManager().root_logger.removeHandler(_log_writer.handler)
+    _log_writer.close()
+    _log_writer = None
+
+
+def start_toolkit():
+    """
+    Import Toolkit and start up a tk-substancepainter engine based on
+    environment variables.
+
+    When the launcher sets SGTK_BACKGROUND_BOOTSTRAP, the context
+    deserialization and engine startup run on a worker thread so that
+    Substance Painter can finish loading its plugins straight away. The
+    engine marshals every Qt operation back to the main thread.
+    """
+
+    # Verify sgtk can be loaded.
+    try:
+        import sgtk
+    except Exception as e:
+        msg = f"Shotgun: Could not import sgtk! Disabling for now: {e}"
+        print(msg)
+        return
+
+    # start up toolkit logging to file
+    start_file_logging()
+
+    logger = sgtk.LogManager.get_logger(__name__)
+
+    start_time = time.perf_counter()
+    if os.environ.get("SGTK_BACKGROUND_BOOTSTRAP"):
+        logger.debug("Launching toolkit in a background thread.")
+        bootstrap_thread = threading.Thread(
+            target=_bootstrap_toolkit, name="tk-substancepainter-bootstrap"
+        )
+        bootstrap_thread.daemon = True
+        bootstrap_thread.start()
+    else:
+        _bootstrap_toolkit()
+
+    # this is the time Substance Painter itself was blocked by us, which is
+    # what we are interested in when comparing both bootstrap modes.
+    logger.debug(
+        "Substance Painter startup blocked by toolkit for "
+        f"{time.perf_counter() - start_time:.3f}s."
+    )
+
 
 def start_plugin():
     """This method is called when the plugin is started."""
@@ -144,6 +416,9 @@ def close_plugin():
     if engine:
         engine.destroy()
 
+    # make sure everything logged so far ends up in the log file
+    stop_file_logging()
+
 
 if __name__ == "__main__":
     start_plugin()
@@ -0,0 +1,33 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+The tk_substancepainter package imports sgtk and Substance Painter when
+imported, so the modules tested here, which need neither, are imported from
+a bare package pointing to the same folder.
+"""
+
+import os
+import sys
+import types
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+PACKAGE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, "python", "tk_substancepainter")
+)
+
+if "tk_substancepainter" not in sys.modules:
+    package = types.ModuleType("tk_substancepainter")
+    package.__path__ = [PACKAGE_PATH]
+    sys.modules["tk_substancepainter"] = package
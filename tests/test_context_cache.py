@@ -0,0 +1,86 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+
+import pytest
+
+from tk_substancepainter.context_cache import PathContextCache
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _path(*components):
+    return os.path.join(os.path.abspath(os.sep + "assets"), *components)
+
+
+def test_paths_in_the_same_folder_share_the_context(clock):
+    cache = PathContextCache(clock=clock)
+    cache.add(_path("car", "body.fbx"), "car context")
+
+    assert cache.get(_path("car", "wheels.fbx")) == "car context"
+    assert cache.get(_path("truck", "body.fbx")) is None
+
+
+def test_entries_expire(clock):
+    cache = PathContextCache(ttl=10, clock=clock)
+    cache.add(_path("car", "body.fbx"), "car context")
+
+    clock.now = 9.9
+    assert cache.get(_path("car", "body.fbx")) == "car context"
+    clock.now = 10
+    assert cache.get(_path("car", "body.fbx")) is None
+
+
+def test_add_renews_expiry(clock):
+    cache = PathContextCache(ttl=10, clock=clock)
+    cache.add(_path("car", "body.fbx"), "old context")
+
+    clock.now = 5
+    cache.add(_path("car", "body.fbx"), "new context")
+    clock.now = 12
+    assert cache.get(_path("car", "body.fbx")) == "new context"
+
+
+def test_least_recently_used_entry_is_dropped(clock):
+    cache = PathContextCache(max_entries=2, clock=clock)
+    cache.add(_path("car", "body.fbx"), "car context")
+    cache.add(_path("truck", "body.fbx"), "truck context")
+
+    # using the car makes the truck the least recently used
+    cache.get(_path("car", "body.fbx"))
+    cache.add(_path("bike", "body.fbx"), "bike context")
+
+    assert cache.get(_path("car", "body.fbx")) == "car context"
+    assert cache.get(_path("truck", "body.fbx")) is None
+    assert cache.get(_path("bike", "body.fbx")) == "bike context"
+
+
+def test_clear(clock):
+    cache = PathContextCache(clock=clock)
+    cache.add(_path("car", "body.fbx"), "car context")
+
+    cache.clear()
+    assert cache.get(_path("car", "body.fbx")) is None
@@ -0,0 +1,280 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import json
+
+from tk_substancepainter import export_manifest
+from tk_substancepainter.export_manifest import ExportManifest
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def _settle(entry):
+    # pretend the file was hashed well after it was last modified
+    entry["hashed_at_ns"] = entry["mtime_ns"] + export_manifest.RACY_WINDOW_NS + 1
+
+
+def test_hash_file_matches_new_hash(tmp_path):
+    path = _write(tmp_path / "map.png", b"x" * (export_manifest.HASH_CHUNK_SIZE + 7))
+
+    file_hash = export_manifest.new_hash()
+    file_hash.update(b"x" * (export_manifest.HASH_CHUNK_SIZE + 7))
+    assert export_manifest.hash_file(path) == file_hash.hexdigest()
+
+
+def test_parse_map_name():
+    assert export_manifest.parse_map_name("Body", "Mesh_Body_BaseColor") == (
+        "BaseColor",
+        None,
+    )
+    assert export_manifest.parse_map_name("Body", "Body_Normal_OpenGL") == (
+        "Normal_OpenGL",
+        None,
+    )
+
+
+def test_parse_map_name_mesh_named_as_texture_set():
+    assert export_manifest.parse_map_name("Car", "Car_Car_BaseColor") == (
+        "BaseColor",
+        None,
+    )
+    assert export_manifest.parse_map_name("Base", "Mesh_Base_BaseColor") == (
+        "BaseColor",
+        None,
+    )
+
+
+def test_add_map_records_file(tmp_path):
+    path = _write(tmp_path / "Mesh_Body_BaseColor.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    entry = manifest.add_map("Body", "Mesh_Body_BaseColor", path, (1024, 1024), 8)
+
+    assert entry["file"] == "Mesh_Body_BaseColor.png"
+    assert entry["channel"] == "BaseColor"
+    assert entry["resolution"] == [1024, 1024]
+    assert entry["size"] == len(b"contents")
+    assert entry["hash"] == export_manifest.hash_file(path)
+    assert manifest.entry_for_path(path) is entry
+
+
+def test_current_entry_rejects_racy_entry(tmp_path):
+    path = _write(tmp_path / "map.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    entry = manifest.add_map("Body", "map", path)
+
+    # hashed right after being written, the file may still change unnoticed
+    assert manifest.current_entry(path) is None
+
+    _settle(entry)
+    assert manifest.current_entry(path) is entry
+
+
+def test_current_entry_rejects_modified_file(tmp_path):
+    path = _write(tmp_path / "map.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    entry = manifest.add_map("Body", "map", path)
+    _settle(entry)
+
+    _write(path, b"other contents")
+    assert manifest.current_entry(path) is None
+
+
+def test_current_entry_rejects_replaced_file(tmp_path):
+    path = _write(tmp_path / "map.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    entry = manifest.add_map("Body", "map", path)
+    _settle(entry)
+
+    # same size and modification time, but another file
+    stat = os.stat(path)
+    other_path = _write(tmp_path / "other.png", b"CONTENTS")
+    os.utime(other_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(other_path, path)
+    assert manifest.current_entry(path) is None
+
+
+def test_add_map_reuses_hash_of_current_entry(tmp_path, monkeypatch):
+    path = _write(tmp_path / "map.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    _settle(manifest.add_map("Body", "map", path))
+
+    def hash_file(path):
+        raise AssertionError("%s should not be hashed again" % path)
+
+    monkeypatch.setattr(export_manifest, "hash_file", hash_file)
+    manifest.add_map("Body", "map", path)
+
+
+def test_save_and_load(tmp_path):
+    path = _write(tmp_path / "map.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    manifest.add_map("Body", "map", path)
+    manifest.save()
+
+    loaded = ExportManifest.load(str(tmp_path))
+    assert loaded.entries == manifest.entries
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_load_rejects_other_version(tmp_path):
+    with open(ExportManifest.manifest_path(str(tmp_path)), "w") as f:
+        json.dump({"version": export_manifest.MANIFEST_VERSION + 1, "files": {}}, f)
+
+    assert ExportManifest.load(str(tmp_path)) is None
+
+
+def test_retain(tmp_path):
+    manifest = ExportManifest(str(tmp_path))
+    for name in ("a", "b"):
+        manifest.add_map("Body", name, _write(tmp_path / (name + ".png"), b"x"))
+
+    manifest.retain(["a.png"])
+    assert list(manifest.entries) == ["a.png"]
+
+
+def test_parse_map_name_udim():
+    assert export_manifest.parse_map_name(
+        "Body", "Mesh_Body_BaseColor.1001", uv_tiles=True
+    ) == ("BaseColor", 1001)
+
+
+def test_parse_map_name_ignores_suffix_without_uv_tiles():
+    assert export_manifest.parse_map_name("Body", "Mesh_Body_Layer.1999") == (
+        "Layer.1999",
+        None,
+    )
+
+
+def test_has_udim_tiles_needs_two_tiles_of_a_map():
+    assert export_manifest.has_udim_tiles(["Body_Base.1001", "Body_Base.1002"])
+    assert not export_manifest.has_udim_tiles(["Body_Layer.1999", "Body_Base"])
+    assert not export_manifest.has_udim_tiles(["Body_Base.1001", "Body_Rough.1002"])
+
+
+def test_udim_sequence_name():
+    assert (
+        export_manifest.udim_sequence_name("Body_Base.1001.png", 1001)
+        == "Body_Base.%04d.png"
+    )
+    assert export_manifest.udim_sequence_name("Body_Base.png", 1001) == (
+        "Body_Base.png"
+    )
+
+
+def test_udim_sequences(tmp_path):
+    manifest = ExportManifest(str(tmp_path))
+    for name in ("Body_Base.1002", "Body_Base.1001", "Body_Layer.1999"):
+        manifest.add_map(
+            "Body",
+            name,
+            _write(tmp_path / (name + ".png"), b"x"),
+            uv_tiles=name.startswith("Body_Base"),
+        )
+
+    sequences = manifest.udim_sequences()
+    assert list(sequences) == ["Body_Base.%04d.png"]
+    assert [entry["udim"] for entry in sequences["Body_Base.%04d.png"]] == [
+        1001,
+        1002,
+    ]
+
+
+def test_texture_set_hash_ignores_order():
+    entries = [{"file": "a.png", "hash": "1"}, {"file": "b.png", "hash": "2"}]
+    assert export_manifest.texture_set_hash(entries) == (
+        export_manifest.texture_set_hash(list(reversed(entries)))
+    )
+    assert export_manifest.texture_set_hash(entries) != (
+        export_manifest.texture_set_hash([{"file": "a.png", "hash": "2"}])
+    )
+
+
+def test_record_published_texture_set(tmp_path):
+    assert export_manifest.load_published_texture_sets(str(tmp_path)) == {}
+
+    export_manifest.record_published_texture_set(
+        str(tmp_path), "Body", "hash1", 1, "/publish/v001"
+    )
+    export_manifest.record_published_texture_set(
+        str(tmp_path), "Head", "hash2", 3, "/publish/v003"
+    )
+
+    assert export_manifest.load_published_texture_sets(str(tmp_path)) == {
+        "Body": {"hash": "hash1", "version": 1, "path": "/publish/v001"},
+        "Head": {"hash": "hash2", "version": 3, "path": "/publish/v003"},
+    }
+
+
+def test_identical_files(tmp_path):
+    previous_path = tmp_path / "v001"
+    export_path = tmp_path / "export"
+    previous_path.mkdir()
+    export_path.mkdir()
+
+    previous_manifest = ExportManifest(str(previous_path))
+    manifest = ExportManifest(str(export_path))
+    for name, previous_contents, contents in (
+        ("same", b"same", b"same"),
+        ("changed", b"before", b"after"),
+    ):
+        previous_manifest.add_map(
+            "Body", name, _write(previous_path / (name + ".png"), previous_contents)
+        )
+        manifest.add_map("Body", name, _write(export_path / (name + ".png"), contents))
+
+    assert manifest.identical_files(previous_manifest) == {
+        "same.png": str(previous_path / "same.png")
+    }
+
+
+def test_load_rejects_other_hash_algorithm(tmp_path):
+    with open(ExportManifest.manifest_path(str(tmp_path)), "w") as f:
+        json.dump(
+            {
+                "version": export_manifest.MANIFEST_VERSION,
+                "hash_algorithm": "md5",
+                "files": {},
+            },
+            f,
+        )
+
+    assert ExportManifest.load(str(tmp_path)) is None
+
+
+def test_copy_to_keeps_content_fields(tmp_path):
+    path = _write(tmp_path / "Mesh_Body_BaseColor.png", b"contents")
+
+    manifest = ExportManifest(str(tmp_path))
+    entry = manifest.add_map("Body", "Mesh_Body_BaseColor", path, (1024, 1024), 8)
+
+    copied = manifest.copy_to(str(tmp_path / "publish"))
+    assert copied.export_path == str(tmp_path / "publish")
+    assert copied.entries == {
+        entry["file"]: {
+            field: entry[field] for field in export_manifest.CONTENT_FIELDS
+        }
+    }
+    # the stat data of the original file can't describe the copy
+    assert "ino" not in copied.entries[entry["file"]]
@@ -0,0 +1,100 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+
+import pytest
+
+from tk_substancepainter import export_staging
+from tk_substancepainter.export_manifest import ExportManifest
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def staged_manifest(tmp_path):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    manifest = ExportManifest(str(staging))
+    for name in ("a", "b"):
+        manifest.add_map("Body", name, _write(staging / (name + ".png"), name.encode()))
+    return manifest
+
+
+@pytest.fixture
+def copies(monkeypatch):
+    atomic_copy = export_staging._atomic_copy
+    copies = []
+
+    def recording_atomic_copy(src, dst):
+        copies.append(os.path.basename(dst))
+        atomic_copy(src, dst)
+
+    monkeypatch.setattr(export_staging, "_atomic_copy", recording_atomic_copy)
+    return copies
+
+
+def test_staging_path(tmp_path):
+    staging_root = str(tmp_path)
+    path = export_staging.staging_path("/export/a", staging_root)
+
+    assert os.path.dirname(path) == staging_root
+    assert path == export_staging.staging_path("/export/a", staging_root)
+    assert path != export_staging.staging_path("/export/b", staging_root)
+
+
+def test_commit_staged_export(tmp_path, staged_manifest):
+    export_path = str(tmp_path / "export")
+
+    manifest = export_staging.commit_staged_export(staged_manifest, export_path)
+
+    assert sorted(manifest.entries) == ["a.png", "b.png"]
+    assert _read(os.path.join(export_path, "a.png")) == b"a"
+    assert ExportManifest.load(export_path).entries == manifest.entries
+    assert not [name for name in os.listdir(export_path) if name.endswith(".tmp")]
+
+
+def test_commit_copies_changed_files_only(tmp_path, staged_manifest, copies):
+    export_path = str(tmp_path / "export")
+    export_staging.commit_staged_export(staged_manifest, export_path)
+
+    staged_manifest.add_map(
+        "Body", "b", _write(tmp_path / "staging" / "b.png", b"changed")
+    )
+    del copies[:]
+    export_staging.commit_staged_export(staged_manifest, export_path)
+
+    assert copies == ["b.png"]
+    assert _read(os.path.join(export_path, "b.png")) == b"changed"
+
+
+def test_commit_copies_missing_files(tmp_path, staged_manifest, copies):
+    export_path = str(tmp_path / "export")
+    export_staging.commit_staged_export(staged_manifest, export_path)
+
+    os.remove(os.path.join(export_path, "a.png"))
+    del copies[:]
+    export_staging.commit_staged_export(staged_manifest, export_path)
+
+    assert copies == ["a.png"]
+    assert _read(os.path.join(export_path, "a.png")) == b"a"
@@ -0,0 +1,299 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import stat
+
+import pytest
+
+from tk_substancepainter import file_transfer
+from tk_substancepainter.export_manifest import hash_file
+from tk_substancepainter.file_transfer import ChecksumError, FileTransfer
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(file_transfer, "TRANSFER_RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def no_reflink(monkeypatch):
+    def _reflink(src, dst):
+        raise OSError("Cloning files is not supported")
+
+    monkeypatch.setattr(file_transfer, "_reflink", _reflink)
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _tmp_files(folder):
+    return [name for name in os.listdir(folder) if name.endswith(".tmp")]
+
+
+def test_copy_file(tmp_path):
+    src = _write(tmp_path / "src.png", b"x" * 1000)
+    dst = str(tmp_path / "dst.png")
+
+    chunks = []
+    file_transfer.copy_file(src, dst, 300, chunks.append)
+
+    assert _read(dst) == b"x" * 1000
+    assert chunks == [300, 300, 300, 100]
+    assert not _tmp_files(tmp_path)
+
+
+def test_transfer(tmp_path):
+    files = []
+    for index in range(5):
+        src = _write(tmp_path / ("src%d.png" % index), b"%d" % index * 100)
+        files.append((src, str(tmp_path / "publish" / ("dst%d.png" % index))))
+
+    reported = []
+    progress = []
+    results = FileTransfer(
+        max_workers=2,
+        progress_callback=progress.append,
+    ).transfer(files, file_callback=lambda dst, digest: reported.append(dst))
+
+    for src, dst in files:
+        assert _read(dst) == _read(src)
+        assert dst in results
+    assert sorted(reported) == sorted(dst for _, dst in files)
+    assert progress[-1].done_files == 5
+    assert progress[-1].done_bytes == progress[-1].total_bytes
+
+
+def test_transfer_retries_failed_copies(tmp_path, monkeypatch):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    copy_file = file_transfer.copy_file
+    attempts = []
+
+    def flaky_copy_file(src, dst, *args):
+        attempts.append(dst)
+        if len(attempts) < 3:
+            raise IOError("Network is unreachable")
+        return copy_file(src, dst, *args)
+
+    monkeypatch.setattr(file_transfer, "copy_file", flaky_copy_file)
+    progress = []
+    FileTransfer(retries=2, progress_callback=progress.append).transfer([(src, dst)])
+
+    assert len(attempts) == 3
+    assert _read(dst) == b"contents"
+    # the bytes of failed attempts are not counted
+    assert progress[-1].done_bytes == os.path.getsize(src)
+
+
+def test_transfer_gives_up_after_retries(tmp_path, monkeypatch):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    attempts = []
+
+    def failing_copy_file(src, dst, *args):
+        attempts.append(dst)
+        raise IOError("Network is unreachable")
+
+    monkeypatch.setattr(file_transfer, "copy_file", failing_copy_file)
+    with pytest.raises(IOError):
+        FileTransfer(retries=2).transfer([(src, dst)])
+
+    assert len(attempts) == 3
+
+
+def test_progress_describe(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(file_transfer.time, "perf_counter", lambda: now[0])
+
+    progress = file_transfer.TransferProgress(4, 4 * 1024 * 1024)
+    progress._add_bytes(1024 * 1024)
+    progress._add_file()
+    now[0] += 2
+
+    assert progress.throughput == 512 * 1024
+    assert progress.time_left == 6
+    assert progress.describe() == (
+        "Copied 1 of 4 files, 1.0 MB of 4.0 MB at 512.0 KB/s, about 6s left"
+    )
+
+
+def test_link_file_protected_never_hard_links(tmp_path, no_reflink):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    with pytest.raises(OSError):
+        file_transfer.link_file(src, dst, protect=True)
+
+    assert not os.path.exists(dst)
+    assert os.stat(src).st_nlink == 1
+    assert not _tmp_files(tmp_path)
+
+
+def test_link_file_hard_links_published_files(tmp_path, no_reflink):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    assert file_transfer.link_file(src, dst, protect=False) == "hardlink"
+    assert os.path.samefile(src, dst)
+
+
+def test_unknown_transfer_mode():
+    with pytest.raises(ValueError):
+        FileTransfer(mode="move")
+
+
+def test_transfer_link_mode_falls_back_to_copy(tmp_path, no_reflink):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "publish" / "dst.png")
+
+    results = FileTransfer(mode=file_transfer.TRANSFER_MODE_LINK).transfer(
+        [(src, dst)]
+    )
+
+    # work files are copied rather than hard linked, so later exports can't
+    # modify the publish
+    assert dst in results
+    assert _read(dst) == b"contents"
+    assert not os.path.samefile(src, dst)
+    assert os.stat(src).st_nlink == 1
+
+
+def test_transfer_links_identical_published_files(tmp_path, no_reflink):
+    src = _write(tmp_path / "src.png", b"contents")
+    previous = _write(tmp_path / "v001.png", b"contents")
+    dst = str(tmp_path / "v002.png")
+
+    progress = []
+    results = FileTransfer(progress_callback=progress.append).transfer(
+        [(src, dst)], identical_files={dst: previous}
+    )
+
+    assert results[dst] is None
+    assert os.path.samefile(previous, dst)
+    assert progress[-1].linked_files == 1
+
+
+def test_transfer_copies_when_identical_file_is_gone(tmp_path, no_reflink):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "v002.png")
+
+    FileTransfer().transfer(
+        [(src, dst)], identical_files={dst: str(tmp_path / "v001.png")}
+    )
+
+    assert _read(dst) == b"contents"
+
+
+def _is_read_only(path):
+    return not os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+def test_transferred_files_are_read_only(tmp_path):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "publish" / "dst.png")
+
+    FileTransfer().transfer([(src, dst)])
+    assert _is_read_only(dst)
+
+    # a read only copy is still replaced by the next transfer
+    _write(src, b"new contents")
+    FileTransfer().transfer([(src, dst)])
+    assert _read(dst) == b"new contents"
+    assert _is_read_only(dst)
+
+
+def test_hard_linked_files_are_read_only(tmp_path, no_reflink):
+    src = _write(tmp_path / "v001.png", b"contents")
+    dst = str(tmp_path / "v002.png")
+
+    file_transfer.link_file(src, dst, protect=False)
+
+    assert _is_read_only(src)
+    assert _is_read_only(dst)
+
+
+def test_remove_read_only_file(tmp_path):
+    path = _write(tmp_path / "map.png", b"contents")
+    os.chmod(path, 0o444)
+
+    file_transfer.remove_file(path)
+    assert not os.path.exists(path)
+
+
+def test_copy_file_returns_hash(tmp_path):
+    src = _write(tmp_path / "src.png", b"x" * 1000)
+    dst = str(tmp_path / "dst.png")
+
+    assert file_transfer.copy_file(src, dst, 300) == hash_file(src)
+
+
+def test_transfer_returns_hashes(tmp_path):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "publish" / "dst.png")
+
+    assert FileTransfer().transfer([(src, dst)]) == {dst: hash_file(src)}
+
+
+def test_copy_file_checksum_mismatch(tmp_path):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    with pytest.raises(ChecksumError):
+        file_transfer.copy_file(src, dst, expected_hash="0" * 32)
+
+    assert not os.path.exists(dst)
+    assert not _tmp_files(tmp_path)
+
+
+def test_copy_file_keeps_destination_on_checksum_mismatch(tmp_path):
+    src = _write(tmp_path / "src.png", b"new")
+    dst = _write(tmp_path / "dst.png", b"old")
+
+    with pytest.raises(ChecksumError):
+        file_transfer.copy_file(src, dst, expected_hash="0" * 32)
+
+    assert _read(dst) == b"old"
+
+
+def test_transfer_retries_checksum_mismatch(tmp_path):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    with pytest.raises(ChecksumError):
+        FileTransfer(retries=1).transfer(
+            [(src, dst)], expected_hashes={dst: "0" * 32}
+        )
+
+    assert not os.path.exists(dst)
+
+
+def test_transfer_verifies_expected_hashes(tmp_path):
+    src = _write(tmp_path / "src.png", b"contents")
+    dst = str(tmp_path / "dst.png")
+
+    results = FileTransfer().transfer(
+        [(src, dst)], expected_hashes={dst: hash_file(src)}
+    )
+    assert results[dst] == hash_file(src)
@@ -0,0 +1,197 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import types
+
+import pytest
+
+from tk_substancepainter.publish_journal import PublishJournal
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+CONTEXT = types.SimpleNamespace(
+    project={"type": "Project", "id": 1},
+    entity={"type": "Asset", "id": 2},
+    task={"type": "Task", "id": 3},
+)
+
+
+@pytest.fixture
+def open_journal(tmp_path):
+    def open_journal(content_hash="hash", name="Body", context=CONTEXT):
+        return PublishJournal.open(
+            str(tmp_path / "cache"), context, name, "Texture Folder", content_hash
+        )
+
+    return open_journal
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def test_new_journal(open_journal):
+    journal = open_journal()
+
+    assert journal.version is None
+    assert journal.files == {}
+    assert journal.sg_publish is None
+    assert not os.path.exists(journal.path)
+
+
+def test_journals_per_publish(open_journal):
+    other_context = types.SimpleNamespace(
+        project=CONTEXT.project, entity={"type": "Asset", "id": 4}, task=None
+    )
+
+    paths = {
+        open_journal().path,
+        open_journal(name="Head").path,
+        open_journal(context=other_context).path,
+    }
+    assert len(paths) == 3
+
+
+def test_resume(open_journal, tmp_path):
+    published_file = _write(tmp_path / "v003.png", b"contents")
+
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_file(published_file, "file_hash")
+
+    journal = open_journal()
+    assert journal.version == 3
+    assert journal.publish_path == "/publish/v003"
+    assert journal.transferred(published_file, "file_hash")
+    assert not journal.transferred(published_file, "other_hash")
+    assert journal.sg_publish is None
+
+
+def test_transferred_needs_the_file(open_journal, tmp_path):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_file(str(tmp_path / "v003.png"), "file_hash")
+
+    assert not open_journal().transferred(str(tmp_path / "v003.png"), "file_hash")
+
+
+def test_resume_registered_publish(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_publish({"type": "PublishedFile", "id": 10, "code": "v003"})
+
+    journal = open_journal()
+    assert journal.sg_publish == {"type": "PublishedFile", "id": 10}
+
+
+def test_registered_publish_of_other_contents_is_forgotten(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_publish({"type": "PublishedFile", "id": 10})
+
+    journal = open_journal(content_hash="new_hash")
+    assert journal.version is None
+    assert journal.sg_publish is None
+    assert journal.content_hash == "new_hash"
+
+
+def test_unregistered_publish_of_other_contents_is_resumed(open_journal, tmp_path):
+    published_file = _write(tmp_path / "v003.png", b"contents")
+
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_file(published_file, "file_hash")
+
+    journal = open_journal(content_hash="new_hash")
+    assert journal.version == 3
+    assert journal.content_hash == "new_hash"
+    assert journal.transferred(published_file, "file_hash")
+
+    # the new contents are the ones registered once resumed
+    journal.record_publish({"type": "PublishedFile", "id": 10})
+    journal = open_journal(content_hash="new_hash")
+    assert journal.sg_publish == {"type": "PublishedFile", "id": 10}
+
+
+def test_verify_forgets_version_published_since(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+
+    journal.verify({"version_number": 3})
+    assert journal.version is None
+    assert journal.files == {}
+    assert not os.path.exists(journal.path)
+
+
+def test_verify_keeps_free_version(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+
+    journal.verify({"version_number": 2})
+    journal.verify(None)
+    assert journal.version == 3
+
+
+def test_verify_keeps_registered_publish(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_publish({"type": "PublishedFile", "id": 10})
+
+    journal.verify({"version_number": 3})
+    assert journal.version == 3
+    assert journal.sg_publish == {"type": "PublishedFile", "id": 10}
+
+
+def test_resume_after_incomplete_record(open_journal, tmp_path):
+    published_file = _write(tmp_path / "v003.png", b"contents")
+
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+    journal.record_file(published_file, "file_hash")
+    # interrupted while writing the next record
+    with open(journal.path, "a") as f:
+        f.write('{"file": "/publish/v003/other.png", "ha')
+
+    journal = open_journal()
+    assert journal.version == 3
+    assert journal.files == {published_file: "file_hash"}
+
+    # records appended after it are not lost
+    journal.record_publish({"type": "PublishedFile", "id": 10})
+    journal = open_journal()
+    assert journal.sg_publish == {"type": "PublishedFile", "id": 10}
+    assert journal.files == {published_file: "file_hash"}
+
+
+def test_write_failure_does_not_fail_the_publish(tmp_path):
+    # the journal folder can't be created where a file is
+    blocker = _write(tmp_path / "cache", b"")
+    journal = PublishJournal(os.path.join(blocker, "journal.jsonl"), "hash")
+
+    journal.start(3, "/publish/v003")
+    assert journal.version == 3
+
+
+def test_remove(open_journal):
+    journal = open_journal()
+    journal.start(3, "/publish/v003")
+
+    journal.remove()
+    assert not os.path.exists(journal.path)
+    assert open_journal().version is None
+
+    # removing twice is fine
+    journal.remove()
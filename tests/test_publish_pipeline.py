@@ -0,0 +1,216 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import time
+import threading
+
+import pytest
+
+from tk_substancepainter.publish_journal import PublishJournal
+from tk_substancepainter.publish_pipeline import PublishPipeline
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+TIMEOUT = 10
+
+
+class IncompletePublishError(Exception):
+    """
+    Stands for publish_registration.IncompletePublishError, which can't be
+    imported without sgtk.
+    """
+
+    def __init__(self, message, sg_publish):
+        super().__init__(message)
+        self.sg_publish = sg_publish
+
+
+class FakeRegistrar(object):
+    """
+    Stands for a PublishRegistrar, registering publishes as
+    {"type": "PublishedFile", "id": <n>}. Publishes named "fail" can't be
+    registered, and the ones named "incomplete" are created without their
+    dependencies.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self._publish_data = {}
+
+    def add(self, publish_data):
+        key = len(self._publish_data) + 1
+        self._publish_data[key] = publish_data
+        self.calls.append(("add", key))
+        return key
+
+    def result(self, key):
+        self.release.wait(TIMEOUT)
+        self.calls.append(("result", key))
+        if self._publish_data[key]["name"] == "fail":
+            raise Exception("Could not register the publish")
+        if self._publish_data[key]["name"] == "incomplete":
+            raise IncompletePublishError(
+                "Could not create the dependencies of the publish",
+                {"type": "PublishedFile", "id": key},
+            )
+        return {"type": "PublishedFile", "id": key}
+
+
+@pytest.fixture
+def registrar():
+    return FakeRegistrar()
+
+
+@pytest.fixture
+def pipeline(registrar):
+    return PublishPipeline(registrar, transfer_workers=2, idle_timeout=0.1)
+
+
+def _transfer(publish_data):
+    return dict(publish_data, path="/publish/%s" % publish_data["name"])
+
+
+def test_publishes(pipeline):
+    futures = [
+        pipeline.submit(_transfer, {"name": "map%d" % index}) for index in range(5)
+    ]
+
+    for index, future in enumerate(futures):
+        publish_data, sg_publish = future.result(TIMEOUT)
+        assert publish_data["path"] == "/publish/map%d" % index
+        assert sg_publish["type"] == "PublishedFile"
+    assert len({future.result()[1]["id"] for future in futures}) == 5
+
+
+def test_transfer_error(pipeline, registrar):
+    def failing_transfer(publish_data):
+        raise IOError("Disk full")
+
+    failed = pipeline.submit(failing_transfer, {"name": "map0"})
+    published = pipeline.submit(_transfer, {"name": "map1"})
+
+    with pytest.raises(IOError):
+        failed.result(TIMEOUT)
+    assert published.result(TIMEOUT)[1]
+    # a publish whose files are not transferred is not registered
+    assert len([call for call in registrar.calls if call[0] == "add"]) == 1
+
+
+def test_registration_error(pipeline):
+    failed = pipeline.submit(_transfer, {"name": "fail"})
+    published = pipeline.submit(_transfer, {"name": "map1"})
+
+    with pytest.raises(Exception, match="Could not register"):
+        failed.result(TIMEOUT)
+    assert published.result(TIMEOUT)[1]
+
+
+def test_registrations_are_batched(registrar):
+    pipeline = PublishPipeline(registrar, transfer_workers=4, idle_timeout=0.1)
+
+    # hold the first registration until all the others are waiting
+    registrar.release.clear()
+    futures = [pipeline.submit(_transfer, {"name": "map0"})]
+    deadline = time.time() + TIMEOUT
+    while not registrar.calls and time.time() < deadline:
+        time.sleep(0.01)
+    futures += [
+        pipeline.submit(_transfer, {"name": "map%d" % index}) for index in range(1, 4)
+    ]
+    while pipeline._register_stage._queue.qsize() < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    registrar.release.set()
+
+    for future in futures:
+        future.result(TIMEOUT)
+    assert registrar.calls == [
+        ("add", 1),
+        ("result", 1),
+        ("add", 2),
+        ("add", 3),
+        ("add", 4),
+        ("result", 2),
+        ("result", 3),
+        ("result", 4),
+    ]
+
+
+def test_cancelled_publish_is_not_transferred(registrar):
+    pipeline = PublishPipeline(registrar, idle_timeout=0.1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_transfer(publish_data):
+        started.set()
+        release.wait(TIMEOUT)
+        return publish_data
+
+    def transfer(publish_data):
+        raise AssertionError("Cancelled publishes must not be transferred")
+
+    first = pipeline.submit(blocking_transfer, {"name": "map0"})
+    started.wait(TIMEOUT)
+    cancelled = pipeline.submit(transfer, {"name": "map1"})
+    assert cancelled.cancel()
+    release.set()
+
+    assert first.result(TIMEOUT)[1]
+
+
+def test_journal_records_publish(pipeline, tmp_path):
+    journal = PublishJournal(str(tmp_path / "journal.jsonl"), "hash")
+    journal.start(3, "/publish/v003")
+
+    _, sg_publish = pipeline.submit(
+        _transfer, {"name": "map0"}, journal=journal
+    ).result(TIMEOUT)
+
+    assert journal.sg_publish == sg_publish
+    resumed = PublishJournal(journal.path, "hash")
+    resumed._read()
+    assert resumed.sg_publish == sg_publish
+
+
+def test_journal_skips_registered_publish(pipeline, registrar, tmp_path):
+    journal = PublishJournal(str(tmp_path / "journal.jsonl"), "hash")
+    journal.start(3, "/publish/v003")
+    journal.record_publish({"type": "PublishedFile", "id": 10})
+
+    transferred = []
+
+    def transfer(publish_data):
+        transferred.append(publish_data["name"])
+        return publish_data
+
+    _, sg_publish = pipeline.submit(
+        transfer, {"name": "map0"}, journal=journal
+    ).result(TIMEOUT)
+
+    # the files are still checked, but the publish is not registered again
+    assert transferred == ["map0"]
+    assert sg_publish == {"type": "PublishedFile", "id": 10}
+    assert registrar.calls == []
+
+
+def test_journal_records_incomplete_publish(pipeline, tmp_path):
+    journal = PublishJournal(str(tmp_path / "journal.jsonl"), "hash")
+    journal.start(3, "/publish/v003")
+
+    future = pipeline.submit(_transfer, {"name": "incomplete"}, journal=journal)
+
+    with pytest.raises(IncompletePublishError):
+        future.result(TIMEOUT)
+    # the publish exists, resuming must not create it again
+    assert journal.sg_publish == {"type": "PublishedFile", "id": 1}
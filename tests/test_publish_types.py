@@ -0,0 +1,123 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+The publish type cache resolves the publish entity type with sgtk, so these
+tests only run where the toolkit core can be imported.
+"""
+
+import pytest
+
+pytest.importorskip("sgtk")
+
+from tk_substancepainter.publish_types import PublishTypeCache  # noqa: E402
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+class FakeShotgun(object):
+    """
+    Stands for a Shotgun connection holding publish types only.
+    """
+
+    def __init__(self, codes):
+        self.calls = []
+        self._publish_types = [
+            {"type": "PublishedFileType", "id": index + 1, "code": code}
+            for index, code in enumerate(codes)
+        ]
+
+    def find(self, entity_type, filters, fields):
+        self.calls.append("find")
+        return [dict(publish_type) for publish_type in self._publish_types]
+
+    def find_one(self, entity_type, filters, fields):
+        self.calls.append("find_one")
+        code = filters[0][2]
+        for publish_type in self._publish_types:
+            if publish_type["code"] == code:
+                return dict(publish_type)
+        return None
+
+    def create(self, entity_type, data):
+        self.calls.append("create")
+        publish_type = {"type": entity_type, "id": len(self._publish_types) + 1}
+        self._publish_types.append(dict(publish_type, code=data["code"]))
+        return publish_type
+
+
+class FakePipelineConfiguration(object):
+    def __init__(self, published_file_entity_type):
+        self._published_file_entity_type = published_file_entity_type
+
+    def get_published_file_entity_type(self):
+        return self._published_file_entity_type
+
+
+class FakeTk(object):
+    def __init__(self, codes, published_file_entity_type="PublishedFile"):
+        self.shotgun = FakeShotgun(codes)
+        self.pipeline_configuration = FakePipelineConfiguration(
+            published_file_entity_type
+        )
+
+
+@pytest.fixture
+def tk():
+    return FakeTk(["Texture", "Substance Painter Project"])
+
+
+def test_publish_types_are_read_once(tk):
+    cache = PublishTypeCache(tk)
+
+    assert cache.get("Texture") == {"type": "PublishedFileType", "id": 1}
+    assert cache.get("Substance Painter Project") == {
+        "type": "PublishedFileType",
+        "id": 2,
+    }
+    assert tk.shotgun.calls == ["find"]
+
+
+def test_missing_publish_type_is_remembered(tk):
+    cache = PublishTypeCache(tk)
+
+    assert cache.get("Image") is None
+    assert cache.get("Image") is None
+    assert tk.shotgun.calls == ["find", "find_one"]
+
+
+def test_get_or_create(tk):
+    cache = PublishTypeCache(tk)
+
+    assert cache.get("Image") is None
+    publish_type = cache.get_or_create("Image")
+
+    assert publish_type == {"type": "PublishedFileType", "id": 3}
+    assert cache.get_or_create("Image") == publish_type
+    assert cache.get("Image") == publish_type
+    assert tk.shotgun.calls.count("create") == 1
+
+
+def test_clear(tk):
+    cache = PublishTypeCache(tk)
+    cache.get("Texture")
+
+    cache.clear()
+    cache.get("Texture")
+    assert tk.shotgun.calls == ["find", "find"]
+
+
+def test_tank_types():
+    cache = PublishTypeCache(FakeTk([], published_file_entity_type="TankPublishedFile"))
+
+    assert cache.entity_type == "TankType"
+    assert cache.field == "tank_type"
@@ -0,0 +1,163 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+The version allocator resolves the publish entity type with sgtk, so these
+tests only run where the toolkit core can be imported.
+"""
+
+import collections
+
+import pytest
+
+pytest.importorskip("sgtk")
+
+from tk_substancepainter.publish_versions import VersionAllocator  # noqa: E402
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+Context = collections.namedtuple("Context", ["project", "entity", "task"])
+
+CONTEXT = Context(
+    {"type": "Project", "id": 1},
+    {"type": "Asset", "id": 2},
+    {"type": "Task", "id": 3},
+)
+
+
+class FakePublishTypeCache(object):
+    field = "published_file_type"
+
+    def get(self, name):
+        if name == "Texture":
+            return {"type": "PublishedFileType", "id": 1}
+        return None
+
+
+class FakeShotgun(object):
+    """
+    Stands for a Shotgun connection holding the given publishes, all of them
+    of the same context and publish type.
+    """
+
+    def __init__(self, publishes):
+        self.calls = []
+        self._publishes = [
+            {
+                "type": "PublishedFile",
+                "id": index + 1,
+                "name": name,
+                "version_number": version,
+                "path": {"local_path": "/publish/%s/v%03d" % (name, version)},
+            }
+            for index, (name, version) in enumerate(publishes)
+        ]
+
+    def _latest(self, names):
+        latest = {}
+        for sg_publish in self._publishes:
+            name = sg_publish["name"]
+            if name not in names:
+                continue
+            if sg_publish["version_number"] > latest.get(name, {}).get(
+                "version_number", 0
+            ):
+                latest[name] = sg_publish
+        return latest
+
+    def _names(self, filters):
+        for sg_filter in filters:
+            if isinstance(sg_filter, list) and sg_filter[0] == "name":
+                return sg_filter[2] if sg_filter[1] == "in" else [sg_filter[2]]
+        return [sg_publish["name"] for sg_publish in self._publishes]
+
+    def summarize(self, entity_type, filters, summary_fields, grouping):
+        self.calls.append("summarize")
+        return {
+            "groups": [
+                {
+                    "group_value": name,
+                    "summaries": {"version_number": sg_publish["version_number"]},
+                }
+                for name, sg_publish in self._latest(self._names(filters)).items()
+            ]
+        }
+
+    def find(self, entity_type, filters, fields):
+        self.calls.append("find")
+        return list(self._latest(self._names(filters)).values())
+
+    def find_one(self, entity_type, filters, fields, order):
+        self.calls.append("find_one")
+        return self._latest(self._names(filters)).get(self._names(filters)[0])
+
+
+class FakePipelineConfiguration(object):
+    def get_published_file_entity_type(self):
+        return "PublishedFile"
+
+
+class FakeTk(object):
+    def __init__(self, publishes):
+        self.shotgun = FakeShotgun(publishes)
+        self.pipeline_configuration = FakePipelineConfiguration()
+
+
+@pytest.fixture
+def tk():
+    return FakeTk([("Body", 1), ("Body", 3), ("Head", 2)])
+
+
+@pytest.fixture
+def allocator(tk):
+    return VersionAllocator(tk, FakePublishTypeCache())
+
+
+def test_next_version(allocator):
+    assert allocator.next_version(CONTEXT, "Body", "Texture") == 4
+    assert allocator.next_version(CONTEXT, "Head", "Texture") == 3
+    assert allocator.next_version(CONTEXT, "Eyes", "Texture") == 1
+
+
+def test_versions_of_a_session_are_consecutive(allocator, tk):
+    assert allocator.next_version(CONTEXT, "Body", "Texture") == 4
+    assert allocator.next_version(CONTEXT, "Body", "Texture") == 5
+    # the latest publish is only looked up once
+    assert tk.shotgun.calls == ["find_one"]
+
+
+def test_missing_publish_type_has_no_publishes(allocator, tk):
+    assert allocator.latest_publish(CONTEXT, "Body", "Image") is None
+    assert allocator.next_version(CONTEXT, "Body", "Image") == 1
+    assert tk.shotgun.calls == []
+
+
+def test_prefetch(allocator, tk):
+    allocator.prefetch(CONTEXT, "Texture", ["Body", "Head", "Eyes"])
+    assert tk.shotgun.calls == ["summarize", "find"]
+
+    assert allocator.latest_publish(CONTEXT, "Body", "Texture")["version_number"] == 3
+    assert allocator.latest_publish(CONTEXT, "Eyes", "Texture") is None
+    assert allocator.next_version(CONTEXT, "Head", "Texture") == 3
+    assert tk.shotgun.calls == ["summarize", "find"]
+
+    # names already looked up are not looked up again
+    allocator.prefetch(CONTEXT, "Texture", ["Body"])
+    assert tk.shotgun.calls == ["summarize", "find"]
+
+
+def test_latest_publish_path(allocator):
+    assert allocator.latest_publish_path(CONTEXT, "Body", "Texture") == (
+        "/publish/Body/v003"
+    )
+    assert allocator.latest_publish_path(CONTEXT, "Eyes", "Texture") is None
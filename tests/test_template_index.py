@@ -0,0 +1,115 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import re
+
+from tk_substancepainter.template_index import TemplateIndex
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+ROOT = os.path.abspath(os.sep + "projects")
+
+
+class FakeTemplate(object):
+    """
+    Stands for a TemplatePath, matching paths where every key is a single
+    folder or file name component.
+    """
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.root_path = ROOT
+        self.definition = definition
+        self.validated = []
+
+        pattern = re.sub(r"\\{\w+\\}", r"[^/]+", re.escape(definition))
+        self._regex = re.compile("^%s$" % pattern)
+
+    def validate(self, path):
+        self.validated.append(path)
+        relative_path = os.path.relpath(path, self.root_path)
+        return bool(self._regex.match(relative_path.replace(os.sep, "/")))
+
+
+class FakeTemplateCache(object):
+    def __init__(self):
+        self.validated = []
+
+    def validate(self, template, path):
+        self.validated.append(template.name)
+        return template.validate(path)
+
+
+def _path(*components):
+    return os.path.join(ROOT, *components)
+
+
+def _templates():
+    templates = {
+        "asset_work": FakeTemplate("asset_work", "assets/{Asset}/work/{name}.spp"),
+        "asset_textures": FakeTemplate(
+            "asset_textures", "assets/{Asset}/work/textures/{name}.png"
+        ),
+        "shot_work": FakeTemplate("shot_work", "shots/{Shot}/work/{name}.spp"),
+        "root_work": FakeTemplate("root_work", "{name}.spp"),
+    }
+    # string templates have no root path and are not indexed
+    templates["name"] = object()
+    return templates
+
+
+def test_candidates_share_the_path_prefix():
+    index = TemplateIndex(_templates())
+
+    candidates = [
+        template.name for template in index.candidates(_path("assets", "a", "b.spp"))
+    ]
+    assert candidates == ["asset_textures", "asset_work", "root_work"]
+
+
+def test_candidates_of_unrelated_path():
+    index = TemplateIndex(_templates())
+
+    candidates = [
+        template.name for template in index.candidates(os.path.abspath("/other.spp"))
+    ]
+    assert candidates == []
+
+
+def test_template_from_path():
+    templates = _templates()
+    index = TemplateIndex(templates)
+
+    path = _path("shots", "sh010", "work", "scene.spp")
+    assert index.template_from_path(path) is templates["shot_work"]
+    # templates of other branches are never validated
+    assert templates["asset_work"].validated == []
+
+
+def test_template_from_path_no_match():
+    index = TemplateIndex(_templates())
+
+    assert index.template_from_path(_path("shots", "sh010", "scene.png")) is None
+
+
+def test_template_from_path_uses_template_cache():
+    index = TemplateIndex(_templates())
+    template_cache = FakeTemplateCache()
+
+    template = index.template_from_path(
+        _path("assets", "car", "work", "textures", "body.png"), template_cache
+    )
+
+    assert template.name == "asset_textures"
+    assert template_cache.validated == ["asset_textures"]
@@ -0,0 +1,165 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+
+from tk_substancepainter import texture_streaming
+from tk_substancepainter.export_manifest import ExportManifest
+from tk_substancepainter.texture_streaming import DirectoryWatcher, StreamingCopier
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+TIMEOUT = 10
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def _wait_for(condition):
+    deadline = time.time() + TIMEOUT
+    while not condition() and time.time() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_watcher_reports_complete_files(tmp_path):
+    reported = []
+    watcher = DirectoryWatcher(
+        str(tmp_path), lambda name, key: reported.append(name), poll_interval=0.05
+    )
+    _write(tmp_path / "map.png", b"contents")
+    _write(tmp_path / "map.png.tmp", b"partial")
+    _write(tmp_path / "tk_export_manifest.json", b"{}")
+
+    watcher.start()
+    assert _wait_for(lambda: reported)
+    watcher.stop()
+
+    assert reported == ["map.png"]
+
+
+def test_watcher_final_poll_reports_pending_files(tmp_path):
+    reported = []
+    watcher = DirectoryWatcher(
+        str(tmp_path), lambda name, key: reported.append(name), poll_interval=60
+    )
+    watcher.start()
+    _write(tmp_path / "map.png", b"contents")
+
+    watcher.stop()
+    assert reported == ["map.png"]
+
+
+def test_watcher_stop_without_final_poll(tmp_path):
+    reported = []
+    watcher = DirectoryWatcher(
+        str(tmp_path), lambda name, key: reported.append(name), poll_interval=60
+    )
+    watcher.start()
+    _write(tmp_path / "map.png", b"contents")
+
+    watcher.stop(final_poll=False)
+    assert reported == []
+
+
+def test_finish_copies_manifest_files(tmp_path):
+    src_path = tmp_path / "export"
+    dst_path = tmp_path / "publish"
+    src_path.mkdir()
+    dst_path.mkdir()
+
+    copier = StreamingCopier(str(src_path), str(dst_path))
+    copier.start()
+    manifest = ExportManifest(str(src_path))
+    for name in ("a", "b"):
+        manifest.add_map("Body", name, _write(src_path / (name + ".png"), b"x"))
+    # not part of the export
+    _write(src_path / "stray.png", b"y")
+
+    paths = copier.finish(manifest)
+
+    assert paths == [str(dst_path / "a.png"), str(dst_path / "b.png")]
+    assert sorted(os.listdir(dst_path)) == ["a.png", "b.png"]
+
+
+def test_finish_copies_files_changed_since_streamed(tmp_path):
+    src_path = tmp_path / "export"
+    dst_path = tmp_path / "publish"
+    src_path.mkdir()
+    dst_path.mkdir()
+
+    copier = StreamingCopier(str(src_path), str(dst_path))
+    path = _write(src_path / "a.png", b"first")
+    copier.start()
+    assert _wait_for(lambda: os.path.exists(dst_path / "a.png"))
+
+    _write(path, b"second")
+    manifest = ExportManifest(str(src_path))
+    manifest.add_map("Body", "a", path)
+    copier.finish(manifest)
+
+    with open(dst_path / "a.png", "rb") as f:
+        assert f.read() == b"second"
+
+
+def test_finish_copies_again_after_failed_streamed_copy(tmp_path, monkeypatch):
+    src_path = tmp_path / "export"
+    dst_path = tmp_path / "publish"
+    src_path.mkdir()
+    dst_path.mkdir()
+
+    copy_file = texture_streaming.copy_file
+    attempts = []
+
+    def flaky_copy_file(src, dst, **kwargs):
+        attempts.append(dst)
+        if len(attempts) == 1:
+            raise IOError("The file is being written")
+        return copy_file(src, dst, **kwargs)
+
+    monkeypatch.setattr(texture_streaming, "copy_file", flaky_copy_file)
+    copier = StreamingCopier(str(src_path), str(dst_path))
+    path = _write(src_path / "a.png", b"contents")
+    copier.start()
+    assert _wait_for(lambda: attempts)
+
+    manifest = ExportManifest(str(src_path))
+    manifest.add_map("Body", "a", path)
+
+    assert copier.finish(manifest) == [str(dst_path / "a.png")]
+    assert len(attempts) == 2
+    with open(dst_path / "a.png", "rb") as f:
+        assert f.read() == b"contents"
+
+
+def test_abort_removes_copies(tmp_path):
+    src_path = tmp_path / "export"
+    dst_path = tmp_path / "publish"
+    src_path.mkdir()
+    dst_path.mkdir()
+
+    copier = StreamingCopier(str(src_path), str(dst_path))
+    for index in range(5):
+        _write(src_path / ("map%d.png" % index), b"x" * 100)
+    copier.start()
+    assert _wait_for(lambda: os.listdir(dst_path))
+
+    # written after the export was cancelled
+    _write(src_path / "late.png", b"y")
+    copier.abort()
+
+    assert os.listdir(dst_path) == []
@@ -0,0 +1,108 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+
+import pytest
+
+from tk_substancepainter.thumbnail_upload import ThumbnailUploader
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+class FakeShotgun(object):
+    """
+    Stands for a Shotgun connection. The first uploads_failing uploads fail.
+    """
+
+    def __init__(self, uploads_failing=0):
+        self.uploads = []
+        self.shares = []
+        self._uploads_failing = uploads_failing
+
+    def upload_thumbnail(self, entity_type, entity_id, path):
+        with open(path, "rb") as f:
+            self.uploads.append(((entity_type, entity_id), f.read()))
+        if len(self.uploads) <= self._uploads_failing:
+            raise Exception("Could not upload")
+
+    def share_thumbnail(self, entities, source_entity):
+        self.shares.append(
+            (
+                [(entity["type"], entity["id"]) for entity in entities],
+                (source_entity["type"], source_entity["id"]),
+            )
+        )
+
+
+class FakeTk(object):
+    def __init__(self, uploads_failing=0):
+        self.shotgun = FakeShotgun(uploads_failing)
+
+
+def _write(path, contents):
+    with open(path, "wb") as f:
+        f.write(contents)
+    return str(path)
+
+
+def _publish(publish_id):
+    return {"type": "PublishedFile", "id": publish_id, "code": "map"}
+
+
+@pytest.fixture
+def thumbnail(tmp_path):
+    return _write(tmp_path / "thumbnail.png", b"image")
+
+
+def test_same_image_is_uploaded_once(tmp_path, thumbnail):
+    tk = FakeTk()
+    uploader = ThumbnailUploader(tk)
+    uploader.attach(_publish(1), thumbnail)
+    uploader.attach(_publish(2), thumbnail)
+    uploader.attach(_publish(3), _write(tmp_path / "other.png", b"image"))
+    uploader.shutdown()
+
+    assert tk.shotgun.uploads == [(("PublishedFile", 1), b"image")]
+    shared = [entity for entities, _ in tk.shotgun.shares for entity in entities]
+    assert shared == [("PublishedFile", 2), ("PublishedFile", 3)]
+
+
+def test_images_are_copied_until_uploaded(thumbnail):
+    tk = FakeTk()
+    uploader = ThumbnailUploader(tk)
+    uploader.attach(_publish(1), thumbnail)
+    # temporary thumbnails may be removed as soon as they are attached
+    os.remove(thumbnail)
+    uploader.shutdown()
+
+    assert tk.shotgun.uploads == [(("PublishedFile", 1), b"image")]
+    assert uploader._temp_dir is None
+
+
+def test_failed_upload_is_retried_for_the_next_entity(thumbnail):
+    tk = FakeTk(uploads_failing=1)
+    errors = []
+    uploader = ThumbnailUploader(
+        tk, error_callback=lambda message, exception: errors.append(message)
+    )
+    uploader.attach(_publish(1), thumbnail)
+    uploader.attach(_publish(2), thumbnail)
+    uploader.shutdown()
+
+    assert len(errors) == 1
+    assert [entity for entity, _ in tk.shotgun.uploads] == [
+        ("PublishedFile", 1),
+        ("PublishedFile", 2),
+    ]
+    # the entity the upload failed for gets the image from the next one
+    assert tk.shotgun.shares == [([("PublishedFile", 1)], ("PublishedFile", 2))]
@@ -0,0 +1,44 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+from tk_substancepainter import versions
+
+
+__author__ = "Diego Garcia Huerta"
+__contact__ = "https://www.linkedin.com/in/diegogh/"
+
+
+def test_parse_version():
+    assert versions.parse_version("6.2.1") == (6, 2, 1)
+    assert versions.parse_version("2020.1beta") == (2020, 1, "beta")
+    assert versions.parse_version("7.4.2") < versions.parse_version("7.10")
+
+
+def test_parse_version_is_memoized():
+    assert versions.parse_version("8.1.0") is versions.parse_version("8.1.0")
+
+
+def test_to_new_version_system():
+    assert versions.to_new_version_system("2.6.2") == (2, 6, 2)
+    assert versions.to_new_version_system("2017.1") == (3, 1)
+    assert versions.to_new_version_system("2018.0") == (4, 0)
+    assert versions.to_new_version_system("2020.1") == (6, 1)
+    assert versions.to_new_version_system("6.2") == (6, 2)
+
+
+def test_to_new_version_system_accepts_numbers():
+    assert versions.to_new_version_system(2018.0) == (4, 0)
+
+
+def test_is_supported_version():
+    assert versions.is_supported_version("6.2")
+    assert versions.is_supported_version("2021.1")
+    assert not versions.is_supported_version("2020.1")
+    assert not versions.is_supported_version("7.1", minimum_version="7.2")